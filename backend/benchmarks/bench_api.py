@@ -0,0 +1,519 @@
+"""Drive every /api route in-process and write the results to a JSON file.
+
+Seeds a throwaway database with synthetic_data.py (N users x M projects x K
+tasks), then runs each route in turn through httpx's ASGI transport. Workers
+run concurrently and spread requests across the synthetic users. Records
+that a request uses up, such as labels to delete or merge and emails to sign
+up with, are created before the route's timer starts.
+
+Per route it reports requests/sec, p50/p95/p99 latency, non-2xx responses and
+SQL statements per request. Statements are counted with a cursor event
+listener and attributed to the request through a context variable. Pass
+`--baseline` to print the change against an earlier run, for example the
+previous release:
+
+    python benchmarks/bench_api.py --out before.json
+    (check out the new release)
+    python benchmarks/bench_api.py --out after.json --baseline before.json
+
+GET /api/events is skipped because it is a long-lived SSE stream. Any /api
+route without a scenario is listed under "uncovered" in the output.
+
+Usage (from backend/):
+    python benchmarks/bench_api.py [--users 4] [--projects 10] [--tasks 100]
+                                   [--requests 200] [--concurrency 16] [--out bench_api.json]
+    DB_MODE=async STORAGE_PROFILE=production python benchmarks/bench_api.py
+
+Requires httpx (and aiosqlite + greenlet for DB_MODE=async).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+SKIPPED_ROUTES = {"GET /api/events": "long-lived SSE stream"}
+
+_statements: contextvars.ContextVar[list[int] | None] = contextvars.ContextVar("bench_api_statements", default=None)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _statements.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+class _User:
+    def __init__(self, user_id: str, email: str, token: str):
+        self.user_id = user_id
+        self.email = email
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.labels: list[dict] = []
+        self.projects: list[dict] = []
+        self.tasks: list[dict] = []
+
+    @property
+    def groups(self) -> list[dict]:
+        return [t for t in self.tasks if t["is_group"] and t["project_id"]]
+
+    @property
+    def leaves(self) -> list[dict]:
+        return [t for t in self.tasks if not t["is_group"] and t["project_id"]]
+
+
+class _Bench:
+    """Setup helpers shared by the scenarios. Request i runs as user i % n."""
+
+    def __init__(self, client, users: list[_User], password: str, seed: int):
+        self.client = client
+        self.users = users
+        self.password = password
+        self.rng = random.Random(seed)
+
+    def user(self, i: int) -> _User:
+        return self.users[i % len(self.users)]
+
+    async def refresh(self) -> None:
+        for user in self.users:
+            for name in ("labels", "projects", "tasks"):
+                response = await self.client.get(f"/api/{name}", headers=user.headers)
+                response.raise_for_status()
+                setattr(user, name, response.json())
+
+    async def create(self, path: str, user: _User, body: dict) -> dict:
+        response = await self.client.post(path, json=body, headers=user.headers)
+        response.raise_for_status()
+        return response.json()
+
+
+# Each scenario: async setup(bench, total) -> async request(client, i) -> Response.
+# Setup runs untimed; it may create the records the requests will consume.
+
+async def _auth_signup(bench: _Bench, total: int):
+    run = f"{time.time_ns():x}"
+
+    async def request(client, i):
+        return await client.post("/api/auth/signup", json={"email": f"bench-{run}-{i}@example.com", "password": bench.password})
+    return request
+
+
+async def _auth_login(bench: _Bench, total: int):
+    async def request(client, i):
+        return await client.post("/api/auth/login", json={"email": bench.user(i).email, "password": bench.password})
+    return request
+
+
+def _get(path: str):
+    async def setup(bench: _Bench, total: int):
+        async def request(client, i):
+            return await client.get(path, headers=bench.user(i).headers)
+        return request
+    return setup
+
+
+async def _label_create(bench: _Bench, total: int):
+    run = f"{time.time_ns():x}"
+
+    async def request(client, i):
+        return await client.post("/api/labels", json={"title": f"bench {run} {i}", "color": "#5B8DEF"}, headers=bench.user(i).headers)
+    return request
+
+
+async def _label_update(bench: _Bench, total: int):
+    async def request(client, i):
+        user = bench.user(i)
+        label = user.labels[i % len(user.labels)]
+        return await client.patch(f"/api/labels/{label['id']}", json={"color": f"#{i % 0xFFFFFF:06X}"}, headers=user.headers)
+    return request
+
+
+async def _consumable_labels(bench: _Bench, total: int) -> list[str]:
+    return [
+        (await bench.create("/api/labels", bench.user(i), {"title": f"bench consumable {time.time_ns()} {i}"}))["id"]
+        for i in range(total)
+    ]
+
+
+async def _label_delete(bench: _Bench, total: int):
+    ids = await _consumable_labels(bench, total)
+
+    async def request(client, i):
+        return await client.delete(f"/api/labels/{ids[i]}", headers=bench.user(i).headers)
+    return request
+
+
+async def _label_merge(bench: _Bench, total: int):
+    ids = await _consumable_labels(bench, total)
+    # Give every source label a project and a task so the merge has rows to move.
+    for i, label_id in enumerate(ids):
+        user = bench.user(i)
+        await bench.create("/api/projects", user, {"title": f"bench merge {i}", "label_id": label_id})
+        await bench.create("/api/tasks", user, {"title": f"bench merge {i}", "label_id": label_id})
+
+    async def request(client, i):
+        user = bench.user(i)
+        return await client.post(f"/api/labels/{ids[i]}/merge", json={"into_label_id": user.labels[0]["id"]}, headers=user.headers)
+    return request
+
+
+async def _project_create(bench: _Bench, total: int):
+    async def request(client, i):
+        user = bench.user(i)
+        return await client.post("/api/projects", json={"title": f"bench project {i}", "label_id": user.labels[0]["id"]}, headers=user.headers)
+    return request
+
+
+async def _project_update(bench: _Bench, total: int):
+    async def request(client, i):
+        user = bench.user(i)
+        project = user.projects[i % len(user.projects)]
+        return await client.patch(f"/api/projects/{project['id']}", json={"title": f"{project['title']} ({i})"}, headers=user.headers)
+    return request
+
+
+async def _project_delete(bench: _Bench, total: int):
+    ids = []
+    for i in range(total):
+        user = bench.user(i)
+        project = await bench.create("/api/projects", user, {"title": f"bench delete {i}"})
+        operations = [{"op": "create", "data": {"title": f"task {n}", "project_id": project["id"], "order_index": n}} for n in range(5)]
+        await bench.create("/api/tasks/batch", user, {"operations": operations})
+        ids.append(project["id"])
+
+    async def request(client, i):
+        return await client.delete(f"/api/projects/{ids[i]}", headers=bench.user(i).headers)
+    return request
+
+
+async def _project_put_tasks(bench: _Bench, total: int):
+    await bench.refresh()
+    payloads = {}
+    for user in bench.users:
+        project = user.projects[0]
+        payloads[user.user_id] = (project["id"], [t for t in user.tasks if t["project_id"] == project["id"]])
+
+    async def request(client, i):
+        user = bench.user(i)
+        project_id, tasks = payloads[user.user_id]
+        return await client.put(f"/api/projects/{project_id}/tasks", json=tasks, headers=user.headers)
+    return request
+
+
+async def _task_create(bench: _Bench, total: int):
+    async def request(client, i):
+        user = bench.user(i)
+        project = user.projects[i % len(user.projects)]
+        return await client.post("/api/tasks", json={"title": f"bench task {i}", "project_id": project["id"]}, headers=user.headers)
+    return request
+
+
+async def _task_batch(bench: _Bench, total: int):
+    async def request(client, i):
+        user = bench.user(i)
+        project = user.projects[i % len(user.projects)]
+        leaf = user.leaves[i % len(user.leaves)]
+        operations = [
+            {"op": "create", "ref": "g", "data": {"title": f"bench group {i}", "project_id": project["id"], "is_group": True}},
+            *({"op": "create", "data": {"title": f"bench child {n}", "project_id": project["id"], "parent_task_id": "g", "order_index": n}} for n in range(3)),
+            {"op": "update", "id": leaf["id"], "data": {"memo": f"batch {i}"}},
+        ]
+        return await client.post("/api/tasks/batch", json={"operations": operations}, headers=user.headers)
+    return request
+
+
+async def _task_update(bench: _Bench, total: int):
+    async def request(client, i):
+        user = bench.user(i)
+        leaf = user.leaves[i % len(user.leaves)]
+        return await client.patch(f"/api/tasks/{leaf['id']}", json={"memo": f"edited {i}"}, headers=user.headers)
+    return request
+
+
+async def _task_move(bench: _Bench, total: int):
+    await bench.refresh()
+    moves = []
+    for i in range(total):
+        user = bench.user(i)
+        task = bench.rng.choice(user.leaves)
+        siblings = [
+            t["id"] for t in user.tasks
+            if t["project_id"] == task["project_id"] and t["parent_task_id"] == task["parent_task_id"] and t["id"] != task["id"]
+        ]
+        moves.append((task["id"], {"parent_task_id": task["parent_task_id"], "after_id": bench.rng.choice([None, *siblings])}))
+
+    async def request(client, i):
+        task_id, body = moves[i]
+        return await client.post(f"/api/tasks/{task_id}/move", json=body, headers=bench.user(i).headers)
+    return request
+
+
+def _group_request(suffix: str, body=None):
+    async def setup(bench: _Bench, total: int):
+        await bench.refresh()
+
+        async def request(client, i):
+            user = bench.user(i)
+            group = user.groups[i % len(user.groups)]
+            path = f"/api/tasks/{group['id']}/subtree{suffix}"
+            if body is None:
+                return await client.get(path, headers=user.headers)
+            return await client.post(path, json=body(user, group, i), headers=user.headers)
+        return request
+    return setup
+
+
+def _subtree_move_body(user: _User, group: dict, i: int) -> dict:
+    # Move the group to the user's next project; groups keep hopping between projects.
+    projects = [p["id"] for p in user.projects]
+    return {"project_id": projects[(i + 1) % len(projects)]}
+
+
+async def _task_delete(bench: _Bench, total: int):
+    ids = []
+    for i in range(total):
+        user = bench.user(i)
+        ids.append((await bench.create("/api/tasks", user, {"title": f"bench delete {i}"}))["id"])
+
+    async def request(client, i):
+        return await client.delete(f"/api/tasks/{ids[i]}", headers=bench.user(i).headers)
+    return request
+
+
+async def _import(bench: _Bench, total: int):
+    body = {
+        "labels": [{"id": "l1", "title": "imported"}],
+        "projects": [{"id": "p1", "title": "imported", "label_id": "l1"}],
+        "tasks": [
+            {"id": f"t{n}", "title": f"imported {n}", "project_id": "p1", "order_index": n, "parent_task_id": "t0" if n else None, "is_group": n == 0}
+            for n in range(20)
+        ],
+    }
+
+    async def request(client, i):
+        return await client.post("/api/import", json=body, headers=bench.user(i).headers)
+    return request
+
+
+SCENARIOS = {
+    "POST /api/auth/signup": _auth_signup,
+    "POST /api/auth/login": _auth_login,
+    "GET /api/auth/me": _get("/api/auth/me"),
+    "GET /api/bootstrap": _get("/api/bootstrap"),
+    "GET /api/sync": _get("/api/sync"),
+    "GET /api/labels": _get("/api/labels"),
+    "GET /api/labels/stats": _get("/api/labels/stats"),
+    "POST /api/labels": _label_create,
+    "PATCH /api/labels/{label_id}": _label_update,
+    "DELETE /api/labels/{label_id}": _label_delete,
+    "POST /api/labels/{label_id}/merge": _label_merge,
+    "GET /api/projects": _get("/api/projects"),
+    "GET /api/projects/next-tasks": _get("/api/projects/next-tasks"),
+    "GET /api/projects-with-tasks": _get("/api/projects-with-tasks"),
+    "POST /api/projects": _project_create,
+    "PATCH /api/projects/{project_id}": _project_update,
+    "DELETE /api/projects/{project_id}": _project_delete,
+    "PUT /api/projects/{project_id}/tasks": _project_put_tasks,
+    "GET /api/tasks": _get("/api/tasks"),
+    "POST /api/tasks": _task_create,
+    "POST /api/tasks/batch": _task_batch,
+    "PATCH /api/tasks/{task_id}": _task_update,
+    "POST /api/tasks/{task_id}/move": _task_move,
+    "GET /api/tasks/{task_id}/subtree": _group_request(""),
+    "POST /api/tasks/{task_id}/subtree/move": _group_request("/move", _subtree_move_body),
+    "POST /api/tasks/{task_id}/subtree/complete": _group_request("/complete", lambda user, group, i: {"completed": i % 2 == 0}),
+    "POST /api/tasks/{task_id}/subtree/duplicate": _group_request("/duplicate", lambda user, group, i: {}),
+    "DELETE /api/tasks/{task_id}": _task_delete,
+    "GET /api/export": _get("/api/export"),
+    "POST /api/import": _import,
+}
+
+
+def _api_routes(app) -> set[str]:
+    return {
+        f"{method} {route.path}"
+        for route in app.routes
+        if getattr(route, "path", "").startswith("/api/")
+        for method in getattr(route, "methods", ()) or ()
+        if method != "HEAD"
+    }
+
+
+async def _drive(client, request, total: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    statements: list[int] = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in remaining:
+            counter = [0]
+            token = _statements.set(counter)
+            started = time.perf_counter()
+            try:
+                response = await request(client, i)
+                await response.aread()
+            finally:
+                latencies.append(time.perf_counter() - started)
+                _statements.reset(token)
+            statements.append(counter[0])
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "statements_per_request": round(sum(statements) / len(statements), 2),
+    }
+
+
+async def _run(args) -> dict:
+    import httpx
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    import database
+    import main
+    import synthetic_data
+    from dependencies import create_access_token
+
+    await main.on_startup()
+    config = synthetic_data.SyntheticConfig(
+        users=args.users, projects=args.projects, tasks=args.tasks, seed=args.seed, user_prefix="bench"
+    )
+    db = database.SessionLocal()
+    try:
+        seeded = synthetic_data.generate(db, config)
+    finally:
+        db.close()
+
+    users = [
+        _User(
+            synthetic_data.synthetic_user_id(config, index),
+            synthetic_data.synthetic_user_email(config, index),
+            create_access_token(synthetic_data.synthetic_user_id(config, index)),
+        )
+        for index in range(config.users)
+    ]
+    routes = _api_routes(main.app)
+    selected = [key for key in SCENARIOS if not args.route or any(part in key for part in args.route)]
+
+    results = {}
+    event.listen(Engine, "before_cursor_execute", _count_statement)
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            bench = _Bench(client, users, synthetic_data.SYNTHETIC_PASSWORD, args.seed)
+            await bench.refresh()
+            for key in selected:
+                request = await SCENARIOS[key](bench, args.requests)
+                if key.startswith("GET "):
+                    # One untimed request keeps statement compilation and cold caches out of the numbers.
+                    await _drive(client, request, 1, 1)
+                results[key] = await _drive(client, request, args.requests, args.concurrency)
+                print(f"{key:<46} {_format(results[key])}", file=sys.stderr)
+    finally:
+        event.remove(Engine, "before_cursor_execute", _count_statement)
+        await main.on_shutdown()
+
+    return {
+        "meta": {
+            "users": args.users,
+            "projects_per_user": args.projects,
+            "tasks_per_project": args.tasks,
+            "seeded_tasks": seeded["tasks"],
+            "requests_per_route": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "db_mode": database.DB_MODE,
+            "storage_profile": os.getenv("STORAGE_PROFILE", "default"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+        },
+        "routes": results,
+        "skipped": SKIPPED_ROUTES,
+        "uncovered": sorted(routes - SCENARIOS.keys() - SKIPPED_ROUTES.keys()),
+    }
+
+
+def _format(stats: dict) -> str:
+    return (
+        f"{stats['rps']:>8.1f} req/s  p50 {stats['p50_ms']:>7.2f}  p95 {stats['p95_ms']:>7.2f}  "
+        f"p99 {stats['p99_ms']:>7.2f} ms  {stats['statements_per_request']:>6.2f} stmt/req"
+        + (f"  {stats['errors']} errors" if stats["errors"] else "")
+    )
+
+
+def _print_comparison(current: dict, baseline: dict) -> None:
+    def change(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+.0f}%" if old else "n/a"
+
+    print(f"{'route':<46} {'req/s':>8} {'p95 ms':>8} {'stmt/req':>9}")
+    for key, stats in current["routes"].items():
+        old = baseline.get("routes", {}).get(key)
+        if old is None:
+            print(f"{key:<46} {'new':>8}")
+            continue
+        print(
+            f"{key:<46} {change(stats['rps'], old['rps']):>8} {change(stats['p95_ms'], old['p95_ms']):>8} "
+            f"{stats['statements_per_request'] - old['statements_per_request']:>+9.2f}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--projects", type=int, default=10, help="projects per user")
+    parser.add_argument("--tasks", type=int, default=100, help="tasks per project")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--route", nargs="*", help="only routes whose key contains one of these strings")
+    parser.add_argument("--out", type=Path, default=Path("bench_api.json"))
+    parser.add_argument("--baseline", type=Path, default=None, help="earlier --out file to compare against")
+    args = parser.parse_args()
+
+    # Paths are resolved before moving into the throwaway database directory.
+    out = args.out.resolve()
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+
+    os.chdir(tempfile.mkdtemp())
+    # Keep signup/login and the seed cheap; hashing cost has its own benchmark.
+    os.environ.setdefault("PASSWORD_HASH_ITERATIONS", "1000")
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    result = asyncio.run(_run(args))
+    out.write_text(json.dumps(result, indent=2, sort_keys=True) + "\n")
+    print(f"wrote {out}")
+    if result["uncovered"]:
+        print(f"routes without a scenario: {', '.join(result['uncovered'])}")
+    if baseline is not None:
+        _print_comparison(result, baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""Compare DB_MODE=sync and DB_MODE=async under concurrent load.
+
+Drives `GET /api/tasks` and `PUT /api/projects/{id}/tasks` in-process through
+httpx's ASGI transport and reports requests/sec and p50/p99 latency per mode.
+Each mode runs in its own subprocess against a throwaway database, because
+DB_MODE is read at import time.
+
+Usage (from backend/):
+    python benchmarks/bench_db_modes.py [--requests 400] [--concurrency 100]
+
+Requires httpx (and aiosqlite + greenlet for the async mode).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _drive(client, make_request, total: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await make_request(client)
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "rps": total / elapsed,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+    }
+
+
+async def _run_worker(total: int, concurrency: int) -> dict:
+    import httpx
+
+    import main
+    from dependencies import create_access_token
+
+    await main.on_startup()
+    headers = {"Authorization": f"Bearer {create_access_token(main.DEFAULT_DEV_USER_ID)}"}
+    transport = httpx.ASGITransport(app=main.app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        projects = (await client.get("/api/projects", headers=headers)).json()
+        project_id = projects[0]["id"]
+        tasks = (await client.get("/api/tasks", headers=headers)).json()
+        project_tasks = [t for t in tasks if t["project_id"] == project_id]
+
+        async def list_tasks(c):
+            return await c.get("/api/tasks", headers=headers)
+
+        async def put_tasks(c):
+            return await c.put(f"/api/projects/{project_id}/tasks", json=project_tasks, headers=headers)
+
+        return {
+            "GET /api/tasks": await _drive(client, list_tasks, total, concurrency),
+            "PUT /api/projects/{id}/tasks": await _drive(client, put_tasks, total, concurrency),
+        }
+
+
+def _run_mode(mode: str, total: int, concurrency: int) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, DB_MODE=mode, PYTHONPATH=str(BACKEND_DIR))
+        # Keep the one-off dev user seed cheap; hashing speed is not under test here.
+        env.setdefault("PASSWORD_HASH_ITERATIONS", "1000")
+        out = subprocess.run(
+            [sys.executable, __file__, "--worker", "--requests", str(total), "--concurrency", str(concurrency)],
+            cwd=workdir,
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(_run_worker(args.requests, args.concurrency))))
+        return
+
+    print(f"{'mode':<6} {'route':<30} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for mode in ("sync", "async"):
+        for route, stats in _run_mode(mode, args.requests, args.concurrency).items():
+            print(f"{mode:<6} {route:<30} {stats['rps']:>9.1f} {stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Microbenchmark of the get_current_user_id dependency with and without the identity cache.
+
+Calls the dependency directly (no HTTP) with a valid bearer token against a
+throwaway database and reports the mean cost per call and the cache counters.
+
+Usage (from backend/):
+    python benchmarks/bench_identity_cache.py [--calls 5000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+async def _time_calls(calls: int) -> float:
+    from fastapi.security import HTTPAuthorizationCredentials
+
+    import main
+    from database import ReadSessionLocal
+    from dependencies import create_access_token, get_current_user_id
+
+    credentials = HTTPAuthorizationCredentials(
+        scheme="Bearer",
+        credentials=create_access_token(main.DEFAULT_DEV_USER_ID),
+    )
+    started = time.perf_counter()
+    for _ in range(calls):
+        db = ReadSessionLocal()
+        try:
+            await get_current_user_id(credentials, db)
+        finally:
+            db.close()
+    return (time.perf_counter() - started) / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=5000)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    os.environ.setdefault("PASSWORD_HASH_ITERATIONS", "1000")
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    import main as app_main
+    from dependencies import identity_cache
+
+    app_main.seed_if_new_db()
+
+    cache_size = identity_cache.maxsize
+    identity_cache.maxsize = 0
+    uncached = asyncio.run(_time_calls(args.calls))
+
+    identity_cache.maxsize = cache_size
+    identity_cache.clear()
+    identity_cache.hits = identity_cache.misses = 0
+    cached = asyncio.run(_time_calls(args.calls))
+
+    print(f"without cache: {uncached * 1e6:9.1f} us/call")
+    print(f"with cache:    {cached * 1e6:9.1f} us/call  ({uncached / cached:.1f}x)")
+    print(f"cache stats:   {identity_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Encode time of the large list responses: default FastAPI path vs FAST_JSON.
+
+Seeds a throwaway database with N tasks (spread over projects, with memos,
+labels and completion dates so every field type is exercised), loads them
+with the same CRUD calls the routers use, and times only the encoding:
+
+- default: FastAPI's `serialize_response` for the route's response_model
+  followed by `JSONResponse.render`
+- adapter: precompiled `TypeAdapter(list[schema])` validate + dump_json
+           (what fast_json falls back to for schemas it cannot plan)
+- fast:    `fast_json.encode_list`
+
+Both outputs are compared byte for byte before timing.
+
+Usage (from backend/):
+    python benchmarks/bench_json_encoding.py [--tasks 10000] [--projects 100] [--repeat 5]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _seed(task_count: int, project_count: int) -> None:
+    import crud
+    import main
+    from database import SessionLocal
+    from schemas import LabelImport, ProjectImport, TaskImport
+
+    main.seed_if_new_db()
+    started = datetime(2026, 1, 1)
+    labels = [(i, LabelImport(id=f"l{i}", title=f"label {i}")) for i in range(5)]
+    projects = [(i, ProjectImport(id=f"p{i}", title=f"プロジェクト {i}", label_id=f"l{i % 5}")) for i in range(project_count)]
+    tasks = [
+        (
+            i,
+            TaskImport(
+                id=f"t{i}",
+                title=f"タスク {i} \"quoted\"",
+                project_id=f"p{i % project_count}",
+                label_id=f"l{i % 5}" if i % 3 else None,
+                order_index=i // project_count,
+                memo="メモ\n2行目" if i % 4 == 0 else None,
+                completed=i % 2 == 0,
+                completed_at=started + timedelta(seconds=i, microseconds=i) if i % 2 == 0 else None,
+                created_at=started + timedelta(minutes=i),
+            ),
+        )
+        for i in range(task_count)
+    ]
+    db = SessionLocal()
+    try:
+        crud.import_records(db, main.DEFAULT_DEV_USER_ID, labels, projects, tasks)
+    finally:
+        db.close()
+
+
+def _response_field(path: str):
+    import main
+
+    for route in main.app.routes:
+        if getattr(route, "path", None) == path and "GET" in route.methods:
+            return route.response_field
+    raise LookupError(path)
+
+
+def _default_encode(field, items) -> bytes:
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+
+    content = asyncio.run(serialize_response(field=field, response_content=items))
+    return JSONResponse(content).body
+
+
+def _best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--projects", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    os.environ.setdefault("PASSWORD_HASH_ITERATIONS", "1000")
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    import crud
+    import fast_json
+    import main as app_main
+    from database import SessionLocal
+    from schemas import ProjectWithTasks, TaskRead
+
+    _seed(args.tasks, args.projects)
+    db = SessionLocal()
+    try:
+        tasks = crud.list_tasks(db, app_main.DEFAULT_DEV_USER_ID)
+        projects = crud.list_projects_with_tasks(db, app_main.DEFAULT_DEV_USER_ID)
+    finally:
+        db.close()
+
+    mismatches = 0
+    per_10k = 10000 / len(tasks)
+    for name, path, schema, items in (
+        ("/api/tasks", "/tasks", TaskRead, tasks),
+        ("/api/projects-with-tasks", "/projects-with-tasks", ProjectWithTasks, projects),
+    ):
+        field = _response_field(f"/api{path}")
+        default_bytes = _default_encode(field, items)
+        fast_bytes = fast_json.encode_list(schema, items)
+        identical = default_bytes == fast_bytes
+        mismatches += not identical
+
+        default_s = _best_of(args.repeat, lambda: _default_encode(field, items))
+        adapter = fast_json.list_adapter(schema)
+        adapter_s = _best_of(
+            args.repeat,
+            lambda: adapter.dump_json(adapter.validate_python(items, from_attributes=True)),
+        )
+        fast_s = _best_of(args.repeat, lambda: fast_json.encode_list(schema, items))
+        print(f"{name}  ({len(tasks)} tasks, {len(default_bytes) / 1e6:.1f} MB, byte-identical: {identical})")
+        print(f"  default: {default_s * 1000 * per_10k:8.1f} ms per 10k tasks")
+        print(f"  adapter: {adapter_s * 1000 * per_10k:8.1f} ms per 10k tasks  ({default_s / adapter_s:.1f}x)")
+        print(f"  fast:    {fast_s * 1000 * per_10k:8.1f} ms per 10k tasks  ({default_s / fast_s:.1f}x)")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""Write amplification of moving one task: PUT /projects/{id}/tasks vs POST /tasks/{id}/move.
+
+For each project size, seeds a throwaway database with root-level tasks
+numbered 0..n-1 (what the project modal saves today) and performs random
+single-task drags three ways:
+
+- renumber:  the old client path. Reorder the list, renumber every sibling
+             0..n-1 and send the whole project to `upsert_project_tasks`
+             (unchanged rows are already skipped there)
+- move:      `move_task` with a random neighbour (sparse keys, midpoint insert)
+- same-gap:  `move_task` always to the slot right after the same task, the
+             worst case for gapped integers (the gap halves on every move
+             until the siblings are rebalanced)
+
+Rows written counts every row that an INSERT / UPDATE / DELETE on tasks
+touched, including rebalancing. The first sparse move on dense data pays
+for one rebalance of the whole sibling group.
+
+Usage (from backend/):
+    python benchmarks/bench_move_write_amplification.py [--sizes 10 1000 10000] [--moves 50]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+TASK_WRITES = ("INSERT INTO TASKS", "UPDATE TASKS", "DELETE FROM TASKS")
+
+
+def _seed(user_id: str, size: int) -> str:
+    import crud
+    from database import SessionLocal
+    from schemas import ProjectImport, TaskImport
+
+    db = SessionLocal()
+    try:
+        projects = [(0, ProjectImport(id="p", title=f"{size} tasks"))]
+        tasks = [(i, TaskImport(id=f"t{i}", title=f"task {i}", project_id="p", order_index=i)) for i in range(size)]
+        crud.import_records(db, user_id, [], projects, tasks)
+        return crud.list_projects(db, user_id)[-1].id
+    finally:
+        db.close()
+
+
+class _RowCounter:
+    def __init__(self):
+        self.rows = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if " ".join(statement.split()[:3]).upper().startswith(TASK_WRITES):
+            self.rows += max(cursor.rowcount, 0)
+
+
+def _run(moves: int, step) -> dict:
+    from sqlalchemy import event
+
+    from database import SessionLocal, engine
+
+    counter = _RowCounter()
+    rows: list[int] = []
+    rebalances = 0
+    event.listen(engine, "after_cursor_execute", counter)
+    started = time.perf_counter()
+    try:
+        for _ in range(moves):
+            counter.rows = 0
+            db = SessionLocal()
+            try:
+                rebalances += bool(step(db))
+            finally:
+                db.close()
+            rows.append(counter.rows)
+    finally:
+        elapsed = time.perf_counter() - started
+        event.remove(engine, "after_cursor_execute", counter)
+    return {
+        "mean": statistics.mean(rows),
+        "median": statistics.median(rows),
+        "max": max(rows),
+        "rebalances": rebalances,
+        "ms": elapsed * 1000 / moves,
+    }
+
+
+def _renumber_step(user_id: str, project_id: str, rng: random.Random):
+    import crud
+    from schemas import TaskUpsert
+
+    state = {"tasks": None}
+
+    def step(db) -> bool:
+        tasks = state["tasks"] or crud.list_tasks_page(db, user_id, project_id=project_id)[0]
+        ordered = sorted(tasks, key=lambda t: t.order_index)
+        moved = ordered.pop(rng.randrange(len(ordered)))
+        ordered.insert(rng.randrange(len(ordered) + 1), moved)
+        payloads = [
+            TaskUpsert(id=t.id, title=t.title, memo=t.memo, label_id=t.label_id, order_index=i)
+            for i, t in enumerate(ordered)
+        ]
+        _, state["tasks"], _ = crud.upsert_project_tasks(db, project_id, payloads, user_id)
+        return False
+
+    return step
+
+
+def _move_step(user_id: str, ids: list[str], rng: random.Random, same_gap: bool):
+    import crud
+
+    def step(db) -> bool:
+        if same_gap:
+            task_id, after_id = rng.choice(ids[2:]), ids[0]
+        else:
+            task_id = rng.choice(ids)
+            after_id = rng.choice([None, *ids])
+            if after_id == task_id:
+                after_id = None
+        _, _, rebalanced = crud.move_task(db, task_id, user_id, None, after_id)
+        return rebalanced > 0
+
+    return step
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--moves", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    os.environ.setdefault("PASSWORD_HASH_ITERATIONS", "1000")
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    import crud
+    import main as app_main
+    from database import SessionLocal
+
+    app_main.seed_if_new_db()
+    user_id = app_main.DEFAULT_DEV_USER_ID
+    rng = random.Random(args.seed)
+
+    print(f"{'tasks':>6}  {'path':<9} {'rows/move':>9} {'median':>7} {'max':>6} {'rebalances':>10} {'ms/move':>8}")
+    for size in args.sizes:
+        renumber_project = _seed(user_id, size)
+        move_project = _seed(user_id, size)
+        db = SessionLocal()
+        try:
+            ids = [t.id for t in crud.list_tasks_page(db, user_id, project_id=move_project)[0]]
+        finally:
+            db.close()
+
+        for name, step in (
+            ("renumber", _renumber_step(user_id, renumber_project, rng)),
+            ("move", _move_step(user_id, ids, rng, same_gap=False)),
+            ("same-gap", _move_step(user_id, ids, rng, same_gap=True)),
+        ):
+            result = _run(args.moves, step)
+            print(
+                f"{size:>6}  {name:<9} {result['mean']:>9.1f} {result['median']:>7.0f} "
+                f"{result['max']:>6} {result['rebalances']:>10} {result['ms']:>8.1f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""Read throughput while writes are running, per STORAGE_PROFILE.
+
+For each profile, a writer thread keeps re-saving one project's tasks through
+`crud.upsert_project_tasks` while reader threads call `crud.list_tasks` on the
+read pool. Reports reads/sec with and without the writer, writes/sec, and
+reader errors ("database is locked").
+
+Usage (from backend/):
+    python benchmarks/bench_storage_profile.py [--seconds 5] [--readers 8] [--tasks 200]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _seed(task_count: int) -> tuple[str, list]:
+    import crud
+    import main
+    from database import SessionLocal
+    from schemas import ProjectCreate, TaskUpsert
+
+    main.seed_if_new_db()
+    db = SessionLocal()
+    try:
+        project = crud.create_project(db, ProjectCreate(title="bench"), main.DEFAULT_DEV_USER_ID)
+        payloads = [TaskUpsert(title=f"task {i}", order_index=i) for i in range(task_count)]
+        _, tasks, _ = crud.upsert_project_tasks(db, project.id, payloads, main.DEFAULT_DEV_USER_ID)
+        payloads = [
+            TaskUpsert(id=t.id, title=t.title, order_index=t.order_index)
+            for t in tasks
+        ]
+        return project.id, payloads
+    finally:
+        db.close()
+
+
+def _measure_reads(seconds: float, readers: int, writer=None) -> dict:
+    import crud
+    import main
+    from database import ReadSessionLocal
+
+    stop = threading.Event()
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def read_loop():
+        while not stop.is_set():
+            db = ReadSessionLocal()
+            try:
+                crud.list_tasks(db, main.DEFAULT_DEV_USER_ID)
+                with lock:
+                    counts["reads"] += 1
+            except Exception:
+                with lock:
+                    counts["errors"] += 1
+            finally:
+                db.close()
+
+    def write_loop():
+        while not stop.is_set():
+            writer()
+            counts["writes"] += 1
+
+    threads = [threading.Thread(target=read_loop) for _ in range(readers)]
+    if writer is not None:
+        threads.append(threading.Thread(target=write_loop))
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    return {
+        "reads_per_sec": counts["reads"] / seconds,
+        "writes_per_sec": counts["writes"] / seconds,
+        "read_errors": counts["errors"],
+    }
+
+
+def _run_worker(seconds: float, readers: int, task_count: int) -> dict:
+    import crud
+    import main
+    from database import SessionLocal
+
+    project_id, payloads = _seed(task_count)
+    flip = [0]
+
+    def write_once():
+        flip[0] ^= 1
+        for item in payloads[:50]:
+            item.completed = bool(flip[0])
+        db = SessionLocal()
+        try:
+            crud.upsert_project_tasks(db, project_id, payloads, main.DEFAULT_DEV_USER_ID)
+        finally:
+            db.close()
+
+    return {
+        "idle": _measure_reads(seconds, readers),
+        "writing": _measure_reads(seconds, readers, writer=write_once),
+    }
+
+
+def _run_profile(profile: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, STORAGE_PROFILE=profile, PYTHONPATH=str(BACKEND_DIR))
+        env.setdefault("PASSWORD_HASH_ITERATIONS", "1000")
+        out = subprocess.run(
+            [
+                sys.executable, __file__, "--worker",
+                "--seconds", str(args.seconds),
+                "--readers", str(args.readers),
+                "--tasks", str(args.tasks),
+            ],
+            cwd=workdir,
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(_run_worker(args.seconds, args.readers, args.tasks)))
+        return
+
+    print(f"{'profile':<11} {'phase':<8} {'reads/s':>9} {'writes/s':>9} {'read errors':>12}")
+    for profile in ("default", "production"):
+        for phase, stats in _run_profile(profile, args).items():
+            print(
+                f"{profile:<11} {phase:<8} {stats['reads_per_sec']:>9.1f} "
+                f"{stats['writes_per_sec']:>9.1f} {stats['read_errors']:>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,27 +6,60 @@ from .labels import (
     create_label,
     update_label,
     delete_label,
+    list_label_stats,
+    merge_label,
 )
 
 from .projects import (
     create_project,
     delete_project,
     list_projects,
+    list_projects_page,
     list_projects_with_tasks,
     update_project,
     upsert_project_tasks,
 )
 
 from .tasks import (
+    apply_task_batch,
     create_task,
     delete_task,
+    duplicate_task_subtree,
     get_task,
+    list_task_subtree,
     list_tasks,
+    list_tasks_page,
+    move_task,
+    move_task_subtree,
+    rebalance_sibling_order,
+    set_task_subtree_completed,
     update_task,
 )
 
+from .transfer import import_records, iter_export_rows, load_bootstrap
+
 from .users import (
     create_user,
     get_user_by_email,
     get_user_by_id,
 )
+
+from .shards import (
+    assign_user_shard,
+    bind_user_shard,
+    cached_user_shard,
+    get_user_shard,
+    group_users_by_shard,
+)
+
+from .sync import list_changes, prune_tombstones
+
+from .progress import check_progress_counters
+
+from .next_tasks import flat_order_cache, list_next_tasks
+
+from .versions import bump_data_version, get_data_version
+
+from .pagination import MAX_PAGE_SIZE, InvalidCursor
+
+from . import aio
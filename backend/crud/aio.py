@@ -0,0 +1,71 @@
+# crud/aio.py
+"""
+Awaitable versions of the CRUD functions.
+
+Each function takes the session yielded by `database.get_db` (Session or
+AsyncSession, depending on DB_MODE) and runs the sync implementation through
+`database.run_db`, so the query logic lives in exactly one place.
+"""
+from functools import wraps
+
+from sqlalchemy.orm import Session
+
+from database import run_db
+from . import labels, next_tasks, projects, shards, sync, tasks, transfer, users, versions
+
+
+def _awaitable(fn):
+    @wraps(fn)
+    async def wrapper(db, *args, **kwargs):
+        return await run_db(db, fn, *args, **kwargs)
+
+    return wrapper
+
+
+rollback = _awaitable(Session.rollback)
+
+list_labels = _awaitable(labels.list_labels)
+get_label = _awaitable(labels.get_label)
+get_label_by_title = _awaitable(labels.get_label_by_title)
+create_label = _awaitable(labels.create_label)
+update_label = _awaitable(labels.update_label)
+delete_label = _awaitable(labels.delete_label)
+list_label_stats = _awaitable(labels.list_label_stats)
+merge_label = _awaitable(labels.merge_label)
+
+create_project = _awaitable(projects.create_project)
+delete_project = _awaitable(projects.delete_project)
+get_project = _awaitable(projects.get_project)
+list_projects = _awaitable(projects.list_projects)
+list_projects_page = _awaitable(projects.list_projects_page)
+list_projects_with_tasks = _awaitable(projects.list_projects_with_tasks)
+update_project = _awaitable(projects.update_project)
+upsert_project_tasks = _awaitable(projects.upsert_project_tasks)
+
+list_next_tasks = _awaitable(next_tasks.list_next_tasks)
+
+apply_task_batch = _awaitable(tasks.apply_task_batch)
+create_task = _awaitable(tasks.create_task)
+delete_task = _awaitable(tasks.delete_task)
+duplicate_task_subtree = _awaitable(tasks.duplicate_task_subtree)
+get_task = _awaitable(tasks.get_task)
+list_task_subtree = _awaitable(tasks.list_task_subtree)
+list_tasks = _awaitable(tasks.list_tasks)
+list_tasks_page = _awaitable(tasks.list_tasks_page)
+move_task = _awaitable(tasks.move_task)
+move_task_subtree = _awaitable(tasks.move_task_subtree)
+set_task_subtree_completed = _awaitable(tasks.set_task_subtree_completed)
+update_task = _awaitable(tasks.update_task)
+
+import_records = _awaitable(transfer.import_records)
+load_bootstrap = _awaitable(transfer.load_bootstrap)
+
+get_data_version = _awaitable(versions.get_data_version)
+
+list_changes = _awaitable(sync.list_changes)
+
+create_user = _awaitable(users.create_user)
+get_user_by_email = _awaitable(users.get_user_by_email)
+get_user_by_id = _awaitable(users.get_user_by_id)
+
+get_user_shard = _awaitable(shards.get_user_shard)
@@ -1,10 +1,19 @@
 # crud/labels.py
+from datetime import datetime
+
+from sqlalchemy import exists, func, select, update
 from sqlalchemy.orm import Session
 
 from models.label import Label
 from models.project import Project
 from models.task import Task
 from schemas import LabelCreate, LabelUpdate
+from .versions import bump_data_version, record_tombstones
+
+def _label_in_use(db: Session, label_id: str, user_id: str) -> bool:
+    used_by_project = exists().where(Project.label_id == label_id, Project.user_id == user_id)
+    used_by_task = exists().where(Task.label_id == label_id, Task.user_id == user_id)
+    return db.scalar(select(used_by_project | used_by_task))
 
 def list_labels(db: Session, user_id: str):
     return (
@@ -21,7 +30,8 @@ def get_label_by_title(db: Session, title: str, user_id: str):
     return db.query(Label).filter(Label.title == title, Label.user_id == user_id).first()
 
 def create_label(db: Session, payload: LabelCreate, user_id: str):
-    obj = Label(title=payload.title, color=payload.color, user_id=user_id)
+    version = bump_data_version(db, user_id)
+    obj = Label(title=payload.title, color=payload.color, user_id=user_id, change_seq=version)
     db.add(obj)
     db.commit()
     db.refresh(obj)
@@ -37,6 +47,7 @@ def update_label(db: Session, label_id: str, payload: LabelUpdate, user_id: str)
     if payload.color is not None:
         obj.color = payload.color
 
+    obj.change_seq = bump_data_version(db, user_id)
     db.commit()
     db.refresh(obj)
     return obj
@@ -52,23 +63,84 @@ def delete_label(db: Session, label_id: str, user_id: str) -> str:
     if not obj:
         return "not_found"
 
-    # どれか1件でも紐づきがあれば削除禁止
-    used_by_project = (
-        db.query(Project.id)
-        .filter(Project.label_id == label_id, Project.user_id == user_id)
-        .first()
-        is not None
-    )
-    used_by_task = (
-        db.query(Task.id)
-        .filter(Task.label_id == label_id, Task.user_id == user_id)
-        .first()
-        is not None
-    )
-
-    if used_by_project or used_by_task:
+    # どれか1件でも紐づきがあれば削除禁止（プロジェクト・タスクを1文で確認する）
+    if _label_in_use(db, label_id, user_id):
         return "in_use"
 
+    version = bump_data_version(db, user_id)
+    record_tombstones(db, user_id, "label", [label_id], version)
     db.delete(obj)
     db.commit()
     return "deleted"
+
+def list_label_stats(db: Session, user_id: str):
+    """
+    全ラベルの使用件数を1文で返す（ラベル一覧の順）。
+    タスク側の件数はラベルのカウンタ列を読むだけで、tasks には触れない。
+    プロジェクト数は projects を label_id ごとに GROUP BY した結果を外部結合する。
+
+    return: [{"label_id", "project_count", "task_count", "completed_count",
+              "fixed_count", "group_count"}, ...]
+    """
+    project_counts = (
+        select(Project.label_id.label("label_id"), func.count().label("project_count"))
+        .where(Project.user_id == user_id, Project.label_id.is_not(None))
+        .group_by(Project.label_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(
+            Label.id.label("label_id"),
+            func.coalesce(project_counts.c.project_count, 0).label("project_count"),
+            Label.task_count,
+            Label.completed_count,
+            Label.fixed_count,
+            Label.group_count,
+        )
+        .outerjoin(project_counts, project_counts.c.label_id == Label.id)
+        .where(Label.user_id == user_id)
+        .order_by(Label.created_at.asc())
+    )
+    return [row._asdict() for row in rows]
+
+def merge_label(db: Session, label_id: str, into_label_id: str | None, user_id: str, delete_source: bool = True):
+    """
+    label_id を参照しているプロジェクト・タスクをすべて into_label_id（None ならラベルなし）へ
+    付け替える。UPDATE はテーブルごとに1文、1トランザクションで確定する。
+    delete_source=True なら付け替えたあと元のラベルを削除する。
+
+    return:
+      - ("ok", {"projects": n, "tasks": n, "deleted": bool, "target": Label | None})
+      - ("not_found", None)
+      - ("target_not_found", None)
+      - ("same_label", None)
+    """
+    source = get_label(db, label_id, user_id)
+    if not source:
+        return "not_found", None
+    if into_label_id == label_id:
+        return "same_label", None
+    target = None
+    if into_label_id is not None:
+        target = get_label(db, into_label_id, user_id)
+        if not target:
+            return "target_not_found", None
+
+    version = bump_data_version(db, user_id)
+    now = datetime.utcnow()
+    moved = {}
+    for key, model in (("projects", Project), ("tasks", Task)):
+        moved[key] = db.execute(
+            update(model)
+            .where(model.user_id == user_id, model.label_id == label_id)
+            .values(label_id=into_label_id, updated_at=now, change_seq=version)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    if delete_source:
+        record_tombstones(db, user_id, "label", [label_id], version)
+        db.delete(source)
+    db.commit()
+    if target is not None:
+        db.refresh(target)
+    return "ok", {**moved, "deleted": delete_source, "target": target}
@@ -0,0 +1,180 @@
+# crud/next_tasks.py
+import os
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database import begin_snapshot
+from models.project import Project
+from models.task import Task
+from .versions import get_data_version
+
+# ユーザーごとの「プロジェクトの平坦化した順番」を何人分まで覚えておくか（0 で無効）
+NEXT_TASKS_CACHE_SIZE = int(os.getenv("NEXT_TASKS_CACHE_SIZE", "1024"))
+
+
+class FlatOrderCache:
+    """
+    LRU of user_id -> (data version, {project_id: (current_order_index, [(task_id, completed), ...])}).
+    どのタスク・プロジェクトの書き込みでも版数が上がるので、版数が一致する間だけ使う。
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[int, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, version: int) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id: str, version: int, flat_orders: dict) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (version, flat_orders)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+flat_order_cache = FlatOrderCache(NEXT_TASKS_CACHE_SIZE)
+
+
+def _flatten(rows) -> list[tuple[str, bool]]:
+    """
+    1プロジェクト分のタスクを、ダッシュボードの buildFlatLeafTaskIds と同じ順に並べる。
+    - 兄弟は order_index 順（同じ値なら created_at, id 順 = 行の並び順のまま）
+    - グループは出さずに子へ降りる。子を持つ通常タスクも子へ降りる
+    - 親がプロジェクト内にないタスクには届かない（ダッシュボードと同じ）
+    """
+    roots = []
+    children: dict[str, list] = {}
+    for row in rows:
+        if row.parent_task_id:
+            children.setdefault(row.parent_task_id, []).append(row)
+        else:
+            roots.append(row)
+
+    def by_order(row):
+        return row.order_index or 0
+
+    out: list[tuple[str, bool]] = []
+    # 再帰の代わりに逆順に積んだスタックで深さ優先に辿る
+    # （reverse=True だと同じ order_index の並びが保たれないので reversed を使う）
+    stack = list(reversed(sorted(roots, key=by_order)))
+    while stack:
+        row = stack.pop()
+        below = children.get(row.id)
+        if below:
+            stack.extend(reversed(sorted(below, key=by_order)))
+        elif not row.is_group:
+            out.append((row.id, bool(row.completed)))
+    return out
+
+
+def _load_flat_orders(db: Session, user_id: str) -> dict:
+    """プロジェクトごとの (current_order_index, 平坦化した [(task_id, completed)])。SELECT 2回。"""
+    flat_orders = {
+        project_id: (current_order_index or 0, [])
+        for project_id, current_order_index in db.execute(
+            select(Project.id, Project.current_order_index)
+            .where(Project.user_id == user_id)
+            .order_by(Project.created_at.asc(), Project.id.asc())
+        )
+    }
+    # ix_tasks_user_project_created の順（プロジェクトごと、作成順）に読む
+    rows = db.execute(
+        select(
+            Task.id,
+            Task.project_id,
+            Task.parent_task_id,
+            Task.order_index,
+            Task.completed,
+            Task.is_group,
+        )
+        .where(Task.user_id == user_id, Task.project_id.is_not(None))
+        .order_by(Task.project_id, Task.created_at.asc(), Task.id.asc())
+    ).all()
+
+    by_project: dict[str, list] = {}
+    for row in rows:
+        by_project.setdefault(row.project_id, []).append(row)
+    for project_id, project_rows in by_project.items():
+        if project_id in flat_orders:
+            flat_orders[project_id][1].extend(_flatten(project_rows))
+    return flat_orders
+
+
+def list_next_tasks(db: Session, user_id: str, limit: int):
+    """
+    各プロジェクトの「今のタスク」と、その後の未完了タスク limit 件。
+    今のタスク = 平坦化した順番で current_order_index 以降の最初の未完了タスク
+    （ダッシュボードの advanceProjectIndexToNextUncompleted と同じ）。
+
+    平坦化した順番はデータ版数が変わるまでキャッシュする。
+    返すタスク行は選ばれたものだけを主キーの IN 句1回で読む。
+
+    return: (version, [{"project_id", "position", "flat_length", "remaining",
+                        "current_task", "next_tasks"}, ...])
+      - position は平坦化した順番での今のタスクの位置（残りがなければ flat_length）
+    """
+    begin_snapshot(db)
+    version = get_data_version(db, user_id)
+    flat_orders = flat_order_cache.get(user_id, version)
+    if flat_orders is None:
+        flat_orders = _load_flat_orders(db, user_id)
+        flat_order_cache.put(user_id, version, flat_orders)
+
+    picked: list[tuple[str, int, int, int, list[str]]] = []
+    wanted: set[str] = set()
+    for project_id, (current_order_index, flat) in flat_orders.items():
+        uncompleted = [
+            index
+            for index in range(max(current_order_index, 0), len(flat))
+            if not flat[index][1]
+        ]
+        position = uncompleted[0] if uncompleted else len(flat)
+        task_ids = [flat[index][0] for index in uncompleted[: limit + 1]]
+        wanted.update(task_ids)
+        picked.append((project_id, position, len(flat), len(uncompleted), task_ids))
+
+    tasks = {}
+    if wanted:
+        tasks = {obj.id: obj for obj in db.query(Task).filter(Task.id.in_(wanted))}
+
+    result = []
+    for project_id, position, flat_length, remaining, task_ids in picked:
+        rows = [tasks[task_id] for task_id in task_ids]
+        result.append({
+            "project_id": project_id,
+            "position": position,
+            "flat_length": flat_length,
+            "remaining": remaining,
+            "current_task": rows[0] if rows else None,
+            "next_tasks": rows[1:],
+        })
+    return version, result
@@ -0,0 +1,63 @@
+# crud/pagination.py
+import base64
+import binascii
+import json
+
+from sqlalchemy import String, literal, tuple_, type_coerce
+
+# 1ページの最大件数（limit の上限）
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: str, row_id: str) -> str:
+    raw = json.dumps([created_at, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("utf-8")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        pad = "=" * ((4 - len(cursor) % 4) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode((cursor + pad).encode("utf-8")))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+    if not isinstance(created_at, str) or not isinstance(row_id, str):
+        raise InvalidCursor(cursor)
+    return created_at, row_id
+
+
+def keyset_page(query, model, limit: int | None, cursor: str | None):
+    """
+    (created_at, id) の昇順でキーセットページングする。
+
+    return: (items, next_cursor)  次のページがなければ next_cursor は None
+
+    created_at は SQLite に保存された文字列のまま比較する
+    （server_default の "YYYY-MM-DD HH:MM:SS" と Python 側の値で書式が混ざるため、
+    datetime に変換すると ORDER BY と比較結果がずれる）。
+    """
+    created_at_raw = type_coerce(model.created_at, String)
+    query = query.add_columns(created_at_raw).order_by(model.created_at.asc(), model.id.asc())
+
+    if cursor:
+        after_created_at, after_id = decode_cursor(cursor)
+        query = query.filter(
+            tuple_(created_at_raw, model.id)
+            > tuple_(literal(after_created_at, String), literal(after_id, String))
+        )
+
+    if limit is not None:
+        # 1件多く取って次ページの有無を判定する
+        query = query.limit(limit + 1)
+
+    rows = query.all()
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last_item, last_created_at = rows[-1]
+        next_cursor = encode_cursor(last_created_at, last_item.id)
+
+    return [item for item, _ in rows], next_cursor
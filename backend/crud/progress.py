@@ -0,0 +1,89 @@
+# crud/progress.py
+from sqlalchemy import case, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from models.label import Label
+from models.project import Project
+from models.task import Task
+from .shards import bind_user_shard
+from .versions import bump_data_version
+
+# projects / labels に持たせているタスク件数（migrations._m0005 のトリガーが増減させる）
+COUNTER_FIELDS = ("task_count", "completed_count", "fixed_count", "group_count")
+
+# (結果のキー, カウンタを持つモデル, タスク側の参照列)
+COUNTER_SCOPES = (
+    ("projects", Project, Task.project_id),
+    ("labels", Label, Task.label_id),
+)
+
+
+def _task_totals(key_column, user_id: str | None):
+    """参照先ごとのタスク件数（GROUP BY 1回）。"""
+    def flag(column):
+        return func.sum(case((column.is_(True), 1), else_=0))
+
+    query = (
+        select(
+            key_column.label("id"),
+            func.count().label("task_count"),
+            flag(Task.completed).label("completed_count"),
+            flag(Task.is_fixed).label("fixed_count"),
+            flag(Task.is_group).label("group_count"),
+        )
+        .where(key_column.is_not(None))
+        .group_by(key_column)
+    )
+    if user_id is not None:
+        query = query.where(Task.user_id == user_id)
+    return query.subquery()
+
+
+def check_progress_counters(db: Session, user_id: str | None = None, fix: bool = False) -> dict[str, list[str]]:
+    """
+    projects / labels のカウンタを tasks から数え直した値と比べる。
+    user_id を指定するとそのユーザーのシャードへ向けて調べる。
+    省略するとセッションのシャード（SessionLocal(info={"shard": ...})）の全ユーザーが対象で、
+    DB_SHARDS を使うときは database.data_shards() のシャードごとに呼ぶ。
+
+    fix=True のときはずれている行を数え直した値で書き直し、
+    そのユーザーの版数を上げて差分同期・ETag に反映させる。
+
+    return: {"projects": [ずれていたID...], "labels": [...]}
+    """
+    if user_id is not None:
+        bind_user_shard(db, user_id)
+
+    mismatched: dict[str, list[str]] = {}
+    repairs: dict[str, list[tuple]] = {}
+    for name, model, key_column in COUNTER_SCOPES:
+        totals = _task_totals(key_column, user_id)
+        expected = [func.coalesce(totals.c[field], 0) for field in COUNTER_FIELDS]
+        query = (
+            select(model.id, model.user_id, *expected)
+            .outerjoin(totals, totals.c.id == model.id)
+            .where(or_(*(getattr(model, field) != value for field, value in zip(COUNTER_FIELDS, expected))))
+        )
+        if user_id is not None:
+            query = query.where(model.user_id == user_id)
+        rows = db.execute(query).all()
+        mismatched[name] = [row[0] for row in rows]
+        repairs[name] = rows
+
+    if fix and any(repairs.values()):
+        versions = {
+            owner: bump_data_version(db, owner)
+            for owner in sorted({row[1] for rows in repairs.values() for row in rows})
+        }
+        for name, model, _ in COUNTER_SCOPES:
+            if not repairs[name]:
+                continue
+            db.execute(
+                update(model),
+                [
+                    {"id": row[0], **dict(zip(COUNTER_FIELDS, row[2:])), "change_seq": versions[row[1]]}
+                    for row in repairs[name]
+                ],
+            )
+        db.commit()
+    return mismatched
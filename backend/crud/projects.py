@@ -2,11 +2,14 @@
 from datetime import datetime
 import uuid
 
+from sqlalchemy import insert, update
 from sqlalchemy.orm import Session, selectinload
 
 from models.project import Project
 from models.task import Task
 from schemas import ProjectCreate, ProjectUpdate, TaskUpsert
+from .pagination import keyset_page
+from .versions import bump_data_version, record_tombstones, record_tombstones_from
 
 
 def _new_id(prefix: str) -> str:
@@ -14,6 +17,7 @@ def _new_id(prefix: str) -> str:
 
 
 def create_project(db: Session, payload: ProjectCreate, user_id: str):
+    version = bump_data_version(db, user_id)
     obj = Project(
         id=_new_id("proj"),
         user_id=user_id,
@@ -24,6 +28,7 @@ def create_project(db: Session, payload: ProjectCreate, user_id: str):
             if payload.current_order_index is not None
             else 0
         ),
+        change_seq=version,
     )
     db.add(obj)
     db.commit()
@@ -45,6 +50,7 @@ def update_project(db: Session, project_id: str, payload: ProjectUpdate, user_id
         setattr(obj, key, value)
 
     obj.updated_at = datetime.utcnow()
+    obj.change_seq = bump_data_version(db, user_id)
 
     db.commit()
     db.refresh(obj)
@@ -63,10 +69,14 @@ def delete_project(db: Session, project_id: str, user_id: str) -> str:
         return "not_found"
 
     try:
-        db.query(Task).filter(
+        version = bump_data_version(db, user_id)
+        project_tasks = db.query(Task).filter(
             Task.project_id == project_id,
             Task.user_id == user_id,
-        ).delete(synchronize_session=False)
+        )
+        record_tombstones_from(db, user_id, "task", project_tasks.with_entities(Task.id), version)
+        record_tombstones(db, user_id, "project", [project_id], version)
+        project_tasks.delete(synchronize_session=False)
         db.delete(obj)
         db.commit()
         return "deleted"
@@ -75,95 +85,113 @@ def delete_project(db: Session, project_id: str, user_id: str) -> str:
         return "in_use"
 
 
+# 差分比較・一括更新の対象になる列（project_id / user_id は呼び出し側で固定）
+_UPSERT_FIELDS = (
+    "title",
+    "memo",
+    "label_id",
+    "parent_task_id",
+    "order_index",
+    "completed",
+    "completed_at",
+    "is_fixed",
+    "is_group",
+)
+
+
+def _stored_value(value):
+    # SQLite の DateTime はタイムゾーンを保存しないので、比較前に同じ形にそろえる
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.replace(tzinfo=None)
+    return value
+
+
 def upsert_project_tasks(db: Session, project_id: str, payloads: list[TaskUpsert], user_id: str):
     """
     return:
-      - ("ok", tasks)
-      - ("not_found", None)
-      - ("invalid_parent", None)
-      - ("id_conflict", None)
+      - ("ok", tasks, counts)  counts = {"inserted", "updated", "deleted", "unchanged"}
+      - ("not_found", None, None)
+      - ("invalid_parent", None, None)
+      - ("id_conflict", None, None)
     """
     project = get_project(db, project_id, user_id)
     if not project:
-        return "not_found", None
+        return "not_found", None, None
 
     incoming_ids = {item.id for item in payloads if item.id}
     for item in payloads:
         if item.parent_task_id and item.parent_task_id not in incoming_ids:
-            return "invalid_parent", None
+            return "invalid_parent", None, None
 
     existing = {
-        task.id: task
-        for task in db.query(Task)
+        row.id: row
+        for row in db.query(Task.id, *(getattr(Task, field) for field in _UPSERT_FIELDS))
         .filter(Task.project_id == project_id, Task.user_id == user_id)
-        .all()
     }
-    keep_ids: set[str] = set()
+
+    # プロジェクト外のIDは1回のIN句でまとめて引く（1件ずつ問い合わせない）
+    unknown_ids = incoming_ids - existing.keys()
+    outside = {}
+    if unknown_ids:
+        outside = {
+            row.id: row
+            for row in db.query(Task.id, Task.user_id, Task.project_id)
+            .filter(Task.id.in_(unknown_ids))
+        }
+
     now = datetime.utcnow()
+    inserts: list[dict] = []
+    updates: list[dict] = []
+    keep_ids: set[str] = set()
+    unchanged = 0
 
     for item in payloads:
-        if item.id:
-            obj = existing.get(item.id)
-            if not obj:
-                task_by_id = db.query(Task).filter(Task.id == item.id).first()
-                if task_by_id and task_by_id.user_id != user_id:
-                    return "not_found", None
-                if (
-                    task_by_id
-                    and task_by_id.user_id == user_id
-                    and task_by_id.project_id is not None
-                    and task_by_id.project_id != project_id
-                ):
-                    return "id_conflict", None
-
-                obj = task_by_id if task_by_id else Task(id=item.id, user_id=user_id)
-                if not task_by_id:
-                    db.add(obj)
-
-            obj.user_id = user_id
-            obj.title = item.title
-            obj.memo = item.memo
-            obj.label_id = item.label_id
-            obj.project_id = project_id
-            obj.parent_task_id = item.parent_task_id
-            obj.order_index = item.order_index
-            obj.completed = item.completed
-            obj.completed_at = item.completed_at
-            obj.is_fixed = item.is_fixed
-            obj.is_group = item.is_group
-            obj.updated_at = now
-            keep_ids.add(obj.id)
-        else:
+        values = {field: getattr(item, field) for field in _UPSERT_FIELDS}
+
+        if not item.id:
             new_id = _new_id("task")
-            obj = Task(
-                id=new_id,
-                user_id=user_id,
-                title=item.title,
-                project_id=project_id,
-                label_id=item.label_id,
-                parent_task_id=item.parent_task_id,
-                order_index=item.order_index,
-                memo=item.memo,
-                completed=item.completed,
-                completed_at=item.completed_at,
-                is_fixed=item.is_fixed,
-                is_group=item.is_group,
-            )
-            db.add(obj)
+            inserts.append({"id": new_id, "user_id": user_id, "project_id": project_id, **values})
             keep_ids.add(new_id)
-
-    if keep_ids:
-        db.query(Task).filter(
-            Task.project_id == project_id,
-            Task.user_id == user_id,
-            ~Task.id.in_(keep_ids),
-        ).delete(synchronize_session=False)
-    else:
-        db.query(Task).filter(
-            Task.project_id == project_id,
-            Task.user_id == user_id,
-        ).delete(synchronize_session=False)
-
+            continue
+
+        keep_ids.add(item.id)
+        current = existing.get(item.id)
+        if current is not None:
+            # 値が変わっていない行は UPDATE しない（updated_at も変えない）
+            if all(_stored_value(values[field]) == getattr(current, field) for field in _UPSERT_FIELDS):
+                unchanged += 1
+            else:
+                updates.append({"id": item.id, "project_id": project_id, **values, "updated_at": now})
+            continue
+
+        task_by_id = outside.get(item.id)
+        if task_by_id is None:
+            inserts.append({"id": item.id, "user_id": user_id, "project_id": project_id, **values})
+            continue
+        if task_by_id.user_id != user_id:
+            return "not_found", None, None
+        if task_by_id.project_id is not None:
+            return "id_conflict", None, None
+
+        # プロジェクト未所属の自分のタスクをこのプロジェクトに取り込む
+        updates.append({"id": item.id, "project_id": project_id, **values, "updated_at": now})
+
+    stale_ids = [task_id for task_id in existing if task_id not in keep_ids]
+
+    # 何も変わっていなければ版数を上げない（ETag・同期カーソルをそのまま使えるように）
+    if inserts or updates or stale_ids:
+        version = bump_data_version(db, user_id)
+        if inserts:
+            db.execute(insert(Task), [{**row, "change_seq": version} for row in inserts])
+        if updates:
+            db.execute(update(Task), [{**row, "change_seq": version} for row in updates])
+        if stale_ids:
+            record_tombstones(db, user_id, "task", stale_ids, version)
+            db.query(Task).filter(
+                Task.project_id == project_id,
+                Task.user_id == user_id,
+                Task.id.in_(stale_ids),
+            ).delete(synchronize_session=False)
     db.commit()
     tasks = (
         db.query(Task)
@@ -171,7 +199,13 @@ def upsert_project_tasks(db: Session, project_id: str, payloads: list[TaskUpsert
         .order_by(Task.order_index.asc())
         .all()
     )
-    return "ok", tasks
+    counts = {
+        "inserted": len(inserts),
+        "updated": len(updates),
+        "deleted": len(stale_ids),
+        "unchanged": unchanged,
+    }
+    return "ok", tasks, counts
 
 
 def list_projects(db: Session, user_id: str):
@@ -183,6 +217,24 @@ def list_projects(db: Session, user_id: str):
     )
 
 
+def list_projects_page(
+    db: Session,
+    user_id: str,
+    *,
+    limit: int | None = None,
+    cursor: str | None = None,
+    label_id: str | None = None,
+):
+    """
+    return: (projects, next_cursor)
+    """
+    query = db.query(Project).filter(Project.user_id == user_id)
+    if label_id is not None:
+        query = query.filter(Project.label_id == label_id)
+
+    return keyset_page(query, Project, limit, cursor)
+
+
 def list_projects_with_tasks(db: Session, user_id: str):
     return (
         db.query(Project)
@@ -0,0 +1,66 @@
+# crud/shards.py
+"""
+ユーザー → シャードの対応表（DB_SHARDS > 0 のとき）。
+
+対応表は DATABASE_URL（ディレクトリ）にあり、ShardRoutingSession が users / user_shards への
+文をそちらへ送るので、どのセッションからでも読み書きできる。
+引いた結果はプロセス内で覚えておく（ユーザーを移すのは API を止めて
+tools/rebalance_shards.py を使うときだけなので、動いている間は変わらない）。
+"""
+import threading
+import zlib
+
+from sqlalchemy.orm import Session
+
+from database import DB_SHARDS, SHARDED
+from models import UserShard
+
+_known_shards: dict[str, int | None] = {}
+_lock = threading.Lock()
+
+
+def cached_user_shard(user_id: str) -> tuple[bool, int | None]:
+    """return: (覚えているか, シャード番号)。None は DATABASE_URL にいるユーザー"""
+    with _lock:
+        if user_id in _known_shards:
+            return True, _known_shards[user_id]
+    return False, None
+
+
+def get_user_shard(db: Session, user_id: str) -> int | None:
+    """ユーザーのシャード番号。対応表に行がなければ None（データは DATABASE_URL にある）"""
+    known, shard = cached_user_shard(user_id)
+    if known:
+        return shard
+    shard = db.query(UserShard.shard).filter(UserShard.user_id == user_id).scalar()
+    with _lock:
+        _known_shards[user_id] = shard
+    return shard
+
+
+def bind_user_shard(db: Session, user_id: str) -> None:
+    """
+    このセッションの文をユーザーのシャードへ送る。
+    リクエストの中では認証の依存関係が済ませるので、起動時の処理やツールで使う。
+    """
+    if SHARDED:
+        db.info["shard"] = get_user_shard(db, user_id)
+
+
+def assign_user_shard(db: Session, user_id: str) -> int:
+    """
+    新しいユーザーのシャードを決めて対応表に入れる（commit は呼び出し側）。
+    ユーザーIDのハッシュで振り分けるので問い合わせはいらない。偏ったら tools/rebalance_shards.py で直す
+    """
+    shard = zlib.crc32(user_id.encode()) % DB_SHARDS
+    db.add(UserShard(user_id=user_id, shard=shard))
+    with _lock:
+        _known_shards[user_id] = shard
+    return shard
+
+
+def group_users_by_shard(db: Session, user_ids: list[str]) -> dict[int | None, list[str]]:
+    groups: dict[int | None, list[str]] = {}
+    for user_id in user_ids:
+        groups.setdefault(get_user_shard(db, user_id) if SHARDED else None, []).append(user_id)
+    return groups
@@ -0,0 +1,100 @@
+# crud/sync.py
+from datetime import datetime
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from database import begin_snapshot
+from models.data_version import UserDataVersion
+from models.tombstone import Tombstone
+from .transfer import EXPORT_TABLES, load_bootstrap, schema_columns
+
+
+def list_changes(db: Session, user_id: str, cursor: int | None):
+    """
+    cursor（前回返した版数）より後に作成・更新・削除されたものだけを返す。
+    cursor が None なら全件（初回同期）。
+
+    return:
+      - ("ok", {"cursor", "full", "labels", "projects", "tasks", "deleted"})
+      - ("expired", None)  削除記録を掃除済みで差分を作れない（全件を取り直す）
+      - ("invalid", None)  まだ発行していない版数
+    """
+    if cursor is None:
+        version, data = load_bootstrap(db, user_id)
+        deleted = {f"{record_type}s": [] for record_type, _, _ in EXPORT_TABLES}
+        return "ok", {"cursor": str(version), "full": True, **data, "deleted": deleted}
+
+    begin_snapshot(db)
+    row = (
+        db.query(UserDataVersion.version, UserDataVersion.sync_floor)
+        .filter(UserDataVersion.user_id == user_id)
+        .first()
+    )
+    version, sync_floor = row if row is not None else (0, 0)
+    if cursor > version:
+        return "invalid", None
+    if cursor < sync_floor:
+        return "expired", None
+
+    changes = {"cursor": str(version), "full": False}
+    deleted = {}
+    for record_type, _, _ in EXPORT_TABLES:
+        changes[f"{record_type}s"] = []
+        deleted[f"{record_type}s"] = []
+    changes["deleted"] = deleted
+
+    # 変更がなければ何も読まない（ポーリングのほとんどはここで終わる）
+    if cursor == version:
+        return "ok", changes
+
+    live_ids = {}
+    for record_type, model, schema in EXPORT_TABLES:
+        rows = db.execute(
+            select(*schema_columns(model, schema))
+            .where(model.user_id == user_id, model.change_seq > cursor)
+            .order_by(model.change_seq.asc())
+        ).all()
+        changes[f"{record_type}s"] = [row._asdict() for row in rows]
+        live_ids[record_type] = {row.id for row in rows}
+
+    # 削除後に同じIDで作り直されたものは、生きている行のほうを正とする
+    for record_type, record_id in db.execute(
+        select(Tombstone.record_type, Tombstone.record_id)
+        .where(Tombstone.user_id == user_id, Tombstone.change_seq > cursor)
+        .order_by(Tombstone.change_seq.asc())
+    ):
+        if record_id not in live_ids.get(record_type, ()):
+            deleted[f"{record_type}s"].append(record_id)
+    return "ok", changes
+
+
+def prune_tombstones(db: Session, before: datetime) -> int:
+    """
+    before より前の削除記録を消す。消した分だけ各ユーザーの sync_floor を上げるので、
+    それより古いカーソルからの同期は "expired"（全件取り直し）になる。
+
+    return: 消した件数
+    """
+    floors = (
+        db.query(Tombstone.user_id, func.max(Tombstone.change_seq))
+        .filter(Tombstone.deleted_at < before)
+        .group_by(Tombstone.user_id)
+        .all()
+    )
+    if not floors:
+        return 0
+
+    for user_id, change_seq in floors:
+        db.execute(
+            update(UserDataVersion)
+            .where(UserDataVersion.user_id == user_id, UserDataVersion.sync_floor < change_seq)
+            .values(sync_floor=change_seq)
+        )
+    deleted = (
+        db.query(Tombstone)
+        .filter(Tombstone.deleted_at < before)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
@@ -2,10 +2,29 @@
 from datetime import datetime
 import uuid
 
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session, aliased
 
+from models.project import Project
 from models.task import Task
-from schemas import TaskCreate, TaskUpdate
+from schemas import TaskBatchCreate, TaskBatchDelete, TaskCreate, TaskUpdate
+from .pagination import keyset_page
+from .versions import bump_data_version, record_tombstones, record_tombstones_from
+
+# order_index は兄弟の間で間隔をあけて振る（間に入れるときは中間値、詰まったら振り直す）
+ORDER_GAP = 1024
+
+# 複製時にそのまま写す列（id / parent_task_id / order_index は付け替える）
+_COPY_FIELDS = (
+    "title",
+    "project_id",
+    "label_id",
+    "memo",
+    "completed",
+    "completed_at",
+    "is_fixed",
+    "is_group",
+)
 
 
 def _new_id(prefix: str) -> str:
@@ -13,6 +32,7 @@ def _new_id(prefix: str) -> str:
 
 
 def create_task(db: Session, payload: TaskCreate, user_id: str):
+    version = bump_data_version(db, user_id)
     obj = Task(
         id=_new_id("task"),
         user_id=user_id,
@@ -26,6 +46,7 @@ def create_task(db: Session, payload: TaskCreate, user_id: str):
         completed_at=payload.completed_at,
         is_fixed=payload.is_fixed,
         is_group=payload.is_group,
+        change_seq=version,
     )
     db.add(obj)
     db.commit()
@@ -47,14 +68,206 @@ def update_task(db: Session, task_id: str, payload: TaskUpdate, user_id: str):
         setattr(obj, key, value)
 
     obj.updated_at = datetime.utcnow()
+    obj.change_seq = bump_data_version(db, user_id)
 
     db.commit()
     db.refresh(obj)
     return obj
 
 
+def _subtree_ids(user_id: str, task_id: str):
+    """
+    task_id 自身とその子孫すべての ID を返す SELECT（再帰 CTE・1列）。
+    子の検索は ix_tasks_user_parent_created (user_id, parent_task_id, ...) を使う。
+    UNION（重複除去）なので parent_task_id が循環していても止まる。
+
+    CTE の中で user_id を絞っているので、外側は `Task.id.in_(...)` だけにする
+    （user_id も並べるとプランナーが主キーではなく user_id の索引を全件なめることがある）。
+    """
+    tree = (
+        select(Task.id)
+        .where(Task.user_id == user_id, Task.id == task_id)
+        .cte("subtree", recursive=True)
+    )
+    child = aliased(Task)
+    tree = tree.union(
+        select(child.id).where(child.user_id == user_id, child.parent_task_id == tree.c.id)
+    )
+    return select(tree.c.id)
+
+
+def _ancestor_ids(db: Session, user_id: str, task_id: str) -> set[str]:
+    """task_id 自身と祖先の ID（主キーで親を辿る再帰 CTE・1文）。"""
+    chain = (
+        select(Task.id, Task.parent_task_id)
+        .where(Task.user_id == user_id, Task.id == task_id)
+        .cte("ancestors", recursive=True)
+    )
+    parent = aliased(Task)
+    chain = chain.union(
+        select(parent.id, parent.parent_task_id).where(
+            parent.user_id == user_id,
+            parent.id == chain.c.parent_task_id,
+        )
+    )
+    return set(db.scalars(select(chain.c.id)))
+
+
+def _sibling_filter(user_id: str, project_id: str | None, parent_task_id: str | None) -> list:
+    """同じプロジェクト・同じ親の兄弟（ix_tasks_user_project_parent_order を使う条件）。"""
+    return [
+        Task.user_id == user_id,
+        Task.project_id.is_(None) if project_id is None else Task.project_id == project_id,
+        Task.parent_task_id.is_(None) if parent_task_id is None else Task.parent_task_id == parent_task_id,
+    ]
+
+
+def _next_sibling_order(db: Session, user_id: str, project_id: str | None, parent_task_id: str | None) -> int:
+    """同じ親（と同じプロジェクト）の兄弟の末尾に置くときの order_index。"""
+    last = db.scalar(
+        select(func.max(Task.order_index)).where(*_sibling_filter(user_id, project_id, parent_task_id))
+    )
+    return 0 if last is None else last + ORDER_GAP
+
+
+def _order_between(db: Session, task: Task, parent_task_id: str | None, after: Task | None) -> int | None:
+    """
+    兄弟の中で after の直後（after が None なら先頭）に入れるときの order_index。
+    後ろの兄弟とのあいだに整数の空きがなければ None（振り直しが必要）。
+    """
+    conditions = [*_sibling_filter(task.user_id, task.project_id, parent_task_id), Task.id != task.id]
+    if after is not None:
+        if after.order_index is None:
+            return None
+        # 同じ値の兄弟がいれば upper == lower になり、振り直しへ回る
+        conditions += [Task.id != after.id, Task.order_index >= after.order_index]
+    upper = db.scalar(select(func.min(Task.order_index)).where(*conditions))
+
+    lower = None if after is None else after.order_index
+    if lower is None and upper is None:
+        return 0
+    if lower is None:
+        return upper - ORDER_GAP
+    if upper is None:
+        return lower + ORDER_GAP
+    if upper - lower >= 2:
+        return (lower + upper) // 2
+    return None
+
+
+def rebalance_sibling_order(
+    db: Session,
+    user_id: str,
+    project_id: str | None,
+    parent_task_id: str | None,
+    change_seq: int,
+    exclude_id: str | None = None,
+) -> int:
+    """
+    兄弟の order_index を今の並び順のまま ORDER_GAP 間隔に振り直す（UPDATE ... FROM 1文）。
+    値が変わらない行は書き換えない。呼び出し側で bump_data_version 済みの版数を渡す。
+
+    return: 書き換えた行数
+    """
+    ranked = (
+        select(
+            Task.id.label("id"),
+            (
+                func.row_number().over(order_by=(Task.order_index, Task.created_at, Task.id)) * ORDER_GAP
+            ).label("order_index"),
+        )
+        .where(*_sibling_filter(user_id, project_id, parent_task_id))
+    )
+    if exclude_id is not None:
+        ranked = ranked.where(Task.id != exclude_id)
+    ranked = ranked.subquery()
+
+    result = db.execute(
+        update(Task)
+        .where(Task.id == ranked.c.id, Task.order_index.is_distinct_from(ranked.c.order_index))
+        .values(order_index=ranked.c.order_index, updated_at=datetime.utcnow(), change_seq=change_seq)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def move_task(
+    db: Session,
+    task_id: str,
+    user_id: str,
+    parent_task_id: str | None = None,
+    after_id: str | None = None,
+):
+    """
+    タスクを同じプロジェクト内で parent_task_id の子の、after_id の直後（None なら先頭）へ移す。
+    ふつうは前後の order_index の中間値を入れるので、書き換えるのはこのタスク1行だけ。
+    間が詰まっているときだけ兄弟を振り直してから入れる。
+
+    return:
+      - ("ok", task, rebalanced)  rebalanced = 振り直しで書き換えた兄弟の行数（ふつうは 0）
+      - ("not_found", None, 0)
+      - ("invalid_parent", None, 0)  親が同じプロジェクトにない / 自分の子孫を親にしようとした
+      - ("invalid_after", None, 0)   after_id が移動先の兄弟ではない
+    """
+    obj = get_task(db, task_id, user_id)
+    if not obj:
+        return "not_found", None, 0
+
+    if parent_task_id is not None:
+        parent = get_task(db, parent_task_id, user_id)
+        if parent is None or parent.project_id != obj.project_id:
+            return "invalid_parent", None, 0
+        if task_id in _ancestor_ids(db, user_id, parent_task_id):
+            return "invalid_parent", None, 0
+
+    after = None
+    if after_id is not None:
+        after = get_task(db, after_id, user_id)
+        if (
+            after is None
+            or after.id == task_id
+            or after.project_id != obj.project_id
+            or after.parent_task_id != parent_task_id
+        ):
+            return "invalid_after", None, 0
+
+    version = bump_data_version(db, user_id)
+    order_index = _order_between(db, obj, parent_task_id, after)
+    rebalanced = 0
+    if order_index is None:
+        rebalanced = rebalance_sibling_order(
+            db, user_id, obj.project_id, parent_task_id, version, exclude_id=task_id
+        )
+        db.refresh(after)
+        order_index = _order_between(db, obj, parent_task_id, after)
+
+    obj.parent_task_id = parent_task_id
+    obj.order_index = order_index
+    obj.updated_at = datetime.utcnow()
+    obj.change_seq = version
+    db.commit()
+    db.refresh(obj)
+    return "ok", obj, rebalanced
+
+
+def list_task_subtree(db: Session, task_id: str, user_id: str):
+    tasks = (
+        db.query(Task)
+        .filter(Task.id.in_(_subtree_ids(user_id, task_id)))
+        .execution_options(populate_existing=True)
+        .all()
+    )
+    # 兄弟ごとに並び順どおり返す（レスポンスの順序を毎回同じにする）。
+    # ORDER BY だと一時 B-tree のソートになるので、サブツリー分だけ Python で並べる
+    tasks.sort(key=lambda t: (t.parent_task_id or "", t.order_index or 0, t.created_at or datetime.min, t.id))
+    return tasks
+
+
 def delete_task(db: Session, task_id: str, user_id: str) -> str:
     """
+    タスクと、その子孫（parent_task_id で辿れるもの）をまとめて削除する。
+    子孫の ID は Python 側に読まず、再帰 CTE のまま tombstone 記録と DELETE に使う。
+
     return:
       - "deleted"
       - "not_found"
@@ -63,11 +276,260 @@ def delete_task(db: Session, task_id: str, user_id: str) -> str:
     if not obj:
         return "not_found"
 
-    db.delete(obj)
+    version = bump_data_version(db, user_id)
+    subtree = _subtree_ids(user_id, task_id)
+    record_tombstones_from(db, user_id, "task", subtree, version)
+    db.execute(
+        delete(Task)
+        .where(Task.id.in_(subtree))
+        .execution_options(synchronize_session=False)
+    )
     db.commit()
     return "deleted"
 
 
+def set_task_subtree_completed(db: Session, task_id: str, user_id: str, completed: bool):
+    """
+    タスクと子孫をまとめて完了 / 未完了にする（UPDATE 1文）。
+    すでに同じ状態の行は書き換えない（completed_at もそのまま）。
+
+    return: 更新後のサブツリー全体。タスクがなければ None
+    """
+    if not get_task(db, task_id, user_id):
+        return None
+
+    version = bump_data_version(db, user_id)
+    now = datetime.utcnow()
+    db.execute(
+        update(Task)
+        .where(
+            Task.id.in_(_subtree_ids(user_id, task_id)),
+            Task.completed.is_not(completed),
+        )
+        .values(
+            completed=completed,
+            completed_at=now if completed else None,
+            updated_at=now,
+            change_seq=version,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return list_task_subtree(db, task_id, user_id)
+
+
+def move_task_subtree(
+    db: Session,
+    task_id: str,
+    user_id: str,
+    project_id: str | None,
+    parent_task_id: str | None = None,
+):
+    """
+    タスクを子孫ごと別のプロジェクト（と親）へ移す。
+    子孫は project_id だけを UPDATE 1文で書き換え、親子関係はそのまま保つ。
+    移動したタスクは新しい兄弟の末尾に置く。
+
+    return:
+      - ("ok", tasks)  tasks = 移動後のサブツリー全体
+      - ("not_found", None)
+      - ("project_not_found", None)
+      - ("invalid_parent", None)  親が移動先プロジェクトにない / 自分の子孫を親にしようとした
+    """
+    obj = get_task(db, task_id, user_id)
+    if not obj:
+        return "not_found", None
+
+    if project_id is not None:
+        exists = db.query(Project.id).filter(Project.id == project_id, Project.user_id == user_id).first()
+        if not exists:
+            return "project_not_found", None
+
+    if parent_task_id is not None:
+        parent = get_task(db, parent_task_id, user_id)
+        if parent is None or parent.project_id != project_id:
+            return "invalid_parent", None
+        if task_id in _ancestor_ids(db, user_id, parent_task_id):
+            return "invalid_parent", None
+
+    order_index = _next_sibling_order(db, user_id, project_id, parent_task_id)
+    version = bump_data_version(db, user_id)
+    now = datetime.utcnow()
+    db.execute(
+        update(Task)
+        .where(Task.id.in_(_subtree_ids(user_id, task_id)))
+        .values(project_id=project_id, updated_at=now, change_seq=version)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        update(Task)
+        .where(Task.user_id == user_id, Task.id == task_id)
+        .values(parent_task_id=parent_task_id, order_index=order_index)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return "ok", list_task_subtree(db, task_id, user_id)
+
+
+def duplicate_task_subtree(db: Session, task_id: str, user_id: str):
+    """
+    タスクを子孫ごと複製する（SELECT 1回 + executemany の INSERT 1回）。
+    複製したルートは元と同じ親の、兄弟の末尾に置く。
+
+    return: 複製したサブツリー全体。タスクがなければ None
+    """
+    rows = db.execute(
+        select(Task.id, Task.parent_task_id, Task.order_index, *(getattr(Task, f) for f in _COPY_FIELDS))
+        .where(Task.id.in_(_subtree_ids(user_id, task_id)))
+    ).all()
+    if not rows:
+        return None
+
+    id_map = {row.id: _new_id("task") for row in rows}
+    root = next(row for row in rows if row.id == task_id)
+    root_order = _next_sibling_order(db, user_id, root.project_id, root.parent_task_id)
+
+    version = bump_data_version(db, user_id)
+    values = []
+    for row in rows:
+        is_root = row.id == task_id
+        values.append({
+            "id": id_map[row.id],
+            "user_id": user_id,
+            "parent_task_id": row.parent_task_id if is_root else id_map[row.parent_task_id],
+            "order_index": root_order if is_root else row.order_index,
+            **{field: getattr(row, field) for field in _COPY_FIELDS},
+            "change_seq": version,
+        })
+    # render_nulls: None の列を落とさずに NULL として送る。落とすと None の位置が違う行ごとに
+    # INSERT 文が分かれ、サブツリーの中身しだいで文の数が増える
+    db.execute(insert(Task).execution_options(render_nulls=True), values)
+    db.commit()
+    return list_task_subtree(db, id_map[task_id], user_id)
+
+
+def apply_task_batch(db: Session, operations: list, user_id: str):
+    """
+    create / update / delete を先頭から順に適用し、1回の commit で確定する（全部成功か全部なし）。
+    対象タスクは最初に1回の IN 句でまとめて読み、書き込みは最後の flush でまとめて出す。
+
+    return:
+      - ("ok", {"tasks": [...], "deleted": [...], "refs": {ref: id}})
+      - ("not_found", index)      存在しない（または同じバッチで削除済みの）タスク
+      - ("duplicate_ref", index)  同じ ref が2回 create された
+      - ("invalid_parent", index) 親が同じプロジェクトにない / 自分の子孫を親にしようとした
+
+    delete は DELETE /api/tasks/{id} と同じく子孫ごと消す。
+    delete と親の変更は、そこまでの操作を flush したうえで DB 上の木を見る。
+    """
+    if not operations:
+        return "ok", {"tasks": [], "deleted": [], "refs": {}}
+
+    # ref → 新しいID（後続の操作で id / parent_task_id として使える）
+    refs: dict[str, str] = {}
+    for index, op in enumerate(operations):
+        if isinstance(op, TaskBatchCreate) and op.ref is not None:
+            if op.ref in refs:
+                return "duplicate_ref", index
+            refs[op.ref] = _new_id("task")
+
+    def resolve(task_id):
+        return refs.get(task_id, task_id)
+
+    created_ids = set(refs.values())
+    target_ids = {
+        resolve(op.id)
+        for op in operations
+        if not isinstance(op, TaskBatchCreate) and resolve(op.id) not in created_ids
+    }
+    tasks: dict[str, Task] = {}
+    if target_ids:
+        tasks = {
+            obj.id: obj
+            for obj in db.query(Task).filter(Task.user_id == user_id, Task.id.in_(target_ids))
+        }
+
+    version = bump_data_version(db, user_id)
+    now = datetime.utcnow()
+    touched: list[str] = []
+    deleted: list[str] = []
+
+    for index, op in enumerate(operations):
+        if isinstance(op, TaskBatchCreate):
+            values = op.data.model_dump()
+            values["parent_task_id"] = resolve(values["parent_task_id"])
+            task_id = refs[op.ref] if op.ref is not None else _new_id("task")
+            obj = Task(id=task_id, user_id=user_id, change_seq=version, **values)
+            db.add(obj)
+            tasks[task_id] = obj
+            touched.append(task_id)
+            continue
+
+        task_id = resolve(op.id)
+        obj = tasks.get(task_id)
+        if obj is None:
+            db.rollback()
+            return "not_found", index
+
+        if isinstance(op, TaskBatchDelete):
+            db.flush()
+            subtree = _subtree_ids(user_id, task_id)
+            subtree_ids = list(db.scalars(subtree))
+            db.execute(
+                delete(Task)
+                .where(Task.id.in_(subtree))
+                .execution_options(synchronize_session=False)
+            )
+            for removed_id in subtree_ids:
+                removed = tasks.pop(removed_id, None)
+                if removed is not None:
+                    db.expunge(removed)
+                # 同じバッチで作ったものはクライアントが知らないので tombstone はいらない
+                if removed_id not in created_ids:
+                    deleted.append(removed_id)
+            continue
+
+        updates = op.data.model_dump(exclude_unset=True)
+        if "parent_task_id" in updates:
+            updates["parent_task_id"] = resolve(updates["parent_task_id"])
+            parent_task_id = updates["parent_task_id"]
+            if parent_task_id is not None and parent_task_id != obj.parent_task_id:
+                # move_task と同じ判定（同じプロジェクトの、自分の子孫ではないタスク）
+                db.flush()
+                parent = tasks.get(parent_task_id) or get_task(db, parent_task_id, user_id)
+                if (
+                    parent is None
+                    or parent.project_id != updates.get("project_id", obj.project_id)
+                    or task_id in _ancestor_ids(db, user_id, parent_task_id)
+                ):
+                    db.rollback()
+                    return "invalid_parent", index
+        for key, value in updates.items():
+            setattr(obj, key, value)
+        obj.updated_at = now
+        obj.change_seq = version
+        touched.append(task_id)
+
+    record_tombstones(db, user_id, "task", deleted, version)
+    db.commit()
+
+    # server_default（created_at など）を含めて1回の SELECT で読み直す
+    result_ids = list(dict.fromkeys(task_id for task_id in touched if task_id in tasks))
+    rows = {}
+    if result_ids:
+        rows = {
+            obj.id: obj
+            for obj in db.query(Task)
+            .filter(Task.user_id == user_id, Task.id.in_(result_ids))
+            .execution_options(populate_existing=True)
+        }
+    return "ok", {
+        "tasks": [rows[task_id] for task_id in result_ids],
+        "deleted": deleted,
+        "refs": refs,
+    }
+
+
 def list_tasks(db: Session, user_id: str):
     return (
         db.query(Task)
@@ -75,3 +537,34 @@ def list_tasks(db: Session, user_id: str):
         .order_by(Task.created_at.asc())
         .all()
     )
+
+
+def list_tasks_page(
+    db: Session,
+    user_id: str,
+    *,
+    limit: int | None = None,
+    cursor: str | None = None,
+    project_id: str | None = None,
+    label_id: str | None = None,
+    completed: bool | None = None,
+    is_fixed: bool | None = None,
+    parent_task_id: str | None = None,
+):
+    """
+    return: (tasks, next_cursor)
+    None のフィルタは条件に含めない。
+    """
+    query = db.query(Task).filter(Task.user_id == user_id)
+    if project_id is not None:
+        query = query.filter(Task.project_id == project_id)
+    if label_id is not None:
+        query = query.filter(Task.label_id == label_id)
+    if completed is not None:
+        query = query.filter(Task.completed == completed)
+    if is_fixed is not None:
+        query = query.filter(Task.is_fixed == is_fixed)
+    if parent_task_id is not None:
+        query = query.filter(Task.parent_task_id == parent_task_id)
+
+    return keyset_page(query, Task, limit, cursor)
@@ -0,0 +1,366 @@
+# crud/transfer.py
+import logging
+import uuid
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from database import begin_snapshot
+
+from models.label import Label
+from models.project import Project
+from models.task import Task
+from schemas import LabelImport, LabelRead, ProjectImport, ProjectRead, TaskImport, TaskRead
+from .versions import bump_data_version, get_data_version
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = 500
+# インポート時に1トランザクションでまとめて INSERT する行数
+IMPORT_CHUNK_SIZE = 1000
+
+# (レコード種別, モデル, 出力スキーマ) の順に書き出す。参照先が先に来るようにする
+EXPORT_TABLES = (
+    ("label", Label, LabelRead),
+    ("project", Project, ProjectRead),
+    ("task", Task, TaskRead),
+)
+
+
+def iter_export_rows(db: Session, user_id: str, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    ユーザーの全データを (record_type, schema, rows) のバッチで順に返す。
+
+    ORM オブジェクトを作らずスキーマの列だけを yield_per で少しずつ読むので、
+    アカウントが大きくてもメモリ使用量は batch_size 分で一定。
+    呼び出し側は同じ db で最後まで読み切ること（1つの読み取りトランザクション内で読む）。
+    """
+    begin_snapshot(db)
+    yield from _iter_rows(db, user_id, batch_size)
+
+
+def schema_columns(model, schema):
+    """出力スキーマのフィールドと同名でラベル付けしたモデルの列（ORM オブジェクトを作らずに読む用）。"""
+    return [getattr(model, field).label(field) for field in schema.model_fields]
+
+
+def _iter_rows(db: Session, user_id: str, batch_size: int):
+    for record_type, model, schema in EXPORT_TABLES:
+        columns = schema_columns(model, schema)
+        result = db.execute(
+            select(*columns)
+            .where(model.user_id == user_id)
+            .order_by(model.created_at.asc(), model.id.asc())
+            .execution_options(yield_per=batch_size)
+        )
+        for rows in result.partitions():
+            yield record_type, schema, rows
+
+
+def load_bootstrap(db: Session, user_id: str):
+    """
+    ダッシュボードの初期表示に必要な全データを1つの読み取りトランザクションで読む。
+
+    return: (version, {"labels": [...], "projects": [...], "tasks": [...]})
+      - version はデータと同じスナップショットで読んだデータ版数
+      - 各要素は出力スキーマの列だけを持つ dict（ORM オブジェクトは作らない）
+    """
+    begin_snapshot(db)
+    version = get_data_version(db, user_id)
+    data = {f"{record_type}s": [] for record_type, _, _ in EXPORT_TABLES}
+    for record_type, _, rows in _iter_rows(db, user_id, EXPORT_BATCH_SIZE):
+        data[f"{record_type}s"].extend(row._asdict() for row in rows)
+    return version, data
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}-{uuid.uuid4()}"
+
+
+def _optional_timestamps(item, *fields: str) -> dict:
+    # 指定がなければ server_default に任せる
+    return {field: getattr(item, field) for field in fields if getattr(item, field) is not None}
+
+
+def _insert_chunks(
+    db: Session,
+    user_id: str,
+    model,
+    rows: list[tuple[dict, dict]],
+    errors: list[dict],
+    failed_ids: set[str],
+    ref_columns: tuple[str, ...] = (),
+) -> int:
+    """
+    rows: [(エラー報告用のメタ情報, INSERTする値), ...]（参照先の行が先に来る順）
+    チャンクごとに executemany + commit。チャンクが失敗したらそのチャンクだけ
+    1行ずつ入れ直して、失敗した行をエラーとして記録する。
+
+    failed_ids: 登録できなかった行のサーバーID。ref_columns がそれを指す行は入れずにエラーにし、
+    その行のIDも加える（参照先のない行を作らない）。
+    """
+    def refs_failed(meta: dict, values: dict) -> bool:
+        if any(values.get(column) in failed_ids for column in ref_columns):
+            failed_ids.add(values["id"])
+            errors.append({**meta, "error": "references a record that failed to import"})
+            return True
+        return False
+
+    inserted = 0
+    for start in range(0, len(rows), IMPORT_CHUNK_SIZE):
+        chunk = [
+            (meta, values)
+            for meta, values in rows[start:start + IMPORT_CHUNK_SIZE]
+            if not refs_failed(meta, values)
+        ]
+        if not chunk:
+            continue
+        try:
+            version = bump_data_version(db, user_id)
+            db.execute(insert(model), [{**values, "change_seq": version} for _, values in chunk])
+            db.commit()
+            inserted += len(chunk)
+            continue
+        except SQLAlchemyError:
+            db.rollback()
+
+        for meta, values in chunk:
+            # 同じチャンクの前の行（親タスクなど）が失敗していることがある
+            if refs_failed(meta, values):
+                continue
+            try:
+                version = bump_data_version(db, user_id)
+                db.execute(insert(model), [{**values, "change_seq": version}])
+                db.commit()
+                inserted += 1
+            except SQLAlchemyError:
+                db.rollback()
+                # ドライバのメッセージ（SQL を含む）はクライアントに返さずログにだけ残す
+                logger.warning("import: failed to insert %s %s", meta["type"], meta["id"], exc_info=True)
+                failed_ids.add(values["id"])
+                errors.append({**meta, "error": "failed to insert"})
+    return inserted
+
+
+def import_records(
+    db: Session,
+    user_id: str,
+    labels: list[tuple[int, LabelImport]],
+    projects: list[tuple[int, ProjectImport]],
+    tasks: list[tuple[int, TaskImport]],
+):
+    """
+    クライアントIDつきのレコードを新しいサーバーIDで一括登録する。
+    参照（label_id / project_id / parent_task_id）は同じバッチ内のID、または
+    このユーザーの既存データのIDを指せる。問題のあるレコードだけをスキップする。
+
+    labels / projects / tasks: [(元データ内の位置, レコード), ...]
+
+    return: (inserted, matched_labels, errors)
+      - inserted = {"labels": n, "projects": n, "tasks": n}
+      - matched_labels = 同じタイトルの既存ラベルに寄せた件数
+      - errors = [{"type", "id", "position", "error"}, ...]
+    """
+    errors: list[dict] = []
+
+    def fail(record_type: str, position: int, record_id: str | None, message: str) -> None:
+        errors.append({"type": record_type, "id": record_id, "position": position, "error": message})
+
+    # ---- バッチ外を指す参照は、種類ごとに1回のIN句でまとめて確認する ----
+    label_refs = {item.label_id for _, item in projects + tasks if item.label_id}
+    project_refs = {item.project_id for _, item in tasks if item.project_id}
+    parent_refs = {item.parent_task_id for _, item in tasks if item.parent_task_id}
+
+    label_id_by_title = {
+        title: label_id
+        for label_id, title in db.query(Label.id, Label.title).filter(Label.user_id == user_id)
+    }
+    existing_label_ids = set(label_id_by_title.values()) & label_refs
+    outside_projects = project_refs - {item.id for _, item in projects}
+    existing_project_ids = (
+        {
+            row.id
+            for row in db.query(Project.id).filter(
+                Project.user_id == user_id,
+                Project.id.in_(outside_projects),
+            )
+        }
+        if outside_projects
+        else set()
+    )
+    outside_parents = parent_refs - {item.id for _, item in tasks}
+    existing_task_ids = (
+        {
+            row.id
+            for row in db.query(Task.id).filter(
+                Task.user_id == user_id,
+                Task.id.in_(outside_parents),
+            )
+        }
+        if outside_parents
+        else set()
+    )
+
+    # ---- labels: 同じタイトルが既にあればそれを使う ----
+    label_map: dict[str, str] = {}
+    label_rows = []
+    matched_labels = 0
+    for position, item in labels:
+        if item.id in label_map:
+            fail("label", position, item.id, "duplicate id")
+            continue
+        existing_id = label_id_by_title.get(item.title)
+        if existing_id:
+            label_map[item.id] = existing_id
+            matched_labels += 1
+            continue
+        new_id = _new_id("label")
+        label_map[item.id] = new_id
+        label_id_by_title[item.title] = new_id
+        label_rows.append((
+            {"type": "label", "id": item.id, "position": position},
+            {
+                "id": new_id,
+                "user_id": user_id,
+                "title": item.title,
+                "color": item.color,
+                **_optional_timestamps(item, "created_at"),
+            },
+        ))
+
+    def resolve_label(label_id: str | None):
+        if label_id is None:
+            return True, None
+        if label_id in label_map:
+            return True, label_map[label_id]
+        if label_id in existing_label_ids:
+            return True, label_id
+        return False, None
+
+    # ---- projects ----
+    project_map: dict[str, str] = {}
+    project_rows = []
+    for position, item in projects:
+        if item.id in project_map:
+            fail("project", position, item.id, "duplicate id")
+            continue
+        ok, label_id = resolve_label(item.label_id)
+        if not ok:
+            fail("project", position, item.id, "unknown label_id")
+            continue
+        new_id = _new_id("proj")
+        project_map[item.id] = new_id
+        project_rows.append((
+            {"type": "project", "id": item.id, "position": position},
+            {
+                "id": new_id,
+                "user_id": user_id,
+                "title": item.title,
+                "label_id": label_id,
+                "current_order_index": item.current_order_index,
+                **_optional_timestamps(item, "created_at", "updated_at"),
+            },
+        ))
+
+    # ---- tasks: まず単体で参照を確認し、その後 parent の連鎖を1パスで検証する ----
+    candidates: dict[str, tuple[int, TaskImport, str | None, str | None]] = {}
+    for position, item in tasks:
+        if item.id in candidates:
+            fail("task", position, item.id, "duplicate id")
+            continue
+        ok, label_id = resolve_label(item.label_id)
+        if not ok:
+            fail("task", position, item.id, "unknown label_id")
+            continue
+        project_id = None
+        if item.project_id is not None:
+            project_id = project_map.get(item.project_id)
+            if project_id is None and item.project_id in existing_project_ids:
+                project_id = item.project_id
+            if project_id is None:
+                fail("task", position, item.id, "unknown project_id")
+                continue
+        candidates[item.id] = (position, item, label_id, project_id)
+
+    # 親が「なし / 既存タスク / 有効なバッチ内タスク」の場合だけ有効（循環は無効）
+    valid: dict[str, bool] = {}
+    for client_id in candidates:
+        path: list[str] = []
+        on_path: set[str] = set()
+        current = client_id
+        while True:
+            if current in valid:
+                result = valid[current]
+                break
+            if current in on_path:
+                result = False
+                break
+            path.append(current)
+            on_path.add(current)
+            parent = candidates[current][1].parent_task_id
+            if parent is None or parent in existing_task_ids:
+                result = True
+                break
+            if parent not in candidates:
+                result = False
+                break
+            current = parent
+        for visited in path:
+            valid[visited] = result
+
+    task_map = {
+        client_id: _new_id("task")
+        for client_id in candidates
+        if valid[client_id]
+    }
+    # バッチ内の親からの深さ（親を子より先に INSERT して、親の失敗を子に伝えるため）
+    depth: dict[str, int] = {}
+    for client_id in task_map:
+        path = []
+        current = client_id
+        while current in task_map and current not in depth:
+            path.append(current)
+            current = candidates[current][1].parent_task_id
+        level = depth.get(current, -1)
+        for visited in reversed(path):
+            level += 1
+            depth[visited] = level
+    task_rows = []
+    for client_id, (position, item, label_id, project_id) in candidates.items():
+        if not valid[client_id]:
+            fail("task", position, client_id, "invalid parent_task_id")
+            continue
+        parent_id = item.parent_task_id
+        if parent_id is not None:
+            parent_id = task_map.get(parent_id, parent_id)
+        task_rows.append((
+            {"type": "task", "id": client_id, "position": position},
+            {
+                "id": task_map[client_id],
+                "user_id": user_id,
+                "title": item.title,
+                "project_id": project_id,
+                "label_id": label_id,
+                "parent_task_id": parent_id,
+                "order_index": item.order_index,
+                "memo": item.memo,
+                "completed": item.completed,
+                "completed_at": item.completed_at,
+                "is_fixed": item.is_fixed,
+                "is_group": item.is_group,
+                **_optional_timestamps(item, "created_at", "updated_at"),
+            },
+        ))
+
+    task_rows.sort(key=lambda row: depth[row[0]["id"]])
+
+    failed_ids: set[str] = set()
+    inserted = {
+        "labels": _insert_chunks(db, user_id, Label, label_rows, errors, failed_ids),
+        "projects": _insert_chunks(db, user_id, Project, project_rows, errors, failed_ids, ("label_id",)),
+        "tasks": _insert_chunks(
+            db, user_id, Task, task_rows, errors, failed_ids, ("label_id", "project_id", "parent_task_id")
+        ),
+    }
+    return inserted, matched_labels, errors
@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
 
+from database import SHARDED
 from models import User
+from .shards import assign_user_shard
 
 
 def get_user_by_email(db: Session, email: str) -> User | None:
@@ -14,6 +16,10 @@ def get_user_by_id(db: Session, user_id: str) -> User | None:
 def create_user(db: Session, email: str, password_hash: str) -> User:
     user = User(email=email, password_hash=password_hash)
     db.add(user)
+    if SHARDED:
+        # id はフラッシュ時に決まる。対応表の行も同じトランザクションで入れる
+        db.flush()
+        assign_user_shard(db, user.id)
     db.commit()
     db.refresh(user)
     return user
@@ -0,0 +1,67 @@
+# crud/versions.py
+from sqlalchemy import insert as sa_insert, literal, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from models.data_version import UserDataVersion
+from models.tombstone import Tombstone
+
+# commit 後に変更通知（events.py）へ渡す {user_id: version} を入れておく session.info のキー
+CHANGED_VERSIONS_KEY = "changed_data_versions"
+
+
+def get_data_version(db: Session, user_id: str) -> int:
+    """まだ一度も書き込みがないユーザーは 0。"""
+    version = (
+        db.query(UserDataVersion.version)
+        .filter(UserDataVersion.user_id == user_id)
+        .scalar()
+    )
+    return version or 0
+
+
+def bump_data_version(db: Session, user_id: str) -> int:
+    """
+    書き込みと同じトランザクション内で、行を書き換える前に呼ぶ。
+    行がなければ 1 で作り、あれば +1 する（1文で完結）。
+
+    return: 新しい版数。書き込む行の change_seq にはこの値を入れる。
+    """
+    stmt = insert(UserDataVersion).values(user_id=user_id, version=1)
+    version = db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[UserDataVersion.user_id],
+            set_={"version": UserDataVersion.version + 1},
+        ).returning(UserDataVersion.version)
+    ).scalar_one()
+    db.info.setdefault(CHANGED_VERSIONS_KEY, {})[user_id] = version
+    return version
+
+
+def record_tombstones(db: Session, user_id: str, record_type: str, record_ids, change_seq: int) -> None:
+    """削除するレコードのIDを記録する（IDが手元にある場合）。"""
+    rows = [
+        {"user_id": user_id, "record_type": record_type, "record_id": record_id, "change_seq": change_seq}
+        for record_id in record_ids
+    ]
+    if rows:
+        db.execute(sa_insert(Tombstone), rows)
+
+
+def record_tombstones_from(db: Session, user_id: str, record_type: str, id_query, change_seq: int) -> None:
+    """
+    削除対象のIDを返す SELECT（1列）から INSERT ... SELECT で記録する。
+    ID を Python 側に読み込まずに1文で済ませる（DELETE の直前に同じ条件で呼ぶ）。
+    """
+    source = select(
+        literal(user_id),
+        literal(record_type),
+        id_query.subquery().c[0],
+        literal(change_seq),
+    )
+    db.execute(
+        sa_insert(Tombstone).from_select(
+            ["user_id", "record_type", "record_id", "change_seq"],
+            source,
+        )
+    )
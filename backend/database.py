@@ -1,24 +1,292 @@
 # database.py
+import logging
+import os
+import time
+from contextvars import ContextVar
 from pathlib import Path
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.sql.util import find_tables
+from starlette.concurrency import run_in_threadpool
+
+import metrics
 
 # =========================
 # データベース接続URL
 # =========================
 # SQLiteを使用（同じディレクトリに growth_road.db を作成）
-DATABASE_URL = "sqlite:///./growth_road.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./growth_road.db")
+
+# =========================
+# 実行モード
+# =========================
+# "sync"  → 従来どおり Session をスレッドプールで使う（デフォルト）
+# "async" → AsyncSession（aiosqlite）でイベントループ上で処理する
+DB_MODE = os.getenv("DB_MODE", "sync")
+if DB_MODE not in ("sync", "async"):
+    raise RuntimeError(f"DB_MODE must be 'sync' or 'async', got {DB_MODE!r}")
+
+# =========================
+# ストレージプロファイル
+# =========================
+# "default"    → 従来どおり（ロールバックジャーナル、接続ごとの設定なし、読み書き同じプール）
+# "production" → WAL + 接続時PRAGMA、読み取り専用プールと単一の書き込み接続に分離
+STORAGE_PROFILES = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,  # ms
+        "mmap_size": 256 * 1024 * 1024,  # bytes
+        "cache_size": -64 * 1024,  # 負数は KiB 指定（= 64MiB）
+        "cached_statements": 512,  # sqlite3 のステートメントキャッシュ（デフォルト128）
+        "read_pool_size": 8,
+    },
+}
+STORAGE_PROFILE = os.getenv("STORAGE_PROFILE", "default")
+if STORAGE_PROFILE not in STORAGE_PROFILES:
+    raise RuntimeError(
+        f"STORAGE_PROFILE must be one of {sorted(STORAGE_PROFILES)}, got {STORAGE_PROFILE!r}"
+    )
+
+# 個別の値は環境変数で上書きできる（例: SQLITE_BUSY_TIMEOUT=10000）。
+# default プロファイルでも効き、指定したものだけが接続時の PRAGMA になる
+storage_settings = dict(STORAGE_PROFILES[STORAGE_PROFILE])
+for _key in ("busy_timeout", "mmap_size", "cache_size", "cached_statements", "read_pool_size"):
+    _override = os.getenv(f"SQLITE_{_key.upper()}")
+    if _override is not None:
+        storage_settings[_key] = int(_override)
+
+SPLIT_READ_WRITE = STORAGE_PROFILE != "default"
+if not SPLIT_READ_WRITE and os.getenv("SQLITE_READ_POOL_SIZE") is not None:
+    raise RuntimeError("SQLITE_READ_POOL_SIZE needs a STORAGE_PROFILE with a separate read pool")
+
+# =========================
+# シャーディング（任意）
+# =========================
+# DB_SHARDS=0（デフォルト）→ 従来どおり DATABASE_URL の1ファイルにすべて置く
+# DB_SHARDS=N → DATABASE_URL は users と user_shards（ユーザー → シャードの対応表）を持つ
+#   ディレクトリになり、ほかのテーブル（ラベル・プロジェクト・タスク・版数・削除記録）は
+#   ユーザーごとに DB_SHARD_DIR/shard-{i}.db のどれかに置く。
+#   SQLite の書き込みはファイルごとに1つずつなので、別のシャードのユーザー同士は待ち合わない。
+# 対応表に行がないユーザー（シャーディング前からのユーザー）のデータは DATABASE_URL に残る。
+# ユーザーの割り当て直しは tools/rebalance_shards.py で行う
+DB_SHARDS = int(os.getenv("DB_SHARDS", "0"))
+DB_SHARD_DIR = os.getenv("DB_SHARD_DIR", "./shards")
+SHARDED = DB_SHARDS > 0
+DIRECTORY_TABLES = frozenset({"users", "user_shards"})
+
+# =========================
+# SQL の計測
+# =========================
+# この時間（ms）以上かかった SQL をログに出す（0 で無効）。パラメータの値は出さない
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "100"))
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+# 接続時の PRAGMA 設定
+# =========================
+# 新しい接続が作られるたびに実行される（プール済みの接続には再実行しない）
+# storage_settings にある項目だけを設定する
+PRAGMA_KEYS = ("journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size")
+
+
+def _apply_pragmas(engine, read_only: bool) -> None:
+    pragmas = [
+        f"PRAGMA {key}={storage_settings[key]}"
+        for key in PRAGMA_KEYS
+        # journal_mode はDBファイルに永続化されるので書き込み側だけで設定する
+        if key in storage_settings and not (read_only and key == "journal_mode")
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+# すべてのエンジン（読み書き・async の sync_engine・ツールが作るもの）の SQL を計測する。
+# リクエスト中なら metrics の SqlStats に件数・時間・文を足す（N+1 の検出は metrics 側）
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = metrics.current_sql_stats()
+    if stats is not None:
+        stats.add(statement, elapsed)
+    if SQL_SLOW_QUERY_MS and elapsed * 1000 >= SQL_SLOW_QUERY_MS:
+        logger.warning(
+            "slow query (%.1f ms): %s [%s redacted]",
+            elapsed * 1000,
+            " ".join(statement.split())[:1000],
+            _describe_parameters(parameters, executemany),
+        )
+
+
+@event.listens_for(Engine, "handle_error")
+def _forget_failed_query(exception_context):
+    # 失敗した文には after_cursor_execute が来ないので、開始時刻だけ捨てる
+    conn = exception_context.connection
+    if exception_context.execution_context is not None and conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+
+
+def _describe_parameters(parameters, executemany: bool) -> str:
+    # 値そのもの（メールアドレス・パスワードハッシュ・メモなど）はログに残さない
+    if executemany:
+        return f"{len(parameters)} parameter sets"
+    return f"{len(parameters or ())} parameters"
+
+
+def _connect_args() -> dict:
+    # check_same_thread=False は
+    # FastAPIのようなマルチスレッド環境でSQLiteを使うために必要
+    args = {"check_same_thread": False}  # SQLite専用設定
+    if "cached_statements" in storage_settings:
+        args["cached_statements"] = storage_settings["cached_statements"]
+    return args
+
+
+def _timed_pool_class(url: str, pool_name: str):
+    # ドライバの既定のプール（QueuePool / AsyncAdaptedQueuePool など）に、
+    # 接続を借りるまでの待ち時間の計測だけを足す
+    parsed = make_url(url)
+    base = parsed.get_dialect().get_pool_class(parsed)
+
+    class TimedPool(base):
+        def connect(self):
+            started = time.perf_counter()
+            try:
+                return super().connect()
+            finally:
+                metrics.pool_checkout_wait.observe((pool_name,), time.perf_counter() - started)
+
+    return TimedPool
+
+
+def _engine_kwargs(read_only: bool, url: str = DATABASE_URL, pool_name: str | None = None) -> dict:
+    kwargs = {"poolclass": _timed_pool_class(url, pool_name or ("read" if read_only else "write"))}
+    if not SPLIT_READ_WRITE:
+        return kwargs
+    if read_only:
+        size = storage_settings["read_pool_size"]
+        return {**kwargs, "pool_size": size, "max_overflow": 0}
+    # SQLiteの書き込みは同時に1つだけなので、書き込み用の接続も1本に絞る
+    return {**kwargs, "pool_size": 1, "max_overflow": 0}
+
 
 # =========================
 # エンジン作成
 # =========================
-# SQLAlchemyがDBと通信するためのエンジン
-# check_same_thread=False は
-# FastAPIのようなマルチスレッド環境でSQLiteを使うために必要
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}  # SQLite専用設定
-)
+def _create_engines(url: str, pool_prefix: str = "") -> dict:
+    """
+    url のDBへの書き込み用・読み取り用エンジン（DB_MODE=async なら async 版も）を作る。
+
+    return: {"write", "read", "async_write", "async_read"} → Engine / AsyncEngine
+      - 読み書きを分けないプロファイルでは read は write と同じエンジン
+      - async_* は DB_MODE=async のときだけ
+    """
+    engines = {}
+    for read_only in (False, True):
+        role = "read" if read_only else "write"
+        if read_only and not SPLIT_READ_WRITE:
+            engines[role] = engines["write"]
+            continue
+        engines[role] = create_engine(
+            url,
+            connect_args=_connect_args(),
+            **_engine_kwargs(read_only=read_only, url=url, pool_name=pool_prefix + role),
+        )
+        _apply_pragmas(engines[role], read_only=read_only)
+        metrics.register_engine(pool_prefix + role, engines[role])
+
+    # aiosqlite / greenlet は async モードでのみ必要なので、ここで遅延 import する
+    if DB_MODE == "async":
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        async_url = url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+        for read_only in (False, True):
+            role = "async_read" if read_only else "async_write"
+            if read_only and not SPLIT_READ_WRITE:
+                engines[role] = engines["async_write"]
+                continue
+            engines[role] = create_async_engine(
+                async_url,
+                connect_args=_connect_args(),
+                **_engine_kwargs(read_only=read_only, url=async_url, pool_name=pool_prefix + role),
+            )
+            _apply_pragmas(engines[role].sync_engine, read_only=read_only)
+            metrics.register_engine(pool_prefix + role, engines[role].sync_engine)
+    return engines
+
+
+def shard_url(shard: int) -> str:
+    return f"sqlite:///{Path(DB_SHARD_DIR) / f'shard-{shard}.db'}"
+
+
+# SQLAlchemyがDBと通信するためのエンジン（書き込み用）と、
+# 一覧系エンドポイント用の読み取り専用エンジン（default プロファイルでは engine と共用）。
+# シャーディング時はディレクトリ（と、対応表にないユーザーのデータ）を持つ
+main_engines = _create_engines(DATABASE_URL)
+engine = main_engines["write"]
+read_engine = main_engines["read"]
+
+# シャードごとのエンジン（DB_SHARDS=0 なら空）。/metrics のプール名は "shard{i}_write" など
+if SHARDED:
+    Path(DB_SHARD_DIR).mkdir(parents=True, exist_ok=True)
+shard_engines = [_create_engines(shard_url(shard), f"shard{shard}_") for shard in range(DB_SHARDS)]
+
+
+def data_shards() -> list[int | None]:
+    """データを置きうる場所の一覧（None = DATABASE_URL）。全ユーザーにまたがる掃除などで使う。"""
+    return [None, *range(DB_SHARDS)]
+
+
+# このリクエストのユーザーのシャード（認証の依存関係が設定する。None = DATABASE_URL）
+current_shard: ContextVar[int | None] = ContextVar("current_shard", default=None)
+
+
+def _uses_directory(mapper, clause) -> bool:
+    if mapper is not None:
+        return mapper.local_table.name in DIRECTORY_TABLES
+    return clause is not None and any(table.name in DIRECTORY_TABLES for table in find_tables(clause))
+
+
+class ShardRoutingSession(Session):
+    """
+    DB_SHARDS > 0 のときのセッション。users / user_shards への文は DATABASE_URL へ、
+    それ以外はユーザーのシャードへ送る（接続は最初に使うときに決まる）。
+
+    シャードは session.info["shard"]、なければ current_shard で決まる。
+    session.info["role"] は使うエンジン（"write" / "read" / "async_write" / "async_read"）。
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        role = self.info.get("role", "write")
+        if _uses_directory(mapper, clause):
+            engines = main_engines
+        else:
+            shard = self.info["shard"] if "shard" in self.info else current_shard.get()
+            engines = main_engines if shard is None else shard_engines[shard]
+        # AsyncSession の中の同期セッションには AsyncEngine の sync_engine を返す
+        return getattr(engines[role], "sync_engine", engines[role])
+
 
 # =========================
 # セッション作成
@@ -26,12 +294,51 @@ engine = create_engine(
 # DB操作用のセッションを生成するファクトリ
 # autocommit=False → 手動でcommitする
 # autoflush=False → 明示的にflushするまでSQLを送らない
+# シャーディング時は bind の代わりに ShardRoutingSession が文ごとにエンジンを選ぶ
+def _session_binding(role: str) -> dict:
+    if SHARDED:
+        return {"info": {"role": role}}
+    return {"bind": main_engines[role]}
+
+
 SessionLocal = sessionmaker(
+    class_=ShardRoutingSession if SHARDED else Session,
     autocommit=False,
     autoflush=False,
-    bind=engine
+    **_session_binding("write"),
 )
 
+ReadSessionLocal = sessionmaker(
+    class_=ShardRoutingSession if SHARDED else Session,
+    autocommit=False,
+    autoflush=False,
+    **_session_binding("read"),
+)
+
+# =========================
+# 非同期セッション（DB_MODE=async のときだけ作る）
+# =========================
+async_engine = main_engines.get("async_write")
+async_read_engine = main_engines.get("async_read")
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+if DB_MODE == "async":
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    # expire_on_commit=False → commit後に属性アクセスで暗黙のI/Oが起きないようにする
+    AsyncSessionLocal = async_sessionmaker(
+        sync_session_class=ShardRoutingSession if SHARDED else Session,
+        autoflush=False,
+        expire_on_commit=False,
+        **_session_binding("async_write"),
+    )
+    AsyncReadSessionLocal = async_sessionmaker(
+        sync_session_class=ShardRoutingSession if SHARDED else Session,
+        autoflush=False,
+        expire_on_commit=False,
+        **_session_binding("async_read"),
+    )
+
 # =========================
 # モデルの基底クラス
 # =========================
@@ -44,9 +351,81 @@ Base = declarative_base()
 # =========================
 # 各リクエストごとにDBセッションを生成し
 # 処理終了後に必ずクローズする
-def get_db():
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def get_sync_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+# ルーターの db 引数の型（DB_MODE によってどちらかになる）
+DbSession = Session | AsyncSession
+
+# ルーターはこの get_db / get_read_db を使う（DB_MODE で Session / AsyncSession が切り替わる）
+# get_read_db は一覧などの読み取り専用エンドポイント向け
+get_db = get_async_db if DB_MODE == "async" else get_sync_db
+get_read_db = get_async_read_db if DB_MODE == "async" else get_sync_read_db
+
+
+def _run_and_release(db: Session, fn, *args, **kwargs):
+    # 呼び出しが終わったら接続をすぐプールへ返す。
+    # close() は読み込み済みの属性を残したままオブジェクトを切り離すだけなので、
+    # 戻り値はそのままレスポンスに使える。
+    # （接続を握ったままスレッド待ちになると、プールが詰まってしまう）
+    try:
+        return fn(db, *args, **kwargs)
+    finally:
+        db.close()
+
+
+def begin_snapshot(db: Session) -> None:
+    """
+    このあとの SELECT を1つの読み取りトランザクション（同じスナップショット）で読む。
+    pysqlite / aiosqlite は SELECT だけでは BEGIN を出さないので明示的に始める。
+    トランザクションはセッションの close（rollback）で終わる。
+    """
+    db.connection().exec_driver_sql("BEGIN")
+
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    同期のCRUD関数 fn(session, *args, **kwargs) を実行する。
+
+    - AsyncSession: run_sync でイベントループ上（aiosqlite経由）で実行
+    - Session: スレッドプールで実行（従来の sync ハンドラと同じ挙動）
+
+    どちらも実行後にセッションを close して接続をプールへ返す。
+    かかった時間は /metrics のリクエスト段階 "query" に数える。
+    """
+    with metrics.stage("query"):
+        if isinstance(db, Session):
+            submitted = time.perf_counter()
+
+            def run_in_thread():
+                metrics.threadpool_wait.observe((), time.perf_counter() - submitted)
+                return _run_and_release(db, fn, *args, **kwargs)
+
+            return await run_in_threadpool(run_in_thread)
+        try:
+            return await db.run_sync(fn, *args, **kwargs)
+        finally:
+            await db.close()
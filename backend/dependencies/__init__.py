@@ -1,6 +1,26 @@
 from .auth import (
+    authenticate_token,
     create_access_token,
     get_current_user_id,
     get_password_hash,
+    get_stream_user_id,
+    identity_cache,
     verify_password,
 )
+
+from .password_hashing import (
+    PASSWORD_HASH_RETRY_AFTER_SECONDS,
+    PasswordHashingBusy,
+    check_password,
+    hash_password,
+    password_hashing_stats,
+    shutdown_password_hashing,
+)
+
+from .conditional import (
+    etag_matches,
+    get_data_etag,
+    make_etag,
+    not_modified,
+    set_etag,
+)
@@ -3,13 +3,19 @@ import hashlib
 import hmac
 import json
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
-from database import get_db
+import crud
+import metrics
+from database import SHARDED, DbSession, current_shard, get_read_db, run_db
 from models.user import User
 
 # Dev-only fallback. In production, set AUTH_SECRET_KEY in environment variables.
@@ -17,6 +23,10 @@ AUTH_SECRET_KEY = os.getenv("AUTH_SECRET_KEY", "dev-only-secret-change-me")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 JWT_ALGORITHM = "HS256"
 PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "600000"))
+# Verified tokens are remembered for at most this long (and never past their exp).
+# IDENTITY_CACHE_SIZE=0 disables the cache.
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "4096"))
+IDENTITY_CACHE_TTL_SECONDS = int(os.getenv("IDENTITY_CACHE_TTL_SECONDS", "300"))
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
@@ -115,18 +125,86 @@ def _decode_access_token(token: str) -> dict:
         ) from exc
 
 
-def get_current_user_id(
-    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
-    db: Session = Depends(get_db),
-) -> str:
-    if credentials is None or credentials.scheme.lower() != "bearer":
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Bearer token is required",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+def _user_exists(db: Session, user_id: str) -> bool:
+    return db.query(User.id).filter(User.id == user_id).first() is not None
+
+
+class IdentityCache:
+    """
+    LRU of token -> user_id for tokens whose signature, exp and user have
+    already been checked. Entries expire after ttl_seconds or at the token's
+    exp, whichever comes first.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: int):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            user_id, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return user_id
+
+    def put(self, token: str, user_id: str, exp: int) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = min(time.time() + self.ttl_seconds, exp)
+        with self._lock:
+            self._entries[token] = (user_id, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: str) -> None:
+        with self._lock:
+            stale = [token for token, (uid, _) in self._entries.items() if uid == user_id]
+            for token in stale:
+                del self._entries[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+identity_cache = IdentityCache(IDENTITY_CACHE_SIZE, IDENTITY_CACHE_TTL_SECONDS)
+
+
+@event.listens_for(User, "after_delete")
+def _forget_deleted_user(mapper, connection, target):
+    identity_cache.invalidate_user(target.id)
 
-    payload = _decode_access_token(credentials.credentials)
+
+async def authenticate_token(token: str, db: DbSession) -> str:
+    """アクセストークンを検証してユーザーIDを返す（失敗したら 401）。"""
+    cached_user_id = identity_cache.get(token)
+    if cached_user_id is not None:
+        await _select_user_shard(cached_user_id, db)
+        return cached_user_id
+
+    payload = _decode_access_token(token)
     user_id = payload.get("sub")
     if not user_id:
         raise HTTPException(
@@ -135,7 +213,7 @@ def get_current_user_id(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    exists = db.query(User.id).filter(User.id == user_id).first()
+    exists = await run_db(db, _user_exists, user_id)
     if not exists:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -143,4 +221,52 @@ def get_current_user_id(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    identity_cache.put(token, user_id, payload["exp"])
+    await _select_user_shard(user_id, db)
     return user_id
+
+
+async def _select_user_shard(user_id: str, db: DbSession) -> None:
+    # シャーディング時は、このリクエストのセッションの文をユーザーのシャードへ送る
+    if not SHARDED:
+        return
+    known, shard = crud.cached_user_shard(user_id)
+    if not known:
+        shard = await crud.aio.get_user_shard(db, user_id)
+    current_shard.set(shard)
+
+
+async def get_current_user_id(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+    db: DbSession = Depends(get_read_db),
+) -> str:
+    if credentials is None or credentials.scheme.lower() != "bearer":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Bearer token is required",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    with metrics.stage("auth"):
+        return await authenticate_token(credentials.credentials, db)
+
+
+async def get_stream_user_id(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+    access_token: str | None = Query(default=None),
+    db: DbSession = Depends(get_read_db),
+) -> str:
+    """
+    ストリーミング用（/api/events）。ブラウザの EventSource はヘッダーを付けられないので、
+    Authorization ヘッダーがなければ ?access_token= のトークンを使う。
+    """
+    if credentials is not None and credentials.scheme.lower() == "bearer":
+        with metrics.stage("auth"):
+            return await authenticate_token(credentials.credentials, db)
+    if access_token:
+        with metrics.stage("auth"):
+            return await authenticate_token(access_token, db)
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Bearer token is required",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
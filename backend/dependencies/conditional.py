@@ -0,0 +1,52 @@
+# dependencies/conditional.py
+"""
+Conditional GET for list endpoints.
+
+The ETag is derived from the user's data version (bumped by every write in
+crud/*), so checking If-None-Match costs one primary-key lookup and a 304
+skips the list query and serialization entirely.
+"""
+import hashlib
+
+from fastapi import Depends, Request, Response
+
+import crud
+from database import DbSession, get_read_db
+from .auth import get_current_user_id
+
+# ブラウザは認証ヘッダーに関係なく URL 単位でキャッシュするので、
+# 別ユーザーでログインし直したときに版数だけで 304 にならないようユーザーも混ぜる
+CACHE_HEADERS = {"Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+
+def make_etag(user_id: str, version: int) -> str:
+    user_tag = hashlib.sha256(user_id.encode()).hexdigest()[:12]
+    return f'"v{version}-{user_tag}"'
+
+
+async def get_data_etag(
+    db: DbSession = Depends(get_read_db),
+    current_user_id: str = Depends(get_current_user_id),
+) -> str:
+    version = await crud.aio.get_data_version(db, current_user_id)
+    return make_etag(current_user_id, version)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match は弱い比較（W/ の有無は無視する）
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, **CACHE_HEADERS})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers.update(CACHE_HEADERS)
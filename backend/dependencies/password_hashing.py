@@ -0,0 +1,89 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .auth import get_password_hash, verify_password
+
+# PBKDF2 is CPU-bound, so it runs in its own process pool instead of the
+# request threadpool. At most WORKERS hashes run at once and at most
+# QUEUE_SIZE more wait; anything beyond that is rejected immediately.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "16"))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", "1"))
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the hashing queue is full."""
+
+
+_executor: ProcessPoolExecutor | None = None
+_lock = threading.Lock()
+_in_flight = 0
+_stats = {
+    "completed": 0,
+    "rejected": 0,
+    "total_seconds": 0.0,
+    "max_seconds": 0.0,
+}
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+        return _executor
+
+
+async def _run(fn, *args):
+    global _in_flight
+    with _lock:
+        if _in_flight >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE:
+            _stats["rejected"] += 1
+            raise PasswordHashingBusy()
+        _in_flight += 1
+
+    started = time.perf_counter()
+    try:
+        return await asyncio.wrap_future(_get_executor().submit(fn, *args))
+    finally:
+        elapsed = time.perf_counter() - started
+        with _lock:
+            _in_flight -= 1
+            _stats["completed"] += 1
+            _stats["total_seconds"] += elapsed
+            _stats["max_seconds"] = max(_stats["max_seconds"], elapsed)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(get_password_hash, password)
+
+
+async def check_password(plain_password: str, password_hash: str) -> bool:
+    return await _run(verify_password, plain_password, password_hash)
+
+
+def password_hashing_stats() -> dict:
+    with _lock:
+        completed = _stats["completed"]
+        return {
+            "workers": PASSWORD_HASH_WORKERS,
+            "queue_capacity": PASSWORD_HASH_QUEUE_SIZE,
+            "in_flight": _in_flight,
+            "queue_depth": max(0, _in_flight - PASSWORD_HASH_WORKERS),
+            "completed": completed,
+            "rejected": _stats["rejected"],
+            # Latency includes time spent waiting in the queue.
+            "avg_latency_ms": (_stats["total_seconds"] / completed * 1000) if completed else 0.0,
+            "max_latency_ms": _stats["max_seconds"] * 1000,
+        }
+
+
+def shutdown_password_hashing() -> None:
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,218 @@
+# events.py
+"""
+Per-user change notifications for the live feed (GET /api/events).
+
+Every write in crud/* bumps the user's data version (crud/versions.py) and
+remembers it on the session. After the transaction commits, the new version is
+handed to the configured backend, which wakes the user's open streams. A stream
+then reads the actual delta with `crud.list_changes(cursor)`, so a notification
+only carries (user_id, version) and bursts of writes collapse into one event.
+
+Backends (EVENTS_BACKEND):
+
+- "memory": deliver inside this process only (single worker).
+- "db":     also poll `user_data_versions` for the users subscribed in this
+            process every EVENTS_POLL_INTERVAL_SECONDS, so writes made by other
+            workers sharing the database reach this worker's streams too.
+- "package.module:Class": any class with the same interface
+            (`__init__(broker)`, `publish`, `async start`, `async stop`),
+            e.g. one backed by Redis pub/sub.
+"""
+import asyncio
+import importlib
+import logging
+import os
+import threading
+from collections import defaultdict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from crud.shards import group_users_by_shard
+from crud.versions import CHANGED_VERSIONS_KEY
+from database import ReadSessionLocal
+from models.data_version import UserDataVersion
+
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "memory")
+EVENTS_POLL_INTERVAL_SECONDS = float(os.getenv("EVENTS_POLL_INTERVAL_SECONDS", "1"))
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """1本のストリームの購読。通知はまとめて「最新の版数」だけを覚える。"""
+
+    def __init__(self, user_id: str, loop: asyncio.AbstractEventLoop):
+        self.user_id = user_id
+        self.loop = loop
+        self.version = 0
+        self._changed = asyncio.Event()
+
+    def notify(self, version: int) -> None:
+        # イベントループのスレッドで呼ばれる
+        if version > self.version:
+            self.version = version
+            self._changed.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """通知が来たら True、timeout 秒何もなければ False。"""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._changed.clear()
+        return True
+
+
+class ChangeBroker:
+    """このプロセス内の購読者に、ユーザーごとのデータ版数の更新を配る。"""
+
+    def __init__(self):
+        self._subscribers: dict[str, set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: str) -> Subscription:
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def subscribed_users(self) -> list[str]:
+        with self._lock:
+            return list(self._subscribers)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def dispatch(self, user_id: str, version: int) -> None:
+        # commit したスレッド（スレッドプール等）から呼ばれてもよい
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.notify, version)
+            except RuntimeError:
+                # ループが閉じている（シャットダウン中）
+                pass
+
+
+class MemoryBackend:
+    """同じプロセス内だけで配る。"""
+
+    def __init__(self, broker: ChangeBroker):
+        self.broker = broker
+
+    def publish(self, user_id: str, version: int) -> None:
+        self.broker.dispatch(user_id, version)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class DatabasePollingBackend(MemoryBackend):
+    """
+    同じプロセス内へはすぐ配り、ほかのワーカーでの書き込みは購読中ユーザーの
+    user_data_versions を定期的に読んで拾う（DB を共有しているので追加の仕組みがいらない）。
+    """
+
+    def __init__(self, broker: ChangeBroker, interval: float = EVENTS_POLL_INTERVAL_SECONDS):
+        super().__init__(broker)
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @staticmethod
+    def _read_versions(user_ids: list[str]) -> list[tuple[str, int]]:
+        db = ReadSessionLocal()
+        try:
+            # シャーディング時は版数がユーザーのシャードにあるので、シャードごとに読む
+            versions = []
+            for shard, shard_user_ids in group_users_by_shard(db, user_ids).items():
+                db.info["shard"] = shard
+                versions += (
+                    db.query(UserDataVersion.user_id, UserDataVersion.version)
+                    .filter(UserDataVersion.user_id.in_(shard_user_ids))
+                    .all()
+                )
+            return versions
+        finally:
+            db.close()
+
+    async def _poll(self) -> None:
+        while True:
+            user_ids = self.broker.subscribed_users()
+            if user_ids:
+                try:
+                    versions = await run_in_threadpool(self._read_versions, user_ids)
+                except Exception:
+                    logger.exception("polling data versions failed")
+                else:
+                    for user_id, version in versions:
+                        self.broker.dispatch(user_id, version)
+            await asyncio.sleep(self.interval)
+
+
+BACKENDS = {
+    "memory": MemoryBackend,
+    "db": DatabasePollingBackend,
+}
+
+
+def _backend_class(name: str):
+    if name in BACKENDS:
+        return BACKENDS[name]
+    if ":" in name:
+        module_name, attr = name.split(":", 1)
+        return getattr(importlib.import_module(module_name), attr)
+    raise ValueError(f"Unknown EVENTS_BACKEND: {name!r} (use {', '.join(BACKENDS)} or module:Class)")
+
+
+broker = ChangeBroker()
+backend = _backend_class(EVENTS_BACKEND)(broker)
+
+
+# =========================
+# commit 後に通知する
+# =========================
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session):
+    changed = session.info.pop(CHANGED_VERSIONS_KEY, None)
+    if not changed:
+        return
+    for user_id, version in changed.items():
+        try:
+            backend.publish(user_id, version)
+        except Exception:
+            logger.exception("publishing change event failed")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(CHANGED_VERSIONS_KEY, None)
+
+
+def stats() -> dict:
+    return {
+        "backend": EVENTS_BACKEND,
+        "subscribers": broker.subscriber_count(),
+    }
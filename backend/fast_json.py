@@ -0,0 +1,116 @@
+# fast_json.py
+"""
+Opt-in fast JSON encoding for large list responses.
+
+By default FastAPI validates every returned ORM object against `response_model`
+(`from_attributes=True`), converts the result to JSON-compatible values and then
+runs `json.dumps`. With FAST_JSON=1 the list endpoints skip that pipeline:
+
+- For plain schemas (no aliases, validators or custom serializers) an encoding
+  plan is compiled once per schema. Rows are copied straight out of the ORM
+  instance `__dict__` (the loaded column values, no instrumented attribute
+  access) into dicts in field order, and the whole list is encoded by
+  pydantic-core in a single `to_json` call. That is the same serializer the
+  default path ends up in, so the bytes are identical.
+- Other schemas go through a cached `TypeAdapter(list[schema])`
+  (validate + `dump_json`, both in pydantic-core).
+
+`benchmarks/bench_json_encoding.py` checks byte identity and reports the
+encode time per 10k tasks for both paths.
+"""
+import os
+import typing
+from functools import lru_cache
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+
+import metrics
+
+FAST_JSON = os.getenv("FAST_JSON", "0") == "1"
+
+
+@lru_cache(maxsize=None)
+def list_adapter(schema) -> TypeAdapter:
+    return TypeAdapter(list[schema])
+
+
+def _nested_list_model(annotation):
+    if typing.get_origin(annotation) is not list:
+        return None
+    (item,) = typing.get_args(annotation) or (None,)
+    if isinstance(item, type) and issubclass(item, BaseModel):
+        return item
+    return None
+
+
+@lru_cache(maxsize=None)
+def _plan(schema):
+    """
+    return: ((フィールド名, 入れ子の list[Model] のモデル or None), ...)
+            そのまま書き出せないスキーマなら None
+    """
+    decorators = schema.__pydantic_decorators__
+    if (
+        decorators.validators
+        or decorators.field_validators
+        or decorators.root_validators
+        or decorators.field_serializers
+        or decorators.model_serializers
+        or decorators.model_validators
+        or decorators.computed_fields
+    ):
+        return None
+
+    plan = []
+    for name, field in schema.model_fields.items():
+        if field.alias not in (None, name) or field.serialization_alias not in (None, name):
+            return None
+        nested = _nested_list_model(field.annotation)
+        if nested is not None and _plan(nested) is None:
+            return None
+        plan.append((name, nested))
+    return tuple(plan)
+
+
+def _plain(obj, plan) -> dict:
+    loaded = obj.__dict__
+    row = {}
+    for name, nested in plan:
+        # 読み込み済みの列は __dict__ にある。ない場合（期限切れ等）だけ通常の属性アクセス
+        value = loaded[name] if name in loaded else getattr(obj, name)
+        if nested is not None:
+            nested_plan = _plan(nested)
+            value = [_plain(item, nested_plan) for item in value]
+        row[name] = value
+    return row
+
+
+def encode_list(schema, items) -> bytes:
+    """items（ORM オブジェクトなど）を list[schema] として JSON バイト列にする。"""
+    plan = _plan(schema)
+    if plan is None:
+        adapter = list_adapter(schema)
+        return adapter.dump_json(adapter.validate_python(items, from_attributes=True))
+    return to_json([_plain(obj, plan) for obj in items])
+
+
+def list_response(schema, items, response: Response):
+    """
+    FAST_JSON が有効なら JSON バイト列の Response を返す。無効ならそのまま items を返す
+    （従来どおり response_model で変換される）。
+
+    Response を直接返すと依存で受け取った response のヘッダーは使われないので、
+    ETag や X-Next-Cursor などはここで引き継ぐ。
+    """
+    if not FAST_JSON:
+        return items
+    headers = {
+        key: value
+        for key, value in response.headers.items()
+        if key != "content-length"
+    }
+    with metrics.stage("encode"):
+        content = encode_list(schema, items)
+    return Response(content=content, media_type="application/json", headers=headers)
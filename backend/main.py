@@ -1,15 +1,32 @@
-from datetime import datetime
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
 from pathlib import Path
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
-from database import engine, Base, SessionLocal
-from dependencies import get_password_hash
+from database import SHARDED, SessionLocal, data_shards, engine, shard_engines
+import crud
+import events
+import metrics
+import migrations
+from dependencies import (
+    get_password_hash,
+    identity_cache,
+    password_hashing_stats,
+    shutdown_password_hashing,
+)
 from models import Label, Project, Task, User
 from routers.auth import router as auth_router
+from routers.bootstrap import router as bootstrap_router
+from routers.events import router as events_router
 from routers.labels import router as labels_router
 from routers.projects import router as projects_router
+from routers.sync import router as sync_router
 from routers.tasks import router as tasks_router
+from routers.transfer import router as transfer_router
 from seed_projects_tasks import seed_projects_tasks_if_needed
 
 import models
@@ -64,13 +81,21 @@ DEFAULT_DEV_USER_EMAIL = "dev@example.com"
 # Dev-only seed credential used only when creating a brand-new local DB.
 DEFAULT_DEV_USER_PASSWORD = "dev-password"
 
+# 削除記録（差分同期用）の保持期間と掃除の間隔。間隔 0 で定期掃除を止める
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+TOMBSTONE_PRUNE_INTERVAL_SECONDS = int(os.getenv("TOMBSTONE_PRUNE_INTERVAL_SECONDS", "3600"))
+
+logger = logging.getLogger(__name__)
+
 def seed_if_new_db():
     db_path = Path("growth_road.db")
     is_new_db = not db_path.exists()
 
-    # Dev-only: no migrations. If schema changes (e.g. auth/user columns added),
-    # delete `backend/growth_road.db` then restart.
-    Base.metadata.create_all(bind=engine)
+    # New tables come from the models; changes to existing tables (columns,
+    # indexes) are applied in place by the versioned steps in migrations.py.
+    migrations.upgrade(engine)
+    for engines in shard_engines:
+        migrations.upgrade(engines["write"])
 
     if not is_new_db:
         return
@@ -84,6 +109,11 @@ def seed_if_new_db():
                 password_hash=get_password_hash(DEFAULT_DEV_USER_PASSWORD),
             )
         )
+        shard = crud.assign_user_shard(db, DEFAULT_DEV_USER_ID) if SHARDED else None
+        # 1つのトランザクションは2つのDBファイルにまたがれないので、
+        # ユーザーと対応表（ディレクトリ）を先に確定させてから、ラベルをそのシャードへ入れる
+        db.commit()
+        db.info["shard"] = shard
 
         labels = [
             Label(
@@ -96,8 +126,6 @@ def seed_if_new_db():
             for item in SEED_LABELS
         ]
         db.add_all(labels)
-
-
         db.commit()
     finally:
         db.close()
@@ -114,24 +142,93 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # ブラウザの JS から読むレスポンスヘッダーは明示して公開する
+    expose_headers=[
+        "X-Tasks-Inserted",
+        "X-Tasks-Updated",
+        "X-Tasks-Deleted",
+        "X-Tasks-Unchanged",
+        "X-Next-Cursor",
+        "X-Tasks-Rebalanced",
+    ],
 )
+# 最後に追加したミドルウェアが一番外側になる（CORS の処理時間も含めて測る）
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(labels_router, prefix="/api")
 app.include_router(projects_router, prefix="/api")
 app.include_router(tasks_router, prefix="/api")
 app.include_router(auth_router, prefix="/api")
+app.include_router(transfer_router, prefix="/api")
+app.include_router(bootstrap_router, prefix="/api")
+app.include_router(sync_router, prefix="/api")
+app.include_router(events_router, prefix="/api")
+
+
+def prune_tombstones_once() -> int:
+    pruned = 0
+    for shard in data_shards():
+        db = SessionLocal(info={"shard": shard})
+        try:
+            pruned += crud.prune_tombstones(db, datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS))
+        finally:
+            db.close()
+    return pruned
+
+
+async def _prune_tombstones_periodically():
+    while True:
+        try:
+            pruned = await run_in_threadpool(prune_tombstones_once)
+            if pruned:
+                logger.info("pruned %d tombstones", pruned)
+        except Exception:
+            logger.exception("tombstone pruning failed")
+        await asyncio.sleep(TOMBSTONE_PRUNE_INTERVAL_SECONDS)
+
+
+_background_tasks: list[asyncio.Task] = []
 
 
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
+    await run_in_threadpool(_seed)
+    await events.backend.start()
+    if TOMBSTONE_PRUNE_INTERVAL_SECONDS > 0:
+        _background_tasks.append(asyncio.create_task(_prune_tombstones_periodically()))
+
+
+def _seed():
     seed_if_new_db()
     db = SessionLocal()
     try:
+        crud.bind_user_shard(db, DEFAULT_DEV_USER_ID)
         seed_projects_tasks_if_needed(db, user_id=DEFAULT_DEV_USER_ID)
     finally:
         db.close()
 
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    for task in _background_tasks:
+        task.cancel()
+    _background_tasks.clear()
+    await events.backend.stop()
+    shutdown_password_hashing()
+
+
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "password_hashing": password_hashing_stats(),
+        "identity_cache": identity_cache.stats(),
+        "next_tasks_cache": crud.flat_order_cache.stats(),
+        "events": events.stats(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,415 @@
+# metrics.py
+"""
+Request metrics in Prometheus text format (GET /metrics).
+
+- MetricsMiddleware (plain ASGI, outermost): per-route latency and response
+  size histograms, request counter by status, in-flight gauge. Routes are
+  labelled by their path template ("/api/tasks/{task_id}"), unmatched paths
+  by "unmatched", so label cardinality stays bounded.
+- TimedRoute (route_class of the /api routers): splits each request into
+  stages observed as http_request_stage_seconds{stage=...}
+    - auth:   get_current_user_id / get_stream_user_id (incl. its user lookup)
+    - query:  database.run_db (incl. waiting for a threadpool thread)
+    - encode: response_model validation + JSON rendering after the endpoint
+              returns, plus explicit `stage("encode")` blocks in endpoints
+  A stage entered while another is active is counted in the outer one, so the
+  stages never overlap.
+- database.py reports pool checkout wait (db_pool_checkout_wait_seconds) and
+  the threadpool queue wait of run_db; pool and threadpool occupancy are read
+  when /metrics is scraped.
+- SQL per request: database.py's cursor event hooks add every statement to
+  the request's SqlStats (count, DB time, statements grouped by shape). A
+  shape seen SQL_REPEAT_THRESHOLD times in one request (N+1) is counted in
+  db_repeated_statements_total and logged once per route and shape. With
+  SQL_STATS_HEADERS=1 responses carry X-DB-Statements / X-DB-Time-Ms /
+  X-DB-Repeated (statements run before the response started; a streamed
+  body's queries only reach the histograms).
+
+Per request this costs a few perf_counter() calls, bisects and lock
+acquisitions; no label values are formatted until scrape time. Set
+METRICS_ENABLED=0 to leave the middleware out entirely.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from fastapi.routing import APIRoute
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# 1リクエストの中で同じ形の SQL がこの回数以上出たら N+1 とみなす
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "5"))
+SQL_STATS_HEADERS = os.getenv("SQL_STATS_HEADERS", "0") == "1"
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+STAGES = ("auth", "query", "encode")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, labels: tuple, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: tuple, labelnames: tuple = ()):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = buckets
+        # labels -> [bucket counts..., +Inf count, sum]（累積しない。書き出すときに足し合わせる）
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        lines = self.header()
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), series):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+requests_total = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+request_duration = Histogram(
+    "http_request_duration_seconds", "Time until the response body was sent.", LATENCY_BUCKETS, ("method", "route")
+)
+response_size = Histogram(
+    "http_response_size_bytes", "Response body size.", SIZE_BUCKETS, ("method", "route")
+)
+requests_in_flight = Gauge("http_requests_in_flight", "Requests currently being handled.")
+stage_duration = Histogram(
+    "http_request_stage_seconds", "Time per request spent in auth / query / encode (/api routes).",
+    LATENCY_BUCKETS, ("method", "route", "stage"),
+)
+threadpool_wait = Histogram(
+    "threadpool_queue_wait_seconds", "Time run_db waited for a threadpool thread (DB_MODE=sync).", WAIT_BUCKETS
+)
+pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent getting a connection from the pool.", WAIT_BUCKETS, ("pool",)
+)
+request_statements = Histogram(
+    "db_statements_per_request", "SQL statements executed per request.", STATEMENT_BUCKETS, ("method", "route")
+)
+request_db_time = Histogram(
+    "db_time_per_request_seconds", "Time spent in SQL cursor execution per request.", LATENCY_BUCKETS, ("method", "route")
+)
+repeated_statements = Counter(
+    "db_repeated_statements_total",
+    "Requests in which one statement shape ran SQL_REPEAT_THRESHOLD times or more (N+1).",
+    ("method", "route"),
+)
+
+_METRICS = (
+    requests_total, request_duration, response_size, requests_in_flight, stage_duration,
+    threadpool_wait, pool_checkout_wait, request_statements, request_db_time, repeated_statements,
+)
+
+# 接続プールを持つエンジン（スクレイプ時に使用中の接続数を読む）
+_engines: dict[str, object] = {}
+
+# リクエストごとの段階別の時間と、いま計測中の段階
+_request_stages: ContextVar[dict | None] = ContextVar("request_stages", default=None)
+_active_stage: ContextVar[str | None] = ContextVar("active_stage", default=None)
+
+# IN (?, ?, ?) や複数行 VALUES の長さの違いは同じ形として扱う
+_PLACEHOLDER_LIST = re.compile(r"\?(?:, \?)+")
+_VALUES_ROWS = re.compile(r"(\([^()]*\))(?:, \1)+")
+_TRANSACTION_CONTROL = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+
+class SqlStats:
+    """1リクエスト（または track_sql のブロック）で実行された SQL の集計。"""
+
+    __slots__ = ("statements", "seconds", "shapes")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        # SQL 文字列 -> 回数（形にまとめるのは repeated() のときだけ）
+        self.shapes: dict[str, int] = {}
+
+    def add(self, statement: str, seconds: float) -> None:
+        self.statements += 1
+        self.seconds += seconds
+        self.shapes[statement] = self.shapes.get(statement, 0) + 1
+
+    def repeated(self, threshold: int = SQL_REPEAT_THRESHOLD) -> dict[str, int]:
+        """threshold 回以上出た形 -> 回数（トランザクション制御文は除く）。"""
+        counts: dict[str, int] = {}
+        for statement, count in self.shapes.items():
+            shape = _VALUES_ROWS.sub(r"\1, ...", _PLACEHOLDER_LIST.sub("?, ...", " ".join(statement.split())))
+            counts[shape] = counts.get(shape, 0) + count
+        return {
+            shape: count
+            for shape, count in counts.items()
+            if count >= threshold and not shape.upper().startswith(_TRANSACTION_CONTROL)
+        }
+
+
+_sql_stats: ContextVar[SqlStats | None] = ContextVar("sql_stats", default=None)
+# 同じ (route, 形) の N+1 は最初の1回だけログに出す
+_logged_repeats: set[tuple[str, str]] = set()
+
+
+def current_sql_stats() -> SqlStats | None:
+    return _sql_stats.get()
+
+
+@contextmanager
+def track_sql():
+    """with track_sql() as stats: の中で実行された SQL を stats に集計する（ツール・計測用）。"""
+    stats = SqlStats()
+    token = _sql_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _sql_stats.reset(token)
+
+
+def register_engine(pool_name: str, engine) -> None:
+    _engines[pool_name] = engine
+
+
+@contextmanager
+def stage(name: str):
+    """
+    with stage("query"): ... の間の時間をリクエストの段階 name に足す。
+    計測中のリクエストの外、または別の段階の中では何もしない。
+    """
+    stages = _request_stages.get()
+    if stages is None or _active_stage.get() is not None:
+        yield
+        return
+    token = _active_stage.set(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages[name] = stages.get(name, 0.0) + time.perf_counter() - started
+        _active_stage.reset(token)
+
+
+class TimedRoute(APIRoute):
+    """
+    エンドポイントが返った時刻を記録し、そこからレスポンスができるまで
+    （response_model の検証と JSON 化）を encode 段階として数える。
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        # 同期関数のエンドポイントはスレッドプールで動くので包まない（encode は数えない）
+        if iscoroutinefunction(endpoint):
+            endpoint = _mark_endpoint_done(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            stages = _request_stages.get()
+            if stages is not None and "endpoint_done" in stages:
+                stages["encode"] = stages.get("encode", 0.0) + time.perf_counter() - stages.pop("endpoint_done")
+            return response
+
+        return timed_handler
+
+
+def _mark_endpoint_done(endpoint):
+    @wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            stages = _request_stages.get()
+            if stages is not None:
+                stages["endpoint_done"] = time.perf_counter()
+
+    return wrapper
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stages: dict = {}
+        sql = SqlStats()
+        token = _request_stages.set(stages)
+        sql_token = _sql_stats.set(sql)
+        state = {"status": 500, "size": 0, "streaming": False}
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                for key, value in message.get("headers", ()):
+                    if key == b"content-type" and value.startswith(b"text/event-stream"):
+                        state["streaming"] = True
+                if SQL_STATS_HEADERS:
+                    message["headers"] = [
+                        *message.get("headers", ()),
+                        (b"x-db-statements", str(sql.statements).encode()),
+                        (b"x-db-time-ms", f"{sql.seconds * 1000:.2f}".encode()),
+                        (b"x-db-repeated", str(len(sql.repeated())).encode()),
+                    ]
+            elif message["type"] == "http.response.body":
+                state["size"] += len(message.get("body", b""))
+            await send(message)
+
+        requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            elapsed = time.perf_counter() - started
+            requests_in_flight.inc(amount=-1)
+            _request_stages.reset(token)
+            _sql_stats.reset(sql_token)
+
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            requests_total.inc((method, path, state["status"]))
+            # SSE は接続している間ずっと続くので、時間とサイズの分布には入れない
+            if not state["streaming"]:
+                request_duration.observe((method, path), elapsed)
+                response_size.observe((method, path), state["size"])
+                if isinstance(route, TimedRoute):
+                    for name in STAGES:
+                        stage_duration.observe((method, path, name), stages.get(name, 0.0))
+            if sql.statements:
+                _observe_sql(method, path, sql)
+
+
+def _observe_sql(method: str, path: str, sql: SqlStats) -> None:
+    request_statements.observe((method, path), sql.statements)
+    request_db_time.observe((method, path), sql.seconds)
+    repeated = sql.repeated()
+    if not repeated:
+        return
+    repeated_statements.inc((method, path))
+    for shape, count in repeated.items():
+        key = (f"{method} {path}", shape)
+        if key in _logged_repeats:
+            continue
+        _logged_repeats.add(key)
+        logger.warning("N+1: the same statement ran %d times in %s %s: %s", count, method, path, shape[:300])
+
+
+def _threadpool_lines() -> list[str]:
+    # anyio の既定のスレッド上限（run_in_threadpool・同期の依存関係が共有する）。イベントループ上で呼ぶ
+    from anyio.to_thread import current_default_thread_limiter
+
+    limiter = current_default_thread_limiter()
+    statistics = limiter.statistics()
+    samples = (
+        ("threadpool_threads_total", "Threadpool size (anyio default limiter).", limiter.total_tokens),
+        ("threadpool_threads_busy", "Threadpool threads in use.", statistics.borrowed_tokens),
+        ("threadpool_tasks_waiting", "Calls waiting for a threadpool thread.", statistics.tasks_waiting),
+    )
+    lines = []
+    for name, help_text, value in samples:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+    return lines
+
+
+def _pool_lines() -> list[str]:
+    lines = ["# HELP db_pool_checked_out Connections currently checked out.", "# TYPE db_pool_checked_out gauge"]
+    for pool_name, engine in sorted(_engines.items()):
+        checkedout = getattr(engine.pool, "checkedout", None)
+        if checkedout is not None:
+            lines.append(f'db_pool_checked_out{{pool="{pool_name}"}} {checkedout()}')
+    return lines
+
+
+def render() -> bytes:
+    """/metrics の本文。イベントループ上で呼ぶ。"""
+    lines: list[str] = []
+    for metric in _METRICS:
+        lines += metric.render()
+    lines += _threadpool_lines()
+    lines += _pool_lines()
+    return ("\n".join(lines) + "\n").encode()
@@ -0,0 +1,209 @@
+# migrations.py
+"""
+Versioned schema migrations.
+
+`upgrade(engine)` brings any database (new or existing) to the latest schema:
+
+1. `Base.metadata.create_all` creates tables that do not exist yet
+   (on a brand-new DB this is the whole schema).
+2. Every step in MIGRATIONS whose version is above the one recorded in
+   `schema_version` runs in its own transaction, in order.
+
+Because step 1 already creates fresh tables with the current model definition,
+each step must be idempotent (`IF NOT EXISTS`, `_add_column`).
+"""
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+import models  # noqa: F401  (テーブル定義を Base.metadata に登録する)
+from database import Base
+
+MIGRATIONS = []
+
+
+def migration(version: int, description: str):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return fn
+
+    return register
+
+
+def _add_column(conn, table: str, column: str, ddl: str) -> None:
+    columns = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column not in columns:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+# =========================
+# マイグレーション定義（追加のみ・既存の番号は書き換えない）
+# =========================
+@migration(1, "keyset pagination and filter indexes")
+def _m0001(conn):
+    for ddl in (
+        "CREATE INDEX IF NOT EXISTS ix_tasks_user_created ON tasks (user_id, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_tasks_user_project_created ON tasks (user_id, project_id, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_tasks_user_label_created ON tasks (user_id, label_id, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_tasks_user_parent_created ON tasks (user_id, parent_task_id, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_tasks_user_completed_created ON tasks (user_id, completed, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_tasks_user_fixed_created ON tasks (user_id, is_fixed, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_projects_user_created ON projects (user_id, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_projects_user_label_created ON projects (user_id, label_id, created_at, id)",
+    ):
+        conn.execute(text(ddl))
+
+
+@migration(2, "composite indexes for label lookups and ordered project tasks")
+def _m0002(conn):
+    for ddl in (
+        # list_labels: user_id = ? ORDER BY created_at
+        "CREATE INDEX IF NOT EXISTS ix_labels_user_created ON labels (user_id, created_at)",
+        # get_label_by_title: user_id = ? AND name = ?
+        "CREATE INDEX IF NOT EXISTS ix_labels_user_name ON labels (user_id, name)",
+        # upsert_project_tasks: project_id = ? AND user_id = ? ORDER BY order_index
+        "CREATE INDEX IF NOT EXISTS ix_tasks_user_project_order ON tasks (user_id, project_id, order_index)",
+    ):
+        conn.execute(text(ddl))
+
+
+@migration(3, "change_seq columns and indexes for incremental sync")
+def _m0003(conn):
+    for table in ("labels", "projects", "tasks"):
+        _add_column(conn, table, "change_seq", "INTEGER NOT NULL DEFAULT 0")
+        conn.execute(
+            text(f"CREATE INDEX IF NOT EXISTS ix_{table}_user_change_seq ON {table} (user_id, change_seq)")
+        )
+    _add_column(conn, "user_data_versions", "sync_floor", "INTEGER NOT NULL DEFAULT 0")
+
+
+@migration(4, "sibling order index for sparse task ordering")
+def _m0004(conn):
+    # move_task: 同じ親の兄弟から after の次の order_index を引く
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_tasks_user_project_parent_order "
+            "ON tasks (user_id, project_id, parent_task_id, order_index)"
+        )
+    )
+
+
+# タスクの件数カウンタ（projects / labels）。(カウンタ列, タスク側の加算値)
+_COUNTERS = (
+    ("task_count", "1"),
+    ("completed_count", "COALESCE({row}.completed, 0)"),
+    ("fixed_count", "COALESCE({row}.is_fixed, 0)"),
+    ("group_count", "COALESCE({row}.is_group, 0)"),
+)
+_COUNTER_SCOPES = (("projects", "project_id"), ("labels", "label_id"))
+
+
+def _counter_update(table: str, key: str, row: str, sign: str) -> str:
+    """トリガー本体の1文。row は NEW / OLD、sign は + / -。版数も今の値にそろえて差分同期に載せる。"""
+    sets = ", ".join(
+        f"{column} = {column} {sign} {value.format(row=row)}" for column, value in _COUNTERS
+    )
+    return (
+        f"UPDATE {table} SET {sets}, "
+        f"change_seq = COALESCE((SELECT version FROM user_data_versions WHERE user_id = {row}.user_id), change_seq) "
+        f"WHERE id = {row}.{key};"
+    )
+
+
+@migration(5, "task counters on projects and labels maintained by triggers")
+def _m0005(conn):
+    for table, _ in _COUNTER_SCOPES:
+        for column, _ in _COUNTERS:
+            _add_column(conn, table, column, "INTEGER NOT NULL DEFAULT 0")
+
+    watched = ("project_id", "label_id", "completed", "is_fixed", "is_group")
+    changed = " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in watched)
+    triggers = {
+        "tr_tasks_counters_insert": (
+            "AFTER INSERT ON tasks",
+            [_counter_update(table, key, "NEW", "+") for table, key in _COUNTER_SCOPES],
+        ),
+        "tr_tasks_counters_delete": (
+            "AFTER DELETE ON tasks",
+            [_counter_update(table, key, "OLD", "-") for table, key in _COUNTER_SCOPES],
+        ),
+        # 件数に関係する列が実際に変わった行だけ（付け替え・完了切り替えなど）
+        "tr_tasks_counters_update": (
+            f"AFTER UPDATE OF {', '.join(watched)} ON tasks WHEN {changed}",
+            [
+                statement
+                for table, key in _COUNTER_SCOPES
+                for statement in (
+                    _counter_update(table, key, "OLD", "-"),
+                    _counter_update(table, key, "NEW", "+"),
+                )
+            ],
+        ),
+    }
+    for name, (timing, statements) in triggers.items():
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        conn.execute(text(f"CREATE TRIGGER {name} {timing} BEGIN {' '.join(statements)} END"))
+
+    # 既存データの件数を埋める
+    for table, key in _COUNTER_SCOPES:
+        totals = ", ".join(
+            f"SUM({value.format(row='tasks')}) AS {column}" for column, value in _COUNTERS
+        )
+        sets = ", ".join(f"{column} = counts.{column}" for column, _ in _COUNTERS)
+        conn.execute(
+            text(
+                f"UPDATE {table} SET {sets} "
+                f"FROM (SELECT {key} AS id, {totals} FROM tasks WHERE {key} IS NOT NULL GROUP BY {key}) AS counts "
+                f"WHERE {table}.id = counts.id"
+            )
+        )
+
+
+# =========================
+# 実行
+# =========================
+def _ensure_version_table(conn) -> None:
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER PRIMARY KEY, "
+            "description TEXT NOT NULL, "
+            "applied_at TEXT NOT NULL)"
+        )
+    )
+
+
+def current_version(conn) -> int:
+    _ensure_version_table(conn)
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar_one()
+
+
+def upgrade(engine) -> list[int]:
+    """
+    return: 今回適用したマイグレーション番号の一覧
+    """
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        version = current_version(conn)
+
+    applied = []
+    for step_version, description, fn in MIGRATIONS:
+        if step_version <= version:
+            continue
+        with engine.begin() as conn:
+            fn(conn)
+            conn.execute(
+                text(
+                    "INSERT INTO schema_version (version, description, applied_at) "
+                    "VALUES (:version, :description, :applied_at)"
+                ),
+                {
+                    "version": step_version,
+                    "description": description,
+                    "applied_at": datetime.utcnow().isoformat(),
+                },
+            )
+        applied.append(step_version)
+    return applied
@@ -2,3 +2,6 @@ from .user import User
 from .label import Label
 from .project import Project
 from .task import Task
+from .data_version import UserDataVersion
+from .tombstone import Tombstone
+from .user_shard import UserShard
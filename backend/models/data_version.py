@@ -0,0 +1,15 @@
+# models/data_version.py
+from sqlalchemy import Column, ForeignKey, Integer, String
+
+from database import Base
+
+
+class UserDataVersion(Base):
+    """ユーザーごとのデータ版数。labels / projects / tasks への書き込みのたびに +1 する。"""
+
+    __tablename__ = "user_data_versions"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    # これ以下の cursor からは差分同期できない（削除記録を掃除済み）
+    sync_floor = Column(Integer, nullable=False, default=0, server_default="0")
@@ -1,5 +1,5 @@
 # models/label.py
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -7,6 +7,14 @@ import uuid
 
 class Label(Base):
     __tablename__ = "labels"
+    __table_args__ = (
+        # 一覧（user_id = ? ORDER BY created_at）用
+        Index("ix_labels_user_created", "user_id", "created_at"),
+        # タイトルでの検索（user_id = ? AND name = ?）用
+        Index("ix_labels_user_name", "user_id", "name"),
+        # 差分同期（change_seq > cursor）用
+        Index("ix_labels_user_change_seq", "user_id", "change_seq"),
+    )
 
     id = Column(
         String,
@@ -18,7 +26,14 @@ class Label(Base):
     # Map DB column "name" to Python attribute "title".
     title = Column("name", String, nullable=False)
     color = Column(String, nullable=True)
+    # 紐づくタスクの件数（tasks のトリガーで増減する。crud.check_progress_counters で再計算できる）
+    task_count = Column(Integer, nullable=False, default=0, server_default="0")
+    completed_count = Column(Integer, nullable=False, default=0, server_default="0")
+    fixed_count = Column(Integer, nullable=False, default=0, server_default="0")
+    group_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # 最後に書き込んだときのデータ版数（user_data_versions.version）
+    change_seq = Column(Integer, nullable=False, default=0, server_default="0")
 
     user = relationship("User", back_populates="labels")
     projects = relationship("Project", back_populates="label")
@@ -1,10 +1,17 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Integer
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
 
 class Project(Base):
     __tablename__ = "projects"
+    # 一覧のキーセットページング（created_at, id）とラベル絞り込み用
+    __table_args__ = (
+        Index("ix_projects_user_created", "user_id", "created_at", "id"),
+        Index("ix_projects_user_label_created", "user_id", "label_id", "created_at", "id"),
+        # 差分同期（change_seq > cursor）用
+        Index("ix_projects_user_change_seq", "user_id", "change_seq"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
@@ -12,9 +19,16 @@ class Project(Base):
     title = Column("name", String, nullable=False)
     label_id = Column(String, ForeignKey("labels.id"), nullable=True)
     current_order_index = Column(Integer, nullable=False, default=0)
+    # 紐づくタスクの件数（tasks のトリガーで増減する。crud.check_progress_counters で再計算できる）
+    task_count = Column(Integer, nullable=False, default=0, server_default="0")
+    completed_count = Column(Integer, nullable=False, default=0, server_default="0")
+    fixed_count = Column(Integer, nullable=False, default=0, server_default="0")
+    group_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # 最後に書き込んだときのデータ版数（user_data_versions.version）
+    change_seq = Column(Integer, nullable=False, default=0, server_default="0")
 
     user = relationship("User", back_populates="projects")
     label = relationship("Label", back_populates="projects")
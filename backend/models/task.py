@@ -1,10 +1,25 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
 
 class Task(Base):
     __tablename__ = "tasks"
+    # 一覧のキーセットページング（created_at, id）と各フィルタ用
+    __table_args__ = (
+        Index("ix_tasks_user_created", "user_id", "created_at", "id"),
+        Index("ix_tasks_user_project_created", "user_id", "project_id", "created_at", "id"),
+        Index("ix_tasks_user_label_created", "user_id", "label_id", "created_at", "id"),
+        Index("ix_tasks_user_parent_created", "user_id", "parent_task_id", "created_at", "id"),
+        Index("ix_tasks_user_completed_created", "user_id", "completed", "created_at", "id"),
+        Index("ix_tasks_user_fixed_created", "user_id", "is_fixed", "created_at", "id"),
+        # プロジェクト内タスクを order_index 順に取るとき用
+        Index("ix_tasks_user_project_order", "user_id", "project_id", "order_index"),
+        # 兄弟（同じプロジェクト・同じ親）の order_index の前後を引くとき用
+        Index("ix_tasks_user_project_parent_order", "user_id", "project_id", "parent_task_id", "order_index"),
+        # 差分同期（change_seq > cursor）用
+        Index("ix_tasks_user_change_seq", "user_id", "change_seq"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
@@ -24,6 +39,8 @@ class Task(Base):
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # 最後に書き込んだときのデータ版数（user_data_versions.version）
+    change_seq = Column(Integer, nullable=False, default=0, server_default="0")
 
     user = relationship("User", back_populates="tasks")
     project = relationship("Project", back_populates="tasks")
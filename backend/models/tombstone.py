@@ -0,0 +1,24 @@
+# models/tombstone.py
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.sql import func
+
+from database import Base
+
+
+class Tombstone(Base):
+    """削除されたレコードの記録。差分同期で削除を伝えるために一定期間だけ残す。"""
+
+    __tablename__ = "tombstones"
+    __table_args__ = (
+        Index("ix_tombstones_user_change_seq", "user_id", "change_seq"),
+        Index("ix_tombstones_deleted_at", "deleted_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    # "label" / "project" / "task"
+    record_type = Column(String, nullable=False)
+    record_id = Column(String, nullable=False)
+    # 削除したときのデータ版数
+    change_seq = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,15 @@
+# models/user_shard.py
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy.sql import func
+
+from database import Base
+
+
+class UserShard(Base):
+    """ユーザー → シャード番号の対応表（DB_SHARDS > 0 のとき。ディレクトリ = DATABASE_URL に置く）。"""
+
+    __tablename__ = "user_shards"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    shard = Column(Integer, nullable=False, index=True)
+    assigned_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
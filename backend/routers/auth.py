@@ -1,35 +1,60 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
 
 import crud
-from database import get_db
-from dependencies import create_access_token, get_current_user_id, get_password_hash, verify_password
+import metrics
+from database import DbSession, get_db, get_read_db
+from dependencies import (
+    PASSWORD_HASH_RETRY_AFTER_SECONDS,
+    PasswordHashingBusy,
+    check_password,
+    create_access_token,
+    get_current_user_id,
+    hash_password,
+)
 from schemas import AuthUserRead, LoginRequest, LoginResponse, SignupRequest
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=metrics.TimedRoute)
+
+
+def _hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many authentication requests, please retry shortly",
+        headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+    )
 
 
 @router.post("/signup", response_model=AuthUserRead, status_code=status.HTTP_201_CREATED)
-def signup(payload: SignupRequest, db: Session = Depends(get_db)):
+async def signup(payload: SignupRequest, db: DbSession = Depends(get_db)):
     email = payload.email.strip().lower()
 
-    exists = crud.get_user_by_email(db, email)
+    exists = await crud.aio.get_user_by_email(db, email)
     if exists:
         raise HTTPException(status_code=409, detail="Email already exists")
 
     try:
-        return crud.create_user(db, email=email, password_hash=get_password_hash(payload.password))
+        password_hash = await hash_password(payload.password)
+    except PasswordHashingBusy:
+        raise _hashing_busy()
+
+    try:
+        return await crud.aio.create_user(db, email=email, password_hash=password_hash)
     except IntegrityError:
-        db.rollback()
+        await crud.aio.rollback(db)
         raise HTTPException(status_code=409, detail="Email already exists")
 
 
 @router.post("/login", response_model=LoginResponse)
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
+async def login(payload: LoginRequest, db: DbSession = Depends(get_read_db)):
     email = payload.email.strip().lower()
-    user = crud.get_user_by_email(db, email)
-    if not user or not verify_password(payload.password, user.password_hash):
+    user = await crud.aio.get_user_by_email(db, email)
+    try:
+        valid = user is not None and await check_password(payload.password, user.password_hash)
+    except PasswordHashingBusy:
+        raise _hashing_busy()
+
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
@@ -40,11 +65,11 @@ def login(payload: LoginRequest, db: Session = Depends(get_db)):
 
 
 @router.get("/me", response_model=AuthUserRead)
-def me(
-    db: Session = Depends(get_db),
+async def me(
+    db: DbSession = Depends(get_read_db),
     current_user_id: str = Depends(get_current_user_id),
 ):
-    user = crud.get_user_by_id(db, current_user_id)
+    user = await crud.aio.get_user_by_id(db, current_user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
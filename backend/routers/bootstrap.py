@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, Request, Response
+from pydantic_core import to_json
+
+import crud
+import metrics
+from database import DbSession, get_read_db
+from dependencies import etag_matches, get_current_user_id, get_data_etag, make_etag, not_modified, set_etag
+from schemas import BootstrapRead
+
+router = APIRouter(tags=["bootstrap"], route_class=metrics.TimedRoute)
+
+
+@router.get("/bootstrap", response_model=BootstrapRead)
+async def bootstrap(
+    request: Request,
+    etag: str = Depends(get_data_etag),
+    db: DbSession = Depends(get_read_db),
+    current_user_id: str = Depends(get_current_user_id),
+):
+    """
+    ダッシュボードの初期表示用に labels / projects / tasks を1回で返す。
+    3つとも同じ読み取りトランザクションで読むので、互いに食い違わない。
+    """
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    version, data = await crud.aio.load_bootstrap(db, current_user_id)
+
+    # 行の dict をそのまま JSON にする（ORM オブジェクト・スキーマの検証を通さない）。
+    # 日時などの書式は各一覧エンドポイントの出力と同じになる。
+    with metrics.stage("encode"):
+        content = to_json({"version": version, **data})
+    response = Response(content=content, media_type="application/json")
+    # ETag はデータと同じスナップショットの版数から作り直す
+    set_etag(response, make_etag(current_user_id, version))
+    return response
@@ -0,0 +1,85 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+
+import crud
+import events
+import metrics
+from database import ReadSessionLocal, run_db
+from dependencies import get_stream_user_id
+
+router = APIRouter(tags=["events"], route_class=metrics.TimedRoute)
+
+# 何も起きなくてもこの間隔でコメント行を送り、プロキシに接続を切られないようにする
+EVENTS_KEEPALIVE_SECONDS = 15
+# 切断されたときにブラウザが再接続するまでの待ち時間（ミリ秒）
+EVENTS_RETRY_MS = 3000
+
+
+def _sse(event_name: str, event_id: int, data: bytes) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, event_name.encode(), data)
+
+
+async def _current_version(user_id: str) -> int:
+    return await run_db(ReadSessionLocal(), crud.get_data_version, user_id)
+
+
+async def _event_stream(user_id: str, since: int | None):
+    # 取りこぼさないように、現在の版数を読むより先に購読しておく
+    subscription = events.broker.subscribe(user_id)
+    try:
+        yield b"retry: %d\n\n" % EVENTS_RETRY_MS
+        if since is None:
+            since = await _current_version(user_id)
+            yield _sse("ready", since, b"{}")
+
+        # 再開時は Last-Event-ID 以降の差分をまず送る
+        pending = True
+        while True:
+            if pending:
+                # ストリームは長く続くので、DB_MODE に関係なく差分を読むたびに短い読み取りセッションを使う
+                result, changes = await run_db(ReadSessionLocal(), crud.list_changes, user_id, since)
+                if result == "ok":
+                    if int(changes["cursor"]) > since:
+                        since = int(changes["cursor"])
+                        yield _sse("changes", since, to_json(changes))
+                else:
+                    # 差分を作れない（削除記録を掃除済みなど）。クライアントは全件を取り直す
+                    since = await _current_version(user_id)
+                    yield _sse("reset", since, b"{}")
+
+            pending = await subscription.wait(EVENTS_KEEPALIVE_SECONDS)
+            if not pending:
+                yield b": keepalive\n\n"
+    finally:
+        events.broker.unsubscribe(subscription)
+
+
+@router.get("/events")
+async def change_events(
+    cursor: str | None = None,
+    last_event_id: str | None = Header(default=None),
+    current_user_id: str = Depends(get_stream_user_id),
+):
+    """
+    自分のデータの変更を Server-Sent Events で受け取る。
+
+    - event: ready   ... 接続直後（cursor なし）。id が現在の版数
+    - event: changes ... data は GET /api/sync と同じ形の差分。id が新しい版数
+    - event: reset   ... 差分を作れないので /api/bootstrap から取り直す
+
+    再接続時はブラウザが Last-Event-ID を送るので、その続きから届く。
+    初回に ?cursor=（/api/bootstrap の version など）を渡すと、その続きから始まる。
+    """
+    resume = last_event_id or cursor
+    since = None
+    if resume is not None:
+        if not resume.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        since = int(resume)
+
+    return StreamingResponse(
+        _event_stream(current_user_id, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
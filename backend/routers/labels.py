@@ -1,54 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
 import crud
-from database import get_db
-from dependencies import get_current_user_id
-from schemas import LabelCreate, LabelRead, LabelUpdate
+import metrics
+from database import DbSession, get_db, get_read_db
+from dependencies import etag_matches, get_current_user_id, get_data_etag, not_modified, set_etag
+from schemas import LabelCreate, LabelMerge, LabelMergeResult, LabelRead, LabelStats, LabelUpdate
 
-router = APIRouter(prefix="/labels", tags=["labels"])
+router = APIRouter(prefix="/labels", tags=["labels"], route_class=metrics.TimedRoute)
 
 
 @router.get("", response_model=list[LabelRead])
-def list_labels(
-    db: Session = Depends(get_db),
+async def list_labels(
+    request: Request,
+    response: Response,
+    etag: str = Depends(get_data_etag),
+    db: DbSession = Depends(get_read_db),
     current_user_id: str = Depends(get_current_user_id),
 ):
-    return crud.list_labels(db, current_user_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    return await crud.aio.list_labels(db, current_user_id)
+
+
+@router.get("/stats", response_model=list[LabelStats])
+async def list_label_stats(
+    request: Request,
+    response: Response,
+    etag: str = Depends(get_data_etag),
+    db: DbSession = Depends(get_read_db),
+    current_user_id: str = Depends(get_current_user_id),
+):
+    """全ラベルのプロジェクト数・タスク数（完了・固定・グループの内訳つき）。"""
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    return await crud.aio.list_label_stats(db, current_user_id)
 
 
 @router.post("", response_model=LabelRead)
-def create_label(
+async def create_label(
     payload: LabelCreate,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     current_user_id: str = Depends(get_current_user_id),
 ):
-    exists = crud.get_label_by_title(db, payload.title, current_user_id)
+    exists = await crud.aio.get_label_by_title(db, payload.title, current_user_id)
     if exists:
         raise HTTPException(status_code=400, detail="Label title already exists")
-    return crud.create_label(db, payload, current_user_id)
+    return await crud.aio.create_label(db, payload, current_user_id)
 
 
 @router.patch("/{label_id}", response_model=LabelRead)
-def update_label(
+async def update_label(
     label_id: str,
     payload: LabelUpdate,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     current_user_id: str = Depends(get_current_user_id),
 ):
-    obj = crud.update_label(db, label_id, payload, current_user_id)
+    obj = await crud.aio.update_label(db, label_id, payload, current_user_id)
     if not obj:
         raise HTTPException(status_code=404, detail="Label not found")
     return obj
 
 
 @router.delete("/{label_id}", status_code=204)
-def delete_label(
+async def delete_label(
     label_id: str,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     current_user_id: str = Depends(get_current_user_id),
 ):
-    result = crud.delete_label(db, label_id, current_user_id)
+    result = await crud.aio.delete_label(db, label_id, current_user_id)
 
     if result == "not_found":
         raise HTTPException(status_code=404, detail="Label not found")
@@ -63,3 +84,32 @@ def delete_label(
         raise HTTPException(status_code=500, detail=f"Unexpected result: {result}")
 
     return
+
+
+@router.post("/{label_id}/merge", response_model=LabelMergeResult)
+async def merge_label(
+    label_id: str,
+    payload: LabelMerge,
+    db: DbSession = Depends(get_db),
+    current_user_id: str = Depends(get_current_user_id),
+):
+    """
+    このラベルを使っているプロジェクト・タスクをすべて into_label_id へ付け替える
+    （null ならラベルを外す）。delete_source=true なら最後にこのラベルを削除する。
+    全部を1トランザクションで行う。
+    """
+    try:
+        result, value = await crud.aio.merge_label(
+            db, label_id, payload.into_label_id, current_user_id, payload.delete_source
+        )
+    except Exception:
+        await crud.aio.rollback(db)
+        raise HTTPException(status_code=400, detail="Failed to merge label")
+
+    if result == "not_found":
+        raise HTTPException(status_code=404, detail="Label not found")
+    if result == "target_not_found":
+        raise HTTPException(status_code=404, detail="Target label not found")
+    if result == "same_label":
+        raise HTTPException(status_code=400, detail="Cannot merge a label into itself")
+    return value
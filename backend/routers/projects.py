@@ -1,42 +1,99 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 
 import crud
-from database import get_db
-from dependencies import get_current_user_id
-from schemas import ProjectCreate, ProjectRead, ProjectUpdate, ProjectWithTasks, TaskRead, TaskUpsert
-
-router = APIRouter(tags=["projects"])
+import fast_json
+import metrics
+from database import DbSession, get_db, get_read_db
+from dependencies import etag_matches, get_current_user_id, get_data_etag, make_etag, not_modified, set_etag
+from schemas import (
+    MAX_NEXT_TASKS,
+    ProjectCreate,
+    ProjectNextTasks,
+    ProjectRead,
+    ProjectUpdate,
+    ProjectWithTasks,
+    TaskRead,
+    TaskUpsert,
+)
+
+router = APIRouter(tags=["projects"], route_class=metrics.TimedRoute)
 
 
 @router.get("/projects", response_model=list[ProjectRead])
-def list_projects(
-    db: Session = Depends(get_db),
+async def list_projects(
+    request: Request,
+    response: Response,
+    label_id: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=crud.MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    etag: str = Depends(get_data_etag),
+    db: DbSession = Depends(get_read_db),
     current_user_id: str = Depends(get_current_user_id),
 ):
-    return crud.list_projects(db, current_user_id)
+    # 版数が変わっていなければ一覧を引かずに 304 を返す（ETag は URL ごとにブラウザが保持する）
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    # limit を省略すると従来どおり全件を返す。続きがあれば X-Next-Cursor に次のカーソルを入れる
+    try:
+        projects, next_cursor = await crud.aio.list_projects_page(
+            db,
+            current_user_id,
+            limit=limit,
+            cursor=cursor,
+            label_id=label_id,
+        )
+    except crud.InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    set_etag(response, etag)
+    return projects
+
+
+@router.get("/projects/next-tasks", response_model=list[ProjectNextTasks])
+async def list_next_tasks(
+    request: Request,
+    response: Response,
+    limit: int = Query(default=3, ge=0, le=MAX_NEXT_TASKS),
+    etag: str = Depends(get_data_etag),
+    db: DbSession = Depends(get_read_db),
+    current_user_id: str = Depends(get_current_user_id),
+):
+    """
+    各プロジェクトの今のタスク（current_order_index 以降の最初の未完了タスク）と、
+    その後の未完了タスク limit 件。タスク一覧を読み込まずに「今日」の表示を作れる。
+    """
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    version, items = await crud.aio.list_next_tasks(db, current_user_id, limit)
+    # ETag はデータと同じスナップショットの版数から作り直す
+    set_etag(response, make_etag(current_user_id, version))
+    return items
 
 
 @router.post("/projects", response_model=ProjectRead, status_code=status.HTTP_201_CREATED)
-def create_project(
+async def create_project(
     payload: ProjectCreate,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     current_user_id: str = Depends(get_current_user_id),
 ):
-    return crud.create_project(db, payload, current_user_id)
+    return await crud.aio.create_project(db, payload, current_user_id)
 
 
 @router.patch("/projects/{project_id}", response_model=ProjectRead)
-def update_project(
+async def update_project(
     project_id: str,
     payload: ProjectUpdate,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     current_user_id: str = Depends(get_current_user_id),
 ):
     try:
-        obj = crud.update_project(db, project_id, payload, current_user_id)
+        obj = await crud.aio.update_project(db, project_id, payload, current_user_id)
     except Exception:
-        db.rollback()
+        await crud.aio.rollback(db)
         raise HTTPException(status_code=400, detail="Failed to update project")
 
     if not obj:
@@ -45,12 +102,12 @@ def update_project(
 
 
 @router.delete("/projects/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_project(
+async def delete_project(
     project_id: str,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     current_user_id: str = Depends(get_current_user_id),
 ):
-    result = crud.delete_project(db, project_id, current_user_id)
+    result = await crud.aio.delete_project(db, project_id, current_user_id)
     if result == "not_found":
         raise HTTPException(status_code=404, detail="Project not found")
     if result == "in_use":
@@ -59,16 +116,17 @@ def delete_project(
 
 
 @router.put("/projects/{project_id}/tasks", response_model=list[TaskRead])
-def upsert_project_tasks(
+async def upsert_project_tasks(
     project_id: str,
     payloads: list[TaskUpsert],
-    db: Session = Depends(get_db),
+    response: Response,
+    db: DbSession = Depends(get_db),
     current_user_id: str = Depends(get_current_user_id),
 ):
     try:
-        result, tasks = crud.upsert_project_tasks(db, project_id, payloads, current_user_id)
+        result, tasks, counts = await crud.aio.upsert_project_tasks(db, project_id, payloads, current_user_id)
     except Exception:
-        db.rollback()
+        await crud.aio.rollback(db)
         raise HTTPException(status_code=400, detail="Failed to save project tasks")
 
     if result == "not_found":
@@ -77,12 +135,22 @@ def upsert_project_tasks(
         raise HTTPException(status_code=400, detail="Invalid parent_task_id")
     if result == "id_conflict":
         raise HTTPException(status_code=409, detail="Task id belongs to another project")
+
+    for key, value in counts.items():
+        response.headers[f"X-Tasks-{key.capitalize()}"] = str(value)
     return tasks
 
 
 @router.get("/projects-with-tasks", response_model=list[ProjectWithTasks])
-def list_projects_with_tasks(
-    db: Session = Depends(get_db),
+async def list_projects_with_tasks(
+    request: Request,
+    response: Response,
+    etag: str = Depends(get_data_etag),
+    db: DbSession = Depends(get_read_db),
     current_user_id: str = Depends(get_current_user_id),
 ):
-    return crud.list_projects_with_tasks(db, current_user_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    projects = await crud.aio.list_projects_with_tasks(db, current_user_id)
+    return fast_json.list_response(ProjectWithTasks, projects, response)
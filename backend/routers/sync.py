@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from pydantic_core import to_json
+
+import crud
+import metrics
+from database import DbSession, get_read_db
+from dependencies import get_current_user_id
+from schemas import SyncRead
+
+router = APIRouter(tags=["sync"], route_class=metrics.TimedRoute)
+
+
+@router.get("/sync", response_model=SyncRead)
+async def sync(
+    cursor: str | None = None,
+    db: DbSession = Depends(get_read_db),
+    current_user_id: str = Depends(get_current_user_id),
+):
+    """
+    前回の cursor 以降に作成・更新されたレコードと、削除されたレコードのIDを返す。
+    cursor を省略すると全件を返す（初回）。返ってきた cursor を次回に渡す。
+
+    410 のときは削除記録が掃除済みなので、cursor なしで取り直す。
+    """
+    since = None
+    if cursor is not None:
+        if not cursor.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        since = int(cursor)
+
+    result, changes = await crud.aio.list_changes(db, current_user_id, since)
+    if result == "invalid":
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if result == "expired":
+        raise HTTPException(status_code=410, detail="Sync cursor expired")
+
+    with metrics.stage("encode"):
+        content = to_json(changes)
+    return Response(content=content, media_type="application/json")
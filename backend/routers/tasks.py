@@ -1,42 +1,110 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
 import crud
-from database import get_db
-from dependencies import get_current_user_id
-from schemas import TaskCreate, TaskRead, TaskUpdate
+import fast_json
+import metrics
+from database import DbSession, get_db, get_read_db
+from dependencies import etag_matches, get_current_user_id, get_data_etag, not_modified, set_etag
+from schemas import (
+    TaskBatchRequest,
+    TaskBatchResult,
+    TaskCreate,
+    TaskMove,
+    TaskRead,
+    TaskSubtreeComplete,
+    TaskSubtreeMove,
+    TaskUpdate,
+)
 
-router = APIRouter(tags=["tasks"])
+router = APIRouter(tags=["tasks"], route_class=metrics.TimedRoute)
 
 
 @router.get("/tasks", response_model=list[TaskRead])
-def list_tasks(
-    db: Session = Depends(get_db),
+async def list_tasks(
+    request: Request,
+    response: Response,
+    project_id: str | None = None,
+    label_id: str | None = None,
+    completed: bool | None = None,
+    is_fixed: bool | None = None,
+    parent_task_id: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=crud.MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    etag: str = Depends(get_data_etag),
+    db: DbSession = Depends(get_read_db),
     current_user_id: str = Depends(get_current_user_id),
 ):
-    return crud.list_tasks(db, current_user_id)
+    # 版数が変わっていなければ一覧を引かずに 304 を返す（ETag は URL ごとにブラウザが保持する）
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    # limit を省略すると従来どおり全件を返す。続きがあれば X-Next-Cursor に次のカーソルを入れる
+    try:
+        tasks, next_cursor = await crud.aio.list_tasks_page(
+            db,
+            current_user_id,
+            limit=limit,
+            cursor=cursor,
+            project_id=project_id,
+            label_id=label_id,
+            completed=completed,
+            is_fixed=is_fixed,
+            parent_task_id=parent_task_id,
+        )
+    except crud.InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    set_etag(response, etag)
+    return fast_json.list_response(TaskRead, tasks, response)
 
 
 @router.post("/tasks", response_model=TaskRead)
-def create_task(
+async def create_task(
     payload: TaskCreate,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     current_user_id: str = Depends(get_current_user_id),
 ):
-    return crud.create_task(db, payload, current_user_id)
+    return await crud.aio.create_task(db, payload, current_user_id)
+
+
+@router.post("/tasks/batch", response_model=TaskBatchResult)
+async def apply_task_batch(
+    payload: TaskBatchRequest,
+    db: DbSession = Depends(get_db),
+    current_user_id: str = Depends(get_current_user_id),
+):
+    """
+    複数タスクの作成・更新・削除を1リクエスト・1トランザクションで適用する。
+    途中の操作が失敗したら全体を取り消す（detail に失敗した操作の位置を入れる）。
+    """
+    try:
+        result, value = await crud.aio.apply_task_batch(db, payload.operations, current_user_id)
+    except Exception:
+        await crud.aio.rollback(db)
+        raise HTTPException(status_code=400, detail="Failed to apply task batch")
+
+    if result == "not_found":
+        raise HTTPException(status_code=404, detail=f"Task not found (operation {value})")
+    if result == "duplicate_ref":
+        raise HTTPException(status_code=400, detail=f"Duplicate ref (operation {value})")
+    if result == "invalid_parent":
+        raise HTTPException(status_code=400, detail=f"Invalid parent_task_id (operation {value})")
+    return value
 
 
 @router.patch("/tasks/{task_id}", response_model=TaskRead)
-def update_task(
+async def update_task(
     task_id: str,
     payload: TaskUpdate,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     current_user_id: str = Depends(get_current_user_id),
 ):
     try:
-        obj = crud.update_task(db, task_id, payload, current_user_id)
+        obj = await crud.aio.update_task(db, task_id, payload, current_user_id)
     except Exception:
-        db.rollback()
+        await crud.aio.rollback(db)
         raise HTTPException(status_code=400, detail="Failed to update task")
 
     if not obj:
@@ -45,16 +113,126 @@ def update_task(
     return obj
 
 
+@router.post("/tasks/{task_id}/move", response_model=TaskRead)
+async def move_task(
+    task_id: str,
+    payload: TaskMove,
+    response: Response,
+    db: DbSession = Depends(get_db),
+    current_user_id: str = Depends(get_current_user_id),
+):
+    """
+    ドラッグ＆ドロップ用。タスクを同じプロジェクト内で parent_task_id の子の、
+    after_id の直後（省略なら先頭）へ移す。ふつうは書き換えるのはこのタスク1行だけ。
+    兄弟の order_index を振り直したときは X-Tasks-Rebalanced にその行数を入れる。
+    """
+    try:
+        result, obj, rebalanced = await crud.aio.move_task(
+            db, task_id, current_user_id, payload.parent_task_id, payload.after_id
+        )
+    except Exception:
+        await crud.aio.rollback(db)
+        raise HTTPException(status_code=400, detail="Failed to move task")
+
+    if result == "not_found":
+        raise HTTPException(status_code=404, detail="Task not found")
+    if result == "invalid_parent":
+        raise HTTPException(status_code=400, detail="Invalid parent_task_id")
+    if result == "invalid_after":
+        raise HTTPException(status_code=400, detail="Invalid after_id")
+
+    response.headers["X-Tasks-Rebalanced"] = str(rebalanced)
+    return obj
+
+
+@router.get("/tasks/{task_id}/subtree", response_model=list[TaskRead])
+async def list_task_subtree(
+    task_id: str,
+    db: DbSession = Depends(get_read_db),
+    current_user_id: str = Depends(get_current_user_id),
+):
+    tasks = await crud.aio.list_task_subtree(db, task_id, current_user_id)
+    if not tasks:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return tasks
+
+
+@router.post("/tasks/{task_id}/subtree/move", response_model=list[TaskRead])
+async def move_task_subtree(
+    task_id: str,
+    payload: TaskSubtreeMove,
+    db: DbSession = Depends(get_db),
+    current_user_id: str = Depends(get_current_user_id),
+):
+    """
+    タスクを子孫ごと別のプロジェクト（parent_task_id を指定すればその子）へ移す。
+    移動したタスクは新しい兄弟の末尾に入る。返り値は移動後のサブツリー全体。
+    """
+    try:
+        result, tasks = await crud.aio.move_task_subtree(
+            db, task_id, current_user_id, payload.project_id, payload.parent_task_id
+        )
+    except Exception:
+        await crud.aio.rollback(db)
+        raise HTTPException(status_code=400, detail="Failed to move task")
+
+    if result == "not_found":
+        raise HTTPException(status_code=404, detail="Task not found")
+    if result == "project_not_found":
+        raise HTTPException(status_code=404, detail="Project not found")
+    if result == "invalid_parent":
+        raise HTTPException(status_code=400, detail="Invalid parent_task_id")
+    return tasks
+
+
+@router.post("/tasks/{task_id}/subtree/complete", response_model=list[TaskRead])
+async def complete_task_subtree(
+    task_id: str,
+    payload: TaskSubtreeComplete,
+    db: DbSession = Depends(get_db),
+    current_user_id: str = Depends(get_current_user_id),
+):
+    """タスクと子孫をまとめて完了（completed=false なら未完了）にする。"""
+    try:
+        tasks = await crud.aio.set_task_subtree_completed(db, task_id, current_user_id, payload.completed)
+    except Exception:
+        await crud.aio.rollback(db)
+        raise HTTPException(status_code=400, detail="Failed to update task")
+
+    if tasks is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return tasks
+
+
+@router.post("/tasks/{task_id}/subtree/duplicate", response_model=list[TaskRead])
+async def duplicate_task_subtree(
+    task_id: str,
+    db: DbSession = Depends(get_db),
+    current_user_id: str = Depends(get_current_user_id),
+):
+    """タスクを子孫ごと複製し、複製したサブツリーを返す。"""
+    try:
+        tasks = await crud.aio.duplicate_task_subtree(db, task_id, current_user_id)
+    except Exception:
+        await crud.aio.rollback(db)
+        raise HTTPException(status_code=400, detail="Failed to duplicate task")
+
+    if tasks is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return tasks
+
+
 @router.delete("/tasks/{task_id}", status_code=204)
-def delete_task(
+async def delete_task(
     task_id: str,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_db),
     current_user_id: str = Depends(get_current_user_id),
 ):
+    """タスクを子孫（parent_task_id で辿れるタスク）ごと削除する。"""
     try:
-        result = crud.delete_task(db, task_id, current_user_id)
+        result = await crud.aio.delete_task(db, task_id, current_user_id)
     except Exception:
-        db.rollback()
+        await crud.aio.rollback(db)
         raise HTTPException(status_code=400, detail="Failed to delete task")
 
     if result == "not_found":
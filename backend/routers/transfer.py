@@ -0,0 +1,154 @@
+import json
+import time
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+import crud
+import metrics
+from database import DbSession, ReadSessionLocal, get_db
+from dependencies import get_current_user_id
+from schemas import ImportBatch, ImportResult, LabelImport, ProjectImport, TaskImport
+
+router = APIRouter(tags=["transfer"], route_class=metrics.TimedRoute)
+
+EXPORT_FORMAT_VERSION = 1
+
+# NDJSON の "type" / JSON バッチのキー → (JSON バッチのキー, 入力スキーマ)
+IMPORT_TYPES = {
+    "label": ("labels", LabelImport),
+    "project": ("projects", ProjectImport),
+    "task": ("tasks", TaskImport),
+}
+
+
+def _export_lines(user_id: str):
+    # StreamingResponse はこのジェネレータをスレッドプールで回すので、
+    # DB_MODE に関係なく同期の読み取りセッションを使う。
+    # 1バッチ分の行をまとめて1チャンクとして送る。
+    header = {
+        "type": "export",
+        "data": {
+            "version": EXPORT_FORMAT_VERSION,
+            "exported_at": datetime.now(timezone.utc).isoformat(),
+        },
+    }
+    yield json.dumps(header, separators=(",", ":")) + "\n"
+
+    db = ReadSessionLocal()
+    try:
+        for record_type, schema, rows in crud.iter_export_rows(db, user_id):
+            prefix = f'{{"type":"{record_type}","data":'
+            yield "".join(
+                prefix + schema.model_validate(row._asdict()).model_dump_json() + "}\n"
+                for row in rows
+            )
+    finally:
+        db.close()
+
+
+@router.get("/export")
+async def export_account(current_user_id: str = Depends(get_current_user_id)):
+    """
+    ラベル・プロジェクト・タスクを NDJSON（1行1レコード）でストリーミングする。
+    各行は {"type": "export" | "label" | "project" | "task", "data": {...}}。
+    """
+    return StreamingResponse(
+        _export_lines(current_user_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="growth-road-export.ndjson"'},
+    )
+
+
+def _parse_ndjson(body: bytes, records: dict[str, list], errors: list[dict]) -> None:
+    # 位置は1始まりの行番号。エクスポートのヘッダー行はそのまま読み飛ばす
+    for line_no, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            record_type = item["type"]
+            data = item["data"]
+        except (ValueError, TypeError, KeyError):
+            errors.append({"type": "line", "id": None, "position": line_no, "error": "invalid NDJSON line"})
+            continue
+        if record_type == "export":
+            continue
+        if record_type not in IMPORT_TYPES:
+            errors.append({"type": "line", "id": None, "position": line_no, "error": f"unknown type {record_type!r}"})
+            continue
+        records[IMPORT_TYPES[record_type][0]].append((line_no, record_type, data))
+
+
+def _validate_records(records: dict[str, list], errors: list[dict]) -> dict[str, list]:
+    validated = {key: [] for key in records}
+    for key, items in records.items():
+        for position, record_type, data in items:
+            schema = IMPORT_TYPES[record_type][1]
+            try:
+                validated[key].append((position, schema.model_validate(data)))
+            except ValidationError as exc:
+                record_id = data.get("id") if isinstance(data, dict) else None
+                first = exc.errors()[0]
+                location = ".".join(str(part) for part in first["loc"])
+                errors.append({
+                    "type": record_type,
+                    "id": record_id if isinstance(record_id, str) else None,
+                    "position": position,
+                    "error": f"{location}: {first['msg']}" if location else first["msg"],
+                })
+    return validated
+
+
+@router.post("/import", response_model=ImportResult)
+async def import_account(
+    request: Request,
+    db: DbSession = Depends(get_db),
+    current_user_id: str = Depends(get_current_user_id),
+):
+    """
+    ラベル・プロジェクト・タスクをまとめて登録する。
+
+    - Content-Type: application/x-ndjson ... /export と同じ1行1レコード形式
+    - それ以外 ... {"labels": [...], "projects": [...], "tasks": [...]}（ImportBatch）
+
+    id はクライアント側のIDで、参照もそのIDで書く。登録時にサーバーが新しいIDを振る。
+    不正なレコードはスキップして errors に入れ、残りは登録する。
+    """
+    started = time.perf_counter()
+    body = await request.body()
+    errors: list[dict] = []
+    records: dict[str, list] = {"labels": [], "projects": [], "tasks": []}
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == "application/x-ndjson":
+        _parse_ndjson(body, records, errors)
+    else:
+        try:
+            batch = ImportBatch.model_validate_json(body)
+        except ValidationError:
+            raise HTTPException(status_code=400, detail="Invalid import batch")
+        for record_type, (key, _) in IMPORT_TYPES.items():
+            records[key] = [(position, record_type, data) for position, data in enumerate(getattr(batch, key))]
+
+    validated = _validate_records(records, errors)
+    inserted, matched_labels, insert_errors = await crud.aio.import_records(
+        db,
+        current_user_id,
+        validated["labels"],
+        validated["projects"],
+        validated["tasks"],
+    )
+    errors.extend(insert_errors)
+
+    elapsed = time.perf_counter() - started
+    total = sum(inserted.values())
+    return ImportResult(
+        inserted=inserted,
+        matched_labels=matched_labels,
+        errors=errors,
+        elapsed_ms=round(elapsed * 1000, 2),
+        records_per_sec=round(total / elapsed, 1) if elapsed > 0 else 0.0,
+    )
@@ -1,4 +1,34 @@
-from .label import LabelCreate, LabelUpdate, LabelRead
-from .project import ProjectCreate, ProjectRead, ProjectUpdate, ProjectWithTasks
-from .task import TaskCreate, TaskRead, TaskUpdate, TaskUpsert
+from .label import LabelCreate, LabelMerge, LabelMergeResult, LabelRead, LabelStats, LabelUpdate
+from .project import (
+    MAX_NEXT_TASKS,
+    ProjectCreate,
+    ProjectNextTasks,
+    ProjectRead,
+    ProjectUpdate,
+    ProjectWithTasks,
+)
+from .task import (
+    TaskBatchCreate,
+    TaskBatchDelete,
+    TaskBatchRequest,
+    TaskBatchResult,
+    TaskBatchUpdate,
+    TaskCreate,
+    TaskMove,
+    TaskRead,
+    TaskSubtreeComplete,
+    TaskSubtreeMove,
+    TaskUpdate,
+    TaskUpsert,
+)
 from .auth import SignupRequest, LoginRequest, AuthUserRead, LoginResponse
+from .bootstrap import BootstrapRead
+from .sync import SyncDeleted, SyncRead
+from .transfer import (
+    ImportBatch,
+    ImportRecordError,
+    ImportResult,
+    LabelImport,
+    ProjectImport,
+    TaskImport,
+)
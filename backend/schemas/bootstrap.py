@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import List
+
+from .label import LabelRead
+from .project import ProjectRead
+from .task import TaskRead
+
+class BootstrapRead(BaseModel):
+    # Data version of the snapshot (same value as in the ETag).
+    version: int
+    labels: List[LabelRead]
+    projects: List[ProjectRead]
+    tasks: List[TaskRead]
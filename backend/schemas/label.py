@@ -16,4 +16,30 @@ class LabelRead(BaseModel):
     id: str
     title: str
     color: Optional[str] = None
+    # Counters over tasks carrying this label, kept up to date by the database.
+    task_count: int
+    completed_count: int
+    fixed_count: int
+    group_count: int
     created_at: datetime
+
+class LabelStats(BaseModel):
+    label_id: str
+    project_count: int
+    task_count: int
+    completed_count: int
+    fixed_count: int
+    group_count: int
+
+class LabelMerge(BaseModel):
+    # None clears the label from every project and task instead.
+    into_label_id: Optional[str] = None
+    # Delete the source label once nothing refers to it.
+    delete_source: bool = True
+
+class LabelMergeResult(BaseModel):
+    # Number of rows that were moved off the source label.
+    projects: int
+    tasks: int
+    deleted: bool
+    target: Optional[LabelRead] = None
@@ -20,6 +20,11 @@ class ProjectRead(BaseModel):
     title: str
     label_id: Optional[str] = None
     current_order_index: int
+    # Task counters kept up to date by the database (no task scan needed).
+    task_count: int
+    completed_count: int
+    fixed_count: int
+    group_count: int
     created_at: datetime
     updated_at: datetime
 
@@ -31,3 +36,17 @@ class ProjectWithTasks(BaseModel):
     label_id: Optional[str] = None
     current_order_index: int
     tasks: List[TaskRead]
+
+# GET /api/projects/next-tasks
+# `position` is the index of current_task in the project's flattened leaf
+# order (the dashboard's order); it equals flat_length when nothing is left.
+MAX_NEXT_TASKS = 50
+
+class ProjectNextTasks(BaseModel):
+    project_id: str
+    position: int
+    flat_length: int
+    # Uncompleted tasks from position onwards.
+    remaining: int
+    current_task: Optional[TaskRead] = None
+    next_tasks: List[TaskRead]
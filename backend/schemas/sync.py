@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import List
+
+from .label import LabelRead
+from .project import ProjectRead
+from .task import TaskRead
+
+class SyncDeleted(BaseModel):
+    labels: List[str]
+    projects: List[str]
+    tasks: List[str]
+
+class SyncRead(BaseModel):
+    # Pass back as ?cursor= on the next call.
+    cursor: str
+    # True when the lists hold every row (no cursor was given).
+    full: bool
+    labels: List[LabelRead]
+    projects: List[ProjectRead]
+    tasks: List[TaskRead]
+    deleted: SyncDeleted
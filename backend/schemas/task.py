@@ -1,6 +1,6 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, Dict, List, Literal, Optional, Union
 
 class TaskCreate(BaseModel):
     title: str
@@ -55,3 +55,54 @@ class TaskRead(BaseModel):
     is_group: bool
     created_at: datetime
     updated_at: datetime
+
+# POST /api/tasks/{id}/subtree/...
+# These act on the task and every descendant reachable through parent_task_id.
+class TaskSubtreeMove(BaseModel):
+    project_id: Optional[str] = None
+    # Must be a task in the target project outside the moved subtree.
+    parent_task_id: Optional[str] = None
+
+class TaskSubtreeComplete(BaseModel):
+    completed: bool = True
+
+# POST /api/tasks/{id}/move
+# Places the task right after `after_id` (or first when omitted) among the
+# children of `parent_task_id` in the same project.
+class TaskMove(BaseModel):
+    parent_task_id: Optional[str] = None
+    after_id: Optional[str] = None
+
+# POST /api/tasks/batch
+# `ref` is a client-side temporary id for a created task. Later operations in
+# the same batch may use it as `id` or as `parent_task_id`.
+MAX_TASK_BATCH_OPERATIONS = 1000
+
+class TaskBatchCreate(BaseModel):
+    op: Literal["create"]
+    ref: Optional[str] = None
+    data: TaskCreate
+
+class TaskBatchUpdate(BaseModel):
+    op: Literal["update"]
+    id: str
+    data: TaskUpdate
+
+class TaskBatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: str
+
+TaskBatchOperation = Annotated[
+    Union[TaskBatchCreate, TaskBatchUpdate, TaskBatchDelete],
+    Field(discriminator="op"),
+]
+
+class TaskBatchRequest(BaseModel):
+    operations: List[TaskBatchOperation] = Field(max_length=MAX_TASK_BATCH_OPERATIONS)
+
+class TaskBatchResult(BaseModel):
+    # Created or updated rows that still exist, in order of first appearance.
+    tasks: List[TaskRead]
+    deleted: List[str]
+    # ref -> server id for created tasks
+    refs: Dict[str, str]
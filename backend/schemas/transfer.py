@@ -0,0 +1,56 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Import records use the client's own ids. References (label_id, project_id,
+# parent_task_id) may point at ids in the same batch or at existing rows of
+# the user; the server assigns new ids on insert.
+
+class LabelImport(BaseModel):
+    id: str
+    title: str
+    color: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+class ProjectImport(BaseModel):
+    id: str
+    title: str
+    label_id: Optional[str] = None
+    current_order_index: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class TaskImport(BaseModel):
+    id: str
+    title: str
+    project_id: Optional[str] = None
+    label_id: Optional[str] = None
+    parent_task_id: Optional[str] = None
+    order_index: int = 0
+    memo: Optional[str] = None
+    completed: bool = False
+    completed_at: Optional[datetime] = None
+    is_fixed: bool = False
+    is_group: bool = False
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class ImportBatch(BaseModel):
+    # Records are validated one by one so a bad record does not reject the batch.
+    labels: List[Dict[str, Any]] = Field(default_factory=list)
+    projects: List[Dict[str, Any]] = Field(default_factory=list)
+    tasks: List[Dict[str, Any]] = Field(default_factory=list)
+
+class ImportRecordError(BaseModel):
+    type: str
+    id: Optional[str] = None
+    # Position in the JSON list, or line number for NDJSON.
+    position: int
+    error: str
+
+class ImportResult(BaseModel):
+    inserted: Dict[str, int]
+    matched_labels: int
+    errors: List[ImportRecordError]
+    elapsed_ms: float
+    records_per_sec: float
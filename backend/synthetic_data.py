@@ -0,0 +1,264 @@
+# synthetic_data.py
+"""Generate synthetic accounts at production-like sizes.
+
+Builds N users x M projects x K tasks (plus solo tasks) with:
+
+- group nesting: tasks hang under group tasks up to `max_depth` levels,
+  siblings spaced by crud.tasks.ORDER_GAP like the move endpoint leaves them
+- label skew: labels are picked with Zipf-like weights, so a few labels
+  carry most projects and tasks
+- completion: each project gets a progress ratio (beta distribution around
+  `completion`); leaves are completed in the dashboard's flattened order and
+  current_order_index points at the first open one
+
+Rows go in with executemany INSERTs, one transaction per user. The same
+seed gives the same data (ids included).
+
+Usage (from backend/):
+    python synthetic_data.py --users 10 --projects 20 --tasks 200
+    DATABASE_URL=sqlite:///./big.db python synthetic_data.py --users 100 --tasks 1000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from crud.next_tasks import _flatten
+from crud.tasks import ORDER_GAP
+from crud.versions import bump_data_version
+from models import Label, Project, Task, User
+
+INSERT_CHUNK_SIZE = 5000
+SYNTHETIC_PASSWORD = "synthetic-password"
+LABEL_COLORS = ("#D6455D", "#67D08A", "#D0C98A", "#5B8DEF", "#B36BD9", "#F29D49", "#4DB6AC", "#9E9E9E")
+
+
+@dataclass
+class SyntheticConfig:
+    users: int = 1
+    projects: int = 10  # per user
+    tasks: int = 100  # per project
+    solo_tasks: int = 10  # per user
+    labels: int = 8  # per user
+    label_skew: float = 1.2  # Zipf exponent; 0 = uniform
+    nesting: float = 0.6  # share of project tasks placed under a group
+    group_ratio: float = 0.15  # share of project tasks that are groups
+    max_depth: int = 3
+    completion: float = 0.4  # mean completed share of leaves per project
+    fixed_ratio: float = 0.05
+    memo_ratio: float = 0.2
+    user_prefix: str = "synth"
+    seed: int = 0
+
+
+def synthetic_user_id(config: SyntheticConfig, index: int) -> str:
+    return f"{config.user_prefix}-user-{index}"
+
+
+def synthetic_user_email(config: SyntheticConfig, index: int) -> str:
+    return f"{config.user_prefix}-{index}@example.com"
+
+
+class _Builder:
+    def __init__(self, config: SyntheticConfig, user_id: str, rng: random.Random):
+        self.config = config
+        self.user_id = user_id
+        self.rng = rng
+        self.labels: list[dict] = []
+        self.projects: list[dict] = []
+        self.tasks: list[dict] = []
+        self.label_weights: list[float] = []
+
+    def new_id(self, prefix: str) -> str:
+        return f"{prefix}-{uuid.UUID(int=self.rng.getrandbits(128), version=4)}"
+
+    def pick_label(self) -> str | None:
+        if not self.labels:
+            return None
+        return self.rng.choices(self.labels, weights=self.label_weights)[0]["id"]
+
+    def build(self) -> None:
+        config, rng = self.config, self.rng
+        start = datetime.utcnow() - timedelta(days=365)
+        for rank in range(config.labels):
+            self.labels.append({
+                "id": self.new_id("label"),
+                "user_id": self.user_id,
+                "title": f"label {rank + 1}",
+                "color": LABEL_COLORS[rank % len(LABEL_COLORS)],
+                "created_at": start + timedelta(minutes=rank),
+            })
+        self.label_weights = [1 / (rank + 1) ** config.label_skew for rank in range(config.labels)]
+
+        for index in range(config.projects):
+            created_at = start + timedelta(days=rng.uniform(0, 330))
+            project = {
+                "id": self.new_id("proj"),
+                "user_id": self.user_id,
+                "title": f"project {index + 1}",
+                "label_id": self.pick_label() if rng.random() > 0.1 else None,
+                "current_order_index": 0,
+                "created_at": created_at,
+                "updated_at": created_at,
+            }
+            self.projects.append(project)
+            self._build_project_tasks(project)
+
+        for index in range(config.solo_tasks):
+            created_at = start + timedelta(days=rng.uniform(0, 365))
+            completed = rng.random() < config.completion
+            self.tasks.append(self._task(
+                title=f"solo task {index + 1}",
+                project_id=None,
+                label_id=self.pick_label() if rng.random() > 0.3 else None,
+                parent_task_id=None,
+                order_index=index * ORDER_GAP,
+                is_group=False,
+                completed=completed,
+                created_at=created_at,
+            ))
+
+    def _task(self, *, completed: bool, created_at: datetime, **values) -> dict:
+        rng = self.rng
+        return {
+            "id": self.new_id("task"),
+            "user_id": self.user_id,
+            "memo": "memo line\nsecond line" if rng.random() < self.config.memo_ratio else None,
+            "completed": completed,
+            "completed_at": created_at + timedelta(days=rng.uniform(0, 20)) if completed else None,
+            "is_fixed": rng.random() < self.config.fixed_ratio,
+            "created_at": created_at,
+            "updated_at": created_at,
+            **values,
+        }
+
+    def _build_project_tasks(self, project: dict) -> None:
+        config, rng = self.config, self.rng
+        tasks: list[dict] = []
+        depth: dict[str | None, int] = {None: 0}
+        groups: list[str] = []
+        next_order: dict[str | None, int] = {}
+        created_at = project["created_at"]
+
+        for index in range(config.tasks):
+            parent_id = rng.choice(groups[-8:]) if groups and rng.random() < config.nesting else None
+            level = depth[parent_id] + 1
+            is_group = level < config.max_depth and rng.random() < config.group_ratio
+            order = next_order.get(parent_id, 0)
+            next_order[parent_id] = order + ORDER_GAP
+            created_at += timedelta(minutes=rng.uniform(1, 120))
+            task = self._task(
+                title=f"{project['title']} task {index + 1}",
+                project_id=project["id"],
+                label_id=project["label_id"] if rng.random() < 0.7 else self.pick_label(),
+                parent_task_id=parent_id,
+                order_index=order,
+                is_group=is_group,
+                completed=False,
+                created_at=created_at,
+            )
+            tasks.append(task)
+            depth[task["id"]] = level
+            if is_group:
+                groups.append(task["id"])
+
+        # ダッシュボードと同じ平坦化順で先頭から完了させる
+        flat = _flatten([SimpleNamespace(**task) for task in tasks])
+        ratio = rng.betavariate(2 * config.completion, 2 * (1 - config.completion)) if 0 < config.completion < 1 else config.completion
+        done = int(len(flat) * ratio)
+        completed_ids = {task_id for task_id, _ in flat[:done]}
+        for task in tasks:
+            if task["id"] in completed_ids:
+                task["completed"] = True
+                task["completed_at"] = task["created_at"] + timedelta(days=rng.uniform(0, 20))
+        project["current_order_index"] = done
+        self.tasks.extend(tasks)
+
+
+def _insert_chunks(db: Session, model, rows: list[dict], change_seq: int) -> None:
+    # ORM の一括 INSERT は None の列を落とし、列の組み合わせが変わるたびに文を分ける。
+    # None の位置で並べておくと executemany が数回で済む（行の並びは意味を持たない）
+    rows = sorted(rows, key=lambda row: tuple(value is None for value in row.values()))
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        db.execute(insert(model), [{**row, "change_seq": change_seq} for row in rows[start:start + INSERT_CHUNK_SIZE]])
+
+
+def generate(db: Session, config: SyntheticConfig, password_hash: str | None = None) -> dict:
+    """
+    Insert the synthetic users and their data. Users whose id already exists
+    are skipped, so re-running with the same config is a no-op.
+
+    return: {"users", "labels", "projects", "tasks", "elapsed_s"}
+    """
+    from dependencies import get_password_hash
+
+    started = time.perf_counter()
+    password_hash = password_hash or get_password_hash(SYNTHETIC_PASSWORD)
+    rng = random.Random(config.seed)
+    existing = {row.id for row in db.query(User.id).filter(User.id.like(f"{config.user_prefix}-user-%"))}
+    totals = {"users": 0, "labels": 0, "projects": 0, "tasks": 0}
+
+    for index in range(config.users):
+        user_id = synthetic_user_id(config, index)
+        # 既存ユーザーを飛ばしても他のユーザーのデータが変わらないよう、乱数列はユーザーごとに分ける
+        builder = _Builder(config, user_id, random.Random(rng.getrandbits(64)))
+        if user_id in existing:
+            continue
+        builder.build()
+
+        db.execute(insert(User), [{
+            "id": user_id,
+            "email": synthetic_user_email(config, index),
+            "password_hash": password_hash,
+        }])
+        version = bump_data_version(db, user_id)
+        _insert_chunks(db, Label, builder.labels, version)
+        _insert_chunks(db, Project, builder.projects, version)
+        _insert_chunks(db, Task, builder.tasks, version)
+        db.commit()
+
+        totals["users"] += 1
+        totals["labels"] += len(builder.labels)
+        totals["projects"] += len(builder.projects)
+        totals["tasks"] += len(builder.tasks)
+
+    totals["elapsed_s"] = round(time.perf_counter() - started, 3)
+    return totals
+
+
+def main() -> None:
+    defaults = SyntheticConfig()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for field, value in vars(defaults).items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+
+    import migrations
+    from database import SessionLocal, engine
+
+    migrations.upgrade(engine)
+    db = SessionLocal()
+    try:
+        totals = generate(db, SyntheticConfig(**vars(args)))
+    finally:
+        db.close()
+
+    rows = totals["labels"] + totals["projects"] + totals["tasks"]
+    rate = rows / totals["elapsed_s"] if totals["elapsed_s"] else 0.0
+    print(
+        f"users={totals['users']} labels={totals['labels']} projects={totals['projects']} "
+        f"tasks={totals['tasks']} in {totals['elapsed_s']}s ({rate:,.0f} rows/s)"
+    )
+    print(f"password for every synthetic user: {SYNTHETIC_PASSWORD}")
+
+
+if __name__ == "__main__":
+    main()
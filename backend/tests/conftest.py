@@ -0,0 +1,164 @@
+"""Shared fixtures for the backend tests.
+
+The app runs in-process (starlette's TestClient) against a throwaway database
+in a temporary directory, which is also the working directory. The
+environment is set here, before any backend module is imported, so
+DATABASE_URL and DB_SHARD_DIR never point at a real database.
+
+Usage (from backend/):
+    python -m pytest -q
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = Path(tempfile.mkdtemp(prefix="growth-road-tests-"))
+
+# main.seed_if_new_db looks for ./growth_road.db, so run from the data directory too.
+os.chdir(DATA_DIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{DATA_DIR / 'growth_road.db'}"
+os.environ["DB_SHARD_DIR"] = str(DATA_DIR / "shards")
+os.environ.setdefault("PASSWORD_HASH_ITERATIONS", "1000")
+os.environ.setdefault("TOMBSTONE_PRUNE_INTERVAL_SECONDS", "0")
+sys.path.insert(0, str(BACKEND_DIR))
+
+# (projects, tasks per project) of the seeded accounts. Two sizes, so that a
+# per-row query or lazy load shows up as a statement count that differs.
+ACCOUNT_SIZES = {"small": (3, 10), "medium": (30, 40)}
+
+
+@dataclass
+class Account:
+    name: str
+    user_id: str
+    email: str
+    headers: dict = field(default_factory=dict)
+
+    def size(self) -> dict:
+        """return: {"labels", "projects", "tasks"} rows the user has now"""
+        from sqlalchemy import func, select
+
+        import crud
+        from database import SessionLocal
+        from models import Label, Project, Task
+
+        db = SessionLocal()
+        try:
+            crud.bind_user_shard(db, self.user_id)
+            return {
+                name: db.execute(select(func.count()).select_from(model).where(model.user_id == self.user_id)).scalar_one()
+                for name, model in (("labels", Label), ("projects", Project), ("tasks", Task))
+            }
+        finally:
+            db.close()
+
+
+class _Counter:
+    """Statements and fetched rows on every engine while `active`."""
+
+    def __init__(self):
+        self.active = False
+        self.statements = 0
+        self.rows = 0
+
+    def reset(self) -> None:
+        self.statements = 0
+        self.rows = 0
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not self.active:
+            return
+        self.statements += 1
+        # The result reads rows through context.cursor, so a proxy there sees every fetch.
+        if context is not None and cursor.description is not None:
+            context.cursor = _CountingCursor(cursor, self)
+
+
+class _CountingCursor:
+    def __init__(self, cursor, counter: _Counter):
+        self._cursor = cursor
+        self._counter = counter
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _seen(self, rows):
+        if self._counter.active:
+            self._counter.rows += len(rows)
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None and self._counter.active:
+            self._counter.rows += 1
+        return row
+
+    def fetchmany(self, *args):
+        return self._seen(self._cursor.fetchmany(*args))
+
+    def fetchall(self):
+        return self._seen(self._cursor.fetchall())
+
+
+@pytest.fixture(scope="session")
+def app():
+    import main as app_main
+
+    return app_main.app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    """Started app (migrations and the dev user seed run on startup)."""
+    from fastapi.testclient import TestClient
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def accounts(client) -> list[Account]:
+    """Synthetic accounts, smallest first, each with a token that was verified once."""
+    import synthetic_data
+    from database import SessionLocal
+    from dependencies import create_access_token
+
+    seeded = []
+    # Different seeds, because the generated ids depend only on the seed.
+    for seed, (prefix, (projects, tasks)) in enumerate(ACCOUNT_SIZES.items()):
+        config = synthetic_data.SyntheticConfig(projects=projects, tasks=tasks, user_prefix=prefix, seed=seed)
+        db = SessionLocal()
+        try:
+            synthetic_data.generate(db, config)
+        finally:
+            db.close()
+        user_id = synthetic_data.synthetic_user_id(config, 0)
+        account = Account(
+            prefix,
+            user_id,
+            synthetic_data.synthetic_user_email(config, 0),
+            {"Authorization": f"Bearer {create_access_token(user_id)}"},
+        )
+        # Warm the identity cache, as it is for a signed-in user.
+        client.get("/api/auth/me", headers=account.headers).raise_for_status()
+        seeded.append(account)
+    return seeded
+
+
+@pytest.fixture(scope="session")
+def query_counter():
+    """_Counter listening on every engine; set `active` around the code to count."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    counter = _Counter()
+    event.listen(Engine, "after_cursor_execute", counter.after_cursor_execute)
+    yield counter
+    event.remove(Engine, "after_cursor_execute", counter.after_cursor_execute)
@@ -0,0 +1,303 @@
+"""Per-route SQL statement and fetched-row budgets for the /api routes.
+
+Every /api route is called once for each seeded account (conftest.py). Any
+record a request consumes, such as a label to delete or merge, is created
+first and is not counted.
+
+A route fails when any of these holds:
+
+- it runs more statements than its budget
+- its statement count differs between the accounts (a per-row query or
+  lazy load that grows with the data)
+- it fetches more rows than its budget, which is a function of the account
+  size (for example "projects + tasks" for GET /api/projects-with-tasks)
+
+Statements and fetched rows are counted on every engine, including rows
+fetched while a streamed body is sent. Routes without a budget fail too, so
+new routes get one. GET /api/events is skipped because it is a long-lived
+SSE stream.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable
+
+import pytest
+
+from conftest import Account, _Counter
+from database import SHARDED
+
+SKIPPED_ROUTES = {"GET /api/events"}
+
+
+@dataclass(frozen=True)
+class Budget:
+    statements: int
+    # rows(account) -> max rows fetched; account = {"labels", "projects", "tasks"} of the caller
+    rows: Callable[[dict], int]
+
+
+def _rows(labels: int = 0, projects: int = 0, tasks: int = 0, extra: int = 0):
+    return lambda account: labels * account["labels"] + projects * account["projects"] + tasks * account["tasks"] + extra
+
+
+BUDGETS = {
+    "POST /api/auth/signup": Budget(3, _rows(extra=2)),
+    "POST /api/auth/login": Budget(1, _rows(extra=1)),
+    "GET /api/auth/me": Budget(1, _rows(extra=1)),
+    "GET /api/bootstrap": Budget(6, _rows(labels=1, projects=1, tasks=1, extra=2)),
+    "GET /api/sync": Budget(5, _rows(labels=1, projects=1, tasks=1, extra=2)),
+    "GET /api/labels": Budget(2, _rows(labels=1, extra=1)),
+    "GET /api/labels/stats": Budget(2, _rows(labels=1, extra=1)),
+    "POST /api/labels": Budget(4, _rows(extra=3)),
+    "PATCH /api/labels/{label_id}": Budget(4, _rows(extra=3)),
+    "DELETE /api/labels/{label_id}": Budget(7, _rows(extra=4)),
+    "POST /api/labels/{label_id}/merge": Budget(10, _rows(extra=6)),
+    "GET /api/projects": Budget(2, _rows(projects=1, extra=1)),
+    "GET /api/projects/next-tasks": Budget(6, _rows(projects=5, tasks=1, extra=2)),
+    "GET /api/projects-with-tasks": Budget(3, _rows(projects=1, tasks=1, extra=1)),
+    "POST /api/projects": Budget(3, _rows(extra=3)),
+    "PATCH /api/projects/{project_id}": Budget(4, _rows(extra=3)),
+    "DELETE /api/projects/{project_id}": Budget(7, _rows(extra=4)),
+    "PUT /api/projects/{project_id}/tasks": Budget(5, _rows(tasks=2, extra=2)),
+    "GET /api/tasks": Budget(2, _rows(tasks=1, extra=1)),
+    "POST /api/tasks": Budget(3, _rows(extra=3)),
+    "POST /api/tasks/batch": Budget(5, _rows(extra=10)),
+    "PATCH /api/tasks/{task_id}": Budget(4, _rows(extra=3)),
+    "POST /api/tasks/{task_id}/move": Budget(9, _rows(extra=8)),
+    "GET /api/tasks/{task_id}/subtree": Budget(1, _rows(tasks=1)),
+    "POST /api/tasks/{task_id}/subtree/move": Budget(7, _rows(tasks=2, extra=4)),
+    "POST /api/tasks/{task_id}/subtree/complete": Budget(4, _rows(tasks=1, extra=2)),
+    "POST /api/tasks/{task_id}/subtree/duplicate": Budget(8, _rows(tasks=2, extra=4)),
+    "DELETE /api/tasks/{task_id}": Budget(4, _rows(extra=2)),
+    "GET /api/export": Budget(4, _rows(labels=1, projects=1, tasks=1)),
+    "POST /api/import": Budget(7, _rows(extra=30)),
+}
+
+if SHARDED:
+    # With DB_SHARDS, signup also writes the user's user_shards row.
+    BUDGETS["POST /api/auth/signup"] = Budget(4, _rows(extra=3))
+
+
+class _Checker:
+    def __init__(self, client, counter: _Counter, password: str):
+        self.client = client
+        self.counter = counter
+        self.password = password
+
+    def call(self, account: Account, method: str, path: str, body=None):
+        """Setup request (not counted)."""
+        response = self.client.request(method, path, json=body, headers=account.headers)
+        response.raise_for_status()
+        return response.json() if response.content else None
+
+    def measure(self, account: Account | None, method: str, path: str, body=None) -> tuple[int, int, int]:
+        headers = account.headers if account else {}
+        self.counter.reset()
+        self.counter.active = True
+        try:
+            response = self.client.request(method, path, json=body, headers=headers)
+        finally:
+            self.counter.active = False
+        return response.status_code, self.counter.statements, self.counter.rows
+
+    def first(self, account: Account, name: str, **filters) -> dict:
+        query = "&".join(f"{key}={value}" for key, value in filters.items())
+        items = self.call(account, "GET", f"/api/{name}?{query}" if query else f"/api/{name}")
+        return items[0]
+
+    def group(self, account: Account) -> dict:
+        tasks = self.call(account, "GET", "/api/tasks?completed=false")
+        return next(t for t in tasks if t["is_group"] and t["project_id"] and t["parent_task_id"] is None)
+
+
+# Each scenario performs its setup with checker.call and returns checker.measure(...).
+
+def _signup(c: _Checker, a: Account):
+    return c.measure(None, "POST", "/api/auth/signup", {"email": f"budget-{a.user_id}@example.com", "password": c.password})
+
+
+def _login(c: _Checker, a: Account):
+    return c.measure(None, "POST", "/api/auth/login", {"email": a.email, "password": c.password})
+
+
+def _get(path: str):
+    def scenario(c: _Checker, a: Account):
+        return c.measure(a, "GET", path)
+    return scenario
+
+
+def _label_create(c: _Checker, a: Account):
+    return c.measure(a, "POST", "/api/labels", {"title": "budget label"})
+
+
+def _label_update(c: _Checker, a: Account):
+    label = c.first(a, "labels")
+    return c.measure(a, "PATCH", f"/api/labels/{label['id']}", {"color": "#123456"})
+
+
+def _label_delete(c: _Checker, a: Account):
+    label = c.call(a, "POST", "/api/labels", {"title": "budget delete"})
+    return c.measure(a, "DELETE", f"/api/labels/{label['id']}")
+
+
+def _label_merge(c: _Checker, a: Account):
+    source = c.call(a, "POST", "/api/labels", {"title": "budget merge"})
+    c.call(a, "POST", "/api/projects", {"title": "budget merge", "label_id": source["id"]})
+    c.call(a, "POST", "/api/tasks", {"title": "budget merge", "label_id": source["id"]})
+    target = c.first(a, "labels")
+    return c.measure(a, "POST", f"/api/labels/{source['id']}/merge", {"into_label_id": target["id"]})
+
+
+def _project_create(c: _Checker, a: Account):
+    return c.measure(a, "POST", "/api/projects", {"title": "budget project"})
+
+
+def _project_update(c: _Checker, a: Account):
+    project = c.first(a, "projects")
+    return c.measure(a, "PATCH", f"/api/projects/{project['id']}", {"title": "budget renamed"})
+
+
+def _project_delete(c: _Checker, a: Account):
+    project = c.call(a, "POST", "/api/projects", {"title": "budget delete"})
+    operations = [{"op": "create", "data": {"title": f"task {n}", "project_id": project["id"]}} for n in range(5)]
+    c.call(a, "POST", "/api/tasks/batch", {"operations": operations})
+    return c.measure(a, "DELETE", f"/api/projects/{project['id']}")
+
+
+def _project_put_tasks(c: _Checker, a: Account):
+    project = c.first(a, "projects")
+    tasks = c.call(a, "GET", f"/api/tasks?project_id={project['id']}")
+    tasks[0]["title"] += " (edited)"
+    return c.measure(a, "PUT", f"/api/projects/{project['id']}/tasks", tasks)
+
+
+def _task_create(c: _Checker, a: Account):
+    project = c.first(a, "projects")
+    return c.measure(a, "POST", "/api/tasks", {"title": "budget task", "project_id": project["id"]})
+
+
+def _task_batch(c: _Checker, a: Account):
+    project = c.first(a, "projects")
+    task = c.first(a, "tasks", project_id=project["id"])
+    operations = [
+        {"op": "create", "ref": "g", "data": {"title": "budget group", "project_id": project["id"], "is_group": True}},
+        *({"op": "create", "data": {"title": f"child {n}", "project_id": project["id"], "parent_task_id": "g"}} for n in range(3)),
+        {"op": "update", "id": task["id"], "data": {"memo": "batch"}},
+    ]
+    return c.measure(a, "POST", "/api/tasks/batch", {"operations": operations})
+
+
+def _task_update(c: _Checker, a: Account):
+    task = c.first(a, "tasks", completed="false")
+    return c.measure(a, "PATCH", f"/api/tasks/{task['id']}", {"memo": "budget"})
+
+
+def _task_move(c: _Checker, a: Account):
+    project = c.first(a, "projects")
+    tasks = c.call(a, "GET", f"/api/tasks?project_id={project['id']}")
+    roots = [t for t in tasks if t["parent_task_id"] is None]
+    return c.measure(a, "POST", f"/api/tasks/{roots[0]['id']}/move", {"after_id": roots[-1]["id"]})
+
+
+def _subtree_get(c: _Checker, a: Account):
+    group = c.group(a)
+    return c.measure(a, "GET", f"/api/tasks/{group['id']}/subtree")
+
+
+def _subtree_move(c: _Checker, a: Account):
+    group = c.group(a)
+    projects = c.call(a, "GET", "/api/projects")
+    target = next(p for p in projects if p["id"] != group["project_id"])
+    return c.measure(a, "POST", f"/api/tasks/{group['id']}/subtree/move", {"project_id": target["id"]})
+
+
+def _subtree_complete(c: _Checker, a: Account):
+    group = c.group(a)
+    return c.measure(a, "POST", f"/api/tasks/{group['id']}/subtree/complete", {"completed": False})
+
+
+def _subtree_duplicate(c: _Checker, a: Account):
+    group = c.group(a)
+    return c.measure(a, "POST", f"/api/tasks/{group['id']}/subtree/duplicate", {})
+
+
+def _task_delete(c: _Checker, a: Account):
+    task = c.call(a, "POST", "/api/tasks", {"title": "budget delete"})
+    return c.measure(a, "DELETE", f"/api/tasks/{task['id']}")
+
+
+def _import(c: _Checker, a: Account):
+    body = {
+        "labels": [{"id": "l1", "title": "imported"}],
+        "projects": [{"id": "p1", "title": "imported", "label_id": "l1"}],
+        "tasks": [{"id": f"t{n}", "title": f"imported {n}", "project_id": "p1"} for n in range(20)],
+    }
+    return c.measure(a, "POST", "/api/import", body)
+
+
+SCENARIOS = {
+    "POST /api/auth/signup": _signup,
+    "POST /api/auth/login": _login,
+    "GET /api/auth/me": _get("/api/auth/me"),
+    "GET /api/bootstrap": _get("/api/bootstrap"),
+    "GET /api/sync": _get("/api/sync"),
+    "GET /api/labels": _get("/api/labels"),
+    "GET /api/labels/stats": _get("/api/labels/stats"),
+    "GET /api/projects": _get("/api/projects"),
+    "GET /api/projects/next-tasks": _get("/api/projects/next-tasks"),
+    "GET /api/projects-with-tasks": _get("/api/projects-with-tasks"),
+    "GET /api/tasks": _get("/api/tasks"),
+    "GET /api/export": _get("/api/export"),
+    "GET /api/tasks/{task_id}/subtree": _subtree_get,
+    "POST /api/labels": _label_create,
+    "PATCH /api/labels/{label_id}": _label_update,
+    "DELETE /api/labels/{label_id}": _label_delete,
+    "POST /api/labels/{label_id}/merge": _label_merge,
+    "POST /api/projects": _project_create,
+    "PATCH /api/projects/{project_id}": _project_update,
+    "DELETE /api/projects/{project_id}": _project_delete,
+    "PUT /api/projects/{project_id}/tasks": _project_put_tasks,
+    "POST /api/tasks": _task_create,
+    "POST /api/tasks/batch": _task_batch,
+    "PATCH /api/tasks/{task_id}": _task_update,
+    "POST /api/tasks/{task_id}/move": _task_move,
+    "POST /api/tasks/{task_id}/subtree/move": _subtree_move,
+    "POST /api/tasks/{task_id}/subtree/complete": _subtree_complete,
+    "POST /api/tasks/{task_id}/subtree/duplicate": _subtree_duplicate,
+    "DELETE /api/tasks/{task_id}": _task_delete,
+    "POST /api/import": _import,
+}
+
+
+@pytest.fixture(scope="module")
+def checker(client, query_counter):
+    import synthetic_data
+
+    return _Checker(client, query_counter, synthetic_data.SYNTHETIC_PASSWORD)
+
+
+def test_every_route_has_a_budget(app):
+    routes = {
+        f"{method} {route.path}"
+        for route in app.routes
+        if getattr(route, "path", "").startswith("/api/")
+        for method in getattr(route, "methods", None) or ()
+        if method != "HEAD"
+    }
+    assert sorted(routes - SKIPPED_ROUTES - set(BUDGETS)) == []
+    assert sorted(set(BUDGETS) ^ set(SCENARIOS)) == []
+
+
+@pytest.mark.parametrize("route", sorted(BUDGETS))
+def test_query_budget(route, checker, accounts):
+    budget, scenario = BUDGETS[route], SCENARIOS[route]
+    statements_by_account = []
+    for account in accounts:
+        size = account.size()
+        status, statements, rows = scenario(checker, account)
+        assert status < 400, f"{account.name}: HTTP {status}"
+        assert statements <= budget.statements, f"{account.name}: {statements} statements > {budget.statements}"
+        assert rows <= budget.rows(size), f"{account.name}: {rows} rows > {budget.rows(size)} for {size}"
+        statements_by_account.append(statements)
+    assert len(set(statements_by_account)) == 1, f"statements grow with the account: {statements_by_account}"
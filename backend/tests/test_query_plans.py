@@ -0,0 +1,103 @@
+"""Hot CRUD queries must keep using an index.
+
+Calls the CRUD functions for the dev user (seeded on startup) and runs EXPLAIN
+QUERY PLAN on every SELECT (and every WITH ... statement) they issue. A query
+fails when its plan does a full table scan of labels/projects/tasks or sorts
+with a temp B-tree.
+"""
+from __future__ import annotations
+
+import pytest
+
+import crud
+from main import DEFAULT_DEV_USER_ID
+from schemas import TaskUpsert
+
+CHECKED_TABLES = ("labels", "projects", "tasks")
+USER_ID = DEFAULT_DEV_USER_ID
+
+
+def _plan_problems(plan_details: list[str]) -> list[str]:
+    problems = []
+    for detail in plan_details:
+        if detail.startswith("SCAN ") and detail.split()[1] in CHECKED_TABLES:
+            problems.append(detail)
+        if "USE TEMP B-TREE" in detail:
+            problems.append(detail)
+    return problems
+
+
+def _upsert_first_project(db):
+    project = crud.list_projects(db, USER_ID)[0]
+    tasks = crud.list_tasks_page(db, USER_ID, project_id=project.id)[0]
+    payloads = [TaskUpsert(id=t.id, title=t.title, order_index=t.order_index) for t in tasks]
+    crud.upsert_project_tasks(db, project.id, payloads, USER_ID)
+
+
+def _subtree_ops(db):
+    project = crud.list_projects(db, USER_ID)[0]
+    root = crud.list_tasks_page(db, USER_ID, project_id=project.id, limit=1)[0][0]
+    crud.list_task_subtree(db, root.id, USER_ID)
+    crud.set_task_subtree_completed(db, root.id, USER_ID, False)
+    crud.move_task_subtree(db, root.id, USER_ID, project.id)
+    siblings = crud.list_tasks_page(db, USER_ID, project_id=project.id, parent_task_id=root.parent_task_id, limit=2)[0]
+    crud.move_task(db, siblings[0].id, USER_ID, root.parent_task_id, siblings[-1].id)
+
+
+def _label_lookups(db):
+    label = crud.list_labels(db, USER_ID)[0]
+    crud.get_label_by_title(db, label.title, USER_ID)
+    crud.list_tasks_page(db, USER_ID, label_id=label.id, limit=10)
+    crud.list_projects_page(db, USER_ID, label_id=label.id, limit=10)
+    crud.list_label_stats(db, USER_ID)
+    crud.delete_label(db, label.id, USER_ID)  # 使用中なので in_use で止まる
+
+
+# Run in this order: list_changes reads after the upsert, so there are changes to read.
+SCENARIOS = {
+    "list_labels": lambda db: crud.list_labels(db, USER_ID),
+    "list_projects": lambda db: crud.list_projects(db, USER_ID),
+    "list_projects_with_tasks": lambda db: crud.list_projects_with_tasks(db, USER_ID),
+    "list_tasks": lambda db: crud.list_tasks(db, USER_ID),
+    "list_tasks_page": lambda db: crud.list_tasks_page(db, USER_ID, limit=10, completed=False),
+    "list_tasks_page(parent)": lambda db: crud.list_tasks_page(db, USER_ID, parent_task_id="x", limit=10),
+    "label lookups": _label_lookups,
+    "upsert_project_tasks": _upsert_first_project,
+    "task subtree": _subtree_ops,
+    "list_next_tasks": lambda db: crud.list_next_tasks(db, USER_ID, 3),
+    "list_changes": lambda db: crud.list_changes(db, USER_ID, 0),
+}
+
+
+@pytest.mark.parametrize("name", SCENARIOS)
+def test_query_plan(name, client):
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    from database import SessionLocal
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        # 再帰 CTE は WITH から始まる（UPDATE / DELETE の対象検索も含めて見る）
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")) and not executemany:
+            captured.append((conn.engine, statement, parameters))
+
+    db = SessionLocal()
+    crud.bind_user_shard(db, USER_ID)
+    event.listen(Engine, "before_cursor_execute", capture)
+    try:
+        SCENARIOS[name](db)
+    finally:
+        event.remove(Engine, "before_cursor_execute", capture)
+        db.close()
+
+    assert captured
+    failures = []
+    for engine, statement, parameters in captured:
+        with engine.connect() as conn:
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        problems = _plan_problems([row[-1] for row in plan])
+        if problems:
+            failures.append(f"{' '.join(statement.split())[:160]}: {problems}")
+    assert failures == []
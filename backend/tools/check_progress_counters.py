@@ -0,0 +1,65 @@
+"""Compare the task counters on projects/labels with a fresh count of tasks.
+
+The counters (task_count, completed_count, fixed_count, group_count) are
+maintained by SQLite triggers on tasks (migration 5). This recounts them with
+one GROUP BY per table and reports rows that drifted, e.g. after rows were
+edited with triggers disabled or restored from an old backup.
+
+Runs against DATABASE_URL (default: ./growth_road.db) and, with
+DB_SHARDS > 0, every shard, after bringing the schema up to date. --user
+checks only the shard that user is on.
+
+Usage (from backend/):
+    python tools/check_progress_counters.py            # exit status 1 on drift
+    python tools/check_progress_counters.py --fix      # rewrite drifted rows
+    python tools/check_progress_counters.py --user dev-user
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fix", action="store_true", help="rewrite drifted counters")
+    parser.add_argument("--user", default=None, help="check only this user id")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    import crud
+    import migrations
+    from database import SessionLocal, data_shards, engine, shard_engines
+
+    for target in (engine, *(engines["write"] for engines in shard_engines)):
+        migrations.upgrade(target)
+
+    mismatched: dict[str, list[str]] = {"projects": [], "labels": []}
+    # --user: check_progress_counters binds the session to that user's shard itself.
+    for shard in [None] if args.user is not None else data_shards():
+        db = SessionLocal(info={"shard": shard})
+        try:
+            for name, ids in crud.check_progress_counters(db, args.user, fix=args.fix).items():
+                mismatched[name] += ids
+        finally:
+            db.close()
+
+    total = 0
+    for name, ids in mismatched.items():
+        total += len(ids)
+        print(f"{name}: {len(ids)} drifted" + (f" ({', '.join(ids[:5])}{', ...' if len(ids) > 5 else ''})" if ids else ""))
+    if not total:
+        print("progress counters OK")
+        return 0
+    if args.fix:
+        print(f"rewrote {total} row(s)")
+        return 0
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""Move users between SQLite shards (DB_SHARDS > 0).
+
+With DB_SHARDS=N, each user's labels, projects, tasks, data version and
+tombstones live in one of DB_SHARD_DIR/shard-{i}.db. DATABASE_URL keeps the
+users and the user_shards directory table. Users without a directory row are
+still in DATABASE_URL; that is where all the data is after turning sharding on
+for an existing database.
+
+Default run:
+
+1. moves every user that is still in DATABASE_URL onto the emptiest shard
+2. then moves users from the fullest shard (by label + project + task rows)
+   to the emptiest one, until the two differ by at most --tolerance rows or
+   no single move makes them closer. Raising DB_SHARDS and re-running spreads
+   users onto the new, empty shards.
+
+Stop the API first. Each API process remembers which shard a user is on, so
+it would keep writing to the old file.
+
+A move copies the user's rows to the target shard in one transaction, points
+the directory at the target, then deletes the rows from the source. An
+interrupted move can be re-run: rows left on the target from an earlier attempt
+are deleted before the copy.
+
+Usage (from backend/):
+    DB_SHARDS=4 python tools/rebalance_shards.py --dry-run
+    DB_SHARDS=4 python tools/rebalance_shards.py
+    DB_SHARDS=4 python tools/rebalance_shards.py --user dev-user --to 2
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Tasks go in before their labels and projects: the counter triggers on tasks
+# then find no row to update, so the copied task_count etc. stay as they were.
+COPY_ORDER = ("user_data_versions", "tombstones", "tasks", "labels", "projects")
+# Deleting labels and projects first keeps the same triggers from updating rows that are about to go.
+DELETE_ORDER = ("labels", "projects", "tasks", "tombstones", "user_data_versions")
+SIZED_TABLES = ("labels", "projects", "tasks")
+COPY_CHUNK_SIZE = 5000
+
+
+def _engine_for(shard: int | None):
+    import database
+
+    return database.engine if shard is None else database.shard_engines[shard]["write"]
+
+
+def _name(shard: int | None) -> str:
+    return "main" if shard is None else f"shard {shard}"
+
+
+def _load_placement() -> tuple[dict[str, int | None], dict[str, int]]:
+    """return: ({user_id: shard (None = DATABASE_URL)}, {user_id: rows})"""
+    from sqlalchemy import func, select
+
+    import database
+    from database import Base
+    from models import User, UserShard
+
+    with database.engine.connect() as conn:
+        placement = {user_id: None for (user_id,) in conn.execute(select(User.id))}
+        placement.update(conn.execute(select(UserShard.user_id, UserShard.shard)).all())
+
+    sizes = dict.fromkeys(placement, 0)
+    for shard in database.data_shards():
+        with _engine_for(shard).connect() as conn:
+            for name in SIZED_TABLES:
+                table = Base.metadata.tables[name]
+                rows = conn.execute(select(table.c.user_id, func.count()).group_by(table.c.user_id))
+                for user_id, count in rows:
+                    # Rows left behind on a shard the user is not mapped to do not count.
+                    if user_id in placement and placement[user_id] == shard:
+                        sizes[user_id] += count
+    return placement, sizes
+
+
+def move_user(user_id: str, source: int | None, target: int) -> int:
+    """
+    Move one user's rows from `source` to `target` and update the directory.
+
+    return: rows copied
+    """
+    from sqlalchemy import delete, insert, select
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+    import database
+    from database import Base
+    from models import UserShard
+
+    tables = Base.metadata.tables
+    copied = 0
+    with _engine_for(target).begin() as out, _engine_for(source).connect() as src:
+        for name in DELETE_ORDER:
+            out.execute(delete(tables[name]).where(tables[name].c.user_id == user_id))
+        for name in COPY_ORDER:
+            table = tables[name]
+            result = src.execute(select(table).where(table.c.user_id == user_id).order_by(*table.primary_key))
+            while rows := result.fetchmany(COPY_CHUNK_SIZE):
+                values = [dict(row._mapping) for row in rows]
+                if name == "tombstones":
+                    # Autoincrement ids would collide with the target's own tombstones.
+                    for row in values:
+                        del row["id"]
+                out.execute(insert(table), values)
+                copied += len(values)
+
+    with database.engine.begin() as conn:
+        conn.execute(
+            sqlite_insert(UserShard)
+            .values(user_id=user_id, shard=target)
+            .on_conflict_do_update(index_elements=[UserShard.user_id], set_={"shard": target})
+        )
+
+    with _engine_for(source).begin() as conn:
+        for name in DELETE_ORDER:
+            conn.execute(delete(tables[name]).where(tables[name].c.user_id == user_id))
+    return copied
+
+
+def plan_moves(placement: dict, sizes: dict, shard_count: int, tolerance: int) -> list[tuple[str, int | None, int]]:
+    """return: [(user_id, source, target), ...] in the order to run them"""
+    load = dict.fromkeys(range(shard_count), 0)
+    members: dict[int, list[str]] = {shard: [] for shard in range(shard_count)}
+    moves = []
+
+    for user_id, shard in placement.items():
+        if shard is not None:
+            load[shard] += sizes[user_id]
+            members[shard].append(user_id)
+    # Largest first, so the unsharded users end up spread evenly.
+    for user_id in sorted((u for u, s in placement.items() if s is None), key=lambda u: (-sizes[u], u)):
+        target = min(load, key=lambda shard: (load[shard], shard))
+        moves.append((user_id, None, target))
+        load[target] += sizes[user_id]
+        members[target].append(user_id)
+
+    while True:
+        fullest = max(load, key=lambda shard: (load[shard], -shard))
+        emptiest = min(load, key=lambda shard: (load[shard], shard))
+        gap = load[fullest] - load[emptiest]
+        if gap <= tolerance:
+            break
+        # The user closest to half the gap narrows it the most; anyone at or above the gap would not help.
+        candidates = [u for u in members[fullest] if 0 < sizes[u] < gap]
+        if not candidates:
+            break
+        user_id = min(candidates, key=lambda u: (abs(gap / 2 - sizes[u]), u))
+        moves.append((user_id, fullest, emptiest))
+        members[fullest].remove(user_id)
+        members[emptiest].append(user_id)
+        load[fullest] -= sizes[user_id]
+        load[emptiest] += sizes[user_id]
+    return moves
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tolerance", type=int, default=1000, help="stop when shard sizes differ by at most this many rows")
+    parser.add_argument("--user", help="move only this user (requires --to)")
+    parser.add_argument("--to", type=int, help="target shard for --user")
+    parser.add_argument("--dry-run", action="store_true", help="print the moves without running them")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    import database
+    import migrations
+
+    if not database.SHARDED:
+        print("DB_SHARDS is not set; nothing to rebalance")
+        return 1
+    if (args.user is None) != (args.to is None):
+        parser.error("--user and --to go together")
+    if args.to is not None and not 0 <= args.to < database.DB_SHARDS:
+        parser.error(f"--to must be between 0 and {database.DB_SHARDS - 1}")
+
+    for engine in (database.engine, *(engines["write"] for engines in database.shard_engines)):
+        migrations.upgrade(engine)
+
+    placement, sizes = _load_placement()
+    stranded = sorted(u for u, shard in placement.items() if shard is not None and shard >= database.DB_SHARDS)
+    if stranded:
+        print(f"{len(stranded)} user(s) are on shards >= DB_SHARDS={database.DB_SHARDS}; shrinking is not supported")
+        return 1
+
+    if args.user is not None:
+        if args.user not in placement:
+            print(f"unknown user {args.user}")
+            return 1
+        moves = [] if placement[args.user] == args.to else [(args.user, placement[args.user], args.to)]
+    else:
+        moves = plan_moves(placement, sizes, database.DB_SHARDS, args.tolerance)
+
+    for user_id, source, target in moves:
+        action = "would move" if args.dry_run else "moving"
+        print(f"{action} {user_id} ({sizes[user_id]} rows): {_name(source)} -> {_name(target)}")
+        if not args.dry_run:
+            move_user(user_id, source, target)
+
+    final = {**placement, **{user_id: target for user_id, _, target in moves}}
+    load = dict.fromkeys(range(database.DB_SHARDS), 0)
+    for user_id, shard in final.items():
+        if shard is not None:
+            load[shard] += sizes[user_id]
+    print(f"{len(moves)} move(s); rows per shard{' after' if args.dry_run else ''}: {load}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
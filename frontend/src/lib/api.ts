@@ -83,3 +83,13 @@ export async function apiPut<T>(path: string, body: unknown): Promise<T> {
     body: JSON.stringify(body),
   });
 }
+
+// Server-Sent Events（/api/events など）。EventSource はヘッダーを付けられないので、トークンはクエリで渡す
+export function apiEventSource(path: string): EventSource {
+  const token = localStorage.getItem("access_token");
+  const separator = path.includes("?") ? "&" : "?";
+  const url = token
+    ? `${baseUrl}${path}${separator}access_token=${encodeURIComponent(token)}`
+    : `${baseUrl}${path}`;
+  return new EventSource(url);
+}
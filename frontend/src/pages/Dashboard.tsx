@@ -1,5 +1,5 @@
 import { useEffect, useMemo, useState } from "react";
-import { apiGet, apiPost, apiPatch, apiDelete, apiPut } from "../lib/api";
+import { apiGet, apiPost, apiPatch, apiDelete, apiPut, apiEventSource } from "../lib/api";
 import AppLayout from "../layouts/AppLayout";
 import ProjectCard from "../components/ProjectCard/ProjectCard";
 import styles from "./Dashboard.module.scss";
@@ -7,7 +7,7 @@ import FabMenu from "../components/FabMenu/FabMenu";
 import TaskModal from "../components/TaskModal/TaskModal";
 import ProjectModal from "../components/ProjectModal/ProjectModal";
 import { LabelRenameContext } from "../components/Sidebar/Sidebar";
-import type { ID, Label, Project, Task } from "../types/models";
+import type { Bootstrap, ID, Label, Project, SyncChanges, Task } from "../types/models";
 
 type SortKey = "created_at" | "updated_at";
 
@@ -87,11 +87,49 @@ function buildFlatLeafTaskIds(allTasks: Task[], projectId: ID): ID[] {
   return out;
 }
 
+// --- タスクと子孫（parent_task_id で辿れるもの）のID。サーバーの削除は子孫ごと消える ---
+function collectSubtreeIds(allTasks: Task[], rootId: ID): Set<ID> {
+  const childrenByParent = new Map<ID, ID[]>();
+  for (const t of allTasks) {
+    if (!t.parent_task_id) continue;
+    const arr = childrenByParent.get(t.parent_task_id) ?? [];
+    arr.push(t.id);
+    childrenByParent.set(t.parent_task_id, arr);
+  }
+
+  const ids = new Set<ID>([rootId]);
+  const stack = [rootId];
+  while (stack.length > 0) {
+    for (const childId of childrenByParent.get(stack.pop()!) ?? []) {
+      if (ids.has(childId)) continue;
+      ids.add(childId);
+      stack.push(childId);
+    }
+  }
+  return ids;
+}
+
 function findLabel(labels: Label[], labelId?: ID | null) {
   if (!labelId) return null;
   return labels.find((l) => l.id === labelId) ?? null;
 }
 
+// 変更・追加された行で置き換え、削除されたIDを取り除く（並びは既存の順、新規は末尾）
+function mergeById<T extends { id: ID }>(prev: T[], changed: T[], deletedIds: ID[]): T[] {
+  if (changed.length === 0 && deletedIds.length === 0) return prev;
+
+  const deleted = new Set(deletedIds);
+  const changedById = new Map(changed.map((item) => [item.id, item]));
+  const next = prev
+    .filter((item) => !deleted.has(item.id))
+    .map((item) => {
+      const updated = changedById.get(item.id);
+      if (updated) changedById.delete(item.id);
+      return updated ?? item;
+    });
+  return [...next, ...changedById.values()];
+}
+
 export default function Dashboard() {
   const [taskOpen, setTaskOpen] = useState(false);
   const [projectOpen, setProjectOpen] = useState(false);
@@ -114,6 +152,11 @@ export default function Dashboard() {
   const [projects, setProjects] = useState<Project[]>(initialProjects);
   const [tasks, setTasks] = useState<Task[]>(initialTasks);
 
+  // 初回ロード時のデータ版数。ここから /api/events で変更を受け取る
+  const [syncCursor, setSyncCursor] = useState<string | null>(null);
+  // 変えると初回ロードをやり直す（差分を受け取れなくなったとき用）
+  const [reloadKey, setReloadKey] = useState(0);
+
   // モーダルで編集中のタスクID
   const [editingTaskId, setEditingTaskId] = useState<ID | null>(null);
 
@@ -213,24 +256,17 @@ export default function Dashboard() {
   // 初回ロード
   useEffect(() => {
     (async () => {
+      // labels / projects / tasks は1リクエストで同じスナップショットを受け取る
       let serverLabels: Label[] = [];
-      try {
-        serverLabels = await apiGet<Label[]>("/api/labels");
-        setLabels(serverLabels);
-      } catch (e) {
-        console.error(e);
-      }
-
       let serverProjects: Project[] | null = null;
-      try {
-        serverProjects = await apiGet<Project[]>("/api/projects");
-      } catch (e) {
-        console.error(e);
-      }
-
       let serverTasks: Task[] | null = null;
       try {
-        serverTasks = await apiGet<Task[]>("/api/tasks");
+        const boot = await apiGet<Bootstrap>("/api/bootstrap");
+        serverLabels = boot.labels;
+        serverProjects = boot.projects;
+        serverTasks = boot.tasks;
+        setLabels(serverLabels);
+        setSyncCursor(String(boot.version));
       } catch (e) {
         console.error(e);
       }
@@ -262,7 +298,28 @@ export default function Dashboard() {
         setTasks(nextTasks);
       }
     })().catch(console.error);
-  }, []);
+  }, [reloadKey]);
+
+  // 他のタブ・端末での変更をサーバーから受け取って反映する
+  useEffect(() => {
+    if (syncCursor === null) return;
+
+    // 再接続時はブラウザが Last-Event-ID を送るので、続きから届く
+    const source = apiEventSource(`/api/events?cursor=${syncCursor}`);
+    source.addEventListener("changes", (ev) => {
+      const delta = JSON.parse((ev as MessageEvent<string>).data) as SyncChanges;
+      setLabels((prev) => mergeById(prev, delta.labels, delta.deleted.labels));
+      setProjects((prev) => mergeById(prev, delta.projects, delta.deleted.projects));
+      setTasks((prev) => mergeById(prev, delta.tasks, delta.deleted.tasks));
+    });
+    source.addEventListener("reset", () => {
+      source.close();
+      setSyncCursor(null);
+      setReloadKey((k) => k + 1);
+    });
+
+    return () => source.close();
+  }, [syncCursor]);
 
   // カード表示用VM
   const cards = useMemo(() => {
@@ -423,7 +480,10 @@ export default function Dashboard() {
   const handleDeleteHistoryTask = async (taskId: ID) => {
     try {
       await apiDelete(`/api/tasks/${taskId}`);
-      setTasks((prev) => prev.filter((t) => t.id !== taskId));
+      setTasks((prev) => {
+        const removed = collectSubtreeIds(prev, taskId);
+        return prev.filter((t) => !removed.has(t.id));
+      });
       setHistoryMenuOpenId(null);
     } catch (e) {
       console.error(e);
@@ -626,8 +686,11 @@ export default function Dashboard() {
               return;
             }
 
-            // 1) タスク削除
-            setTasks((prev) => prev.filter((t) => t.id !== id));
+            // 1) タスク削除（子孫もサーバー側で消えている）
+            setTasks((prev) => {
+              const removed = collectSubtreeIds(prev, id);
+              return prev.filter((t) => !removed.has(t.id));
+            });
 
             // 2) project.current_order_index の補正（削除位置が手前なら -1）
             if (projectId) {
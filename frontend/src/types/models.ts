@@ -47,6 +47,11 @@ export type Label = {
   title: string;
   color: string | null;
   created_at: string; // ISO斁EEE侁E new Date().toISOString()EE
+  // Task counters maintained by the server (no task download needed).
+  task_count?: number;
+  completed_count?: number;
+  fixed_count?: number;
+  group_count?: number;
 };
 
 /**
@@ -74,6 +79,12 @@ export type Project = {
    */
   current_order_index: number;
 
+  // Task counters maintained by the server (no task download needed).
+  task_count?: number;
+  completed_count?: number;
+  fixed_count?: number;
+  group_count?: number;
+
   created_at: string;
   updated_at: string;
 };
@@ -126,3 +137,68 @@ export type Task = {
   created_at: string;
   updated_at: string;
 };
+
+/**
+ * Response of GET /api/bootstrap (initial dashboard load).
+ * - version: data version of the snapshot (the ETag is built from it)
+ */
+export type Bootstrap = {
+  version: number;
+  labels: Label[];
+  projects: Project[];
+  tasks: Task[];
+};
+
+/**
+ * Delta of GET /api/sync and of the "changes" event of /api/events.
+ * - deleted: ids removed since the cursor
+ */
+export type SyncChanges = {
+  cursor: string;
+  full: boolean;
+  labels: Label[];
+  projects: Project[];
+  tasks: Task[];
+  deleted: {
+    labels: ID[];
+    projects: ID[];
+    tasks: ID[];
+  };
+};
+
+/**
+ * GET /api/projects/next-tasks
+ * position is the index of current_task in the project's flattened leaf
+ * order (same order as the dashboard); it equals flat_length when done.
+ */
+export type ProjectNextTasks = {
+  project_id: ID;
+  position: number;
+  flat_length: number;
+  remaining: number;
+  current_task: Task | null;
+  next_tasks: Task[];
+};
+
+/**
+ * GET /api/labels/stats
+ */
+export type LabelStats = {
+  label_id: ID;
+  project_count: number;
+  task_count: number;
+  completed_count: number;
+  fixed_count: number;
+  group_count: number;
+};
+
+/**
+ * POST /api/labels/{id}/merge
+ * - projects / tasks: rows moved off the source label
+ */
+export type LabelMergeResult = {
+  projects: number;
+  tasks: number;
+  deleted: boolean;
+  target: Label | null;
+};